@@ -1,7 +1,32 @@
+import asyncio
+import codecs
+import functools
+import locale
 import os
 import shutil
 import subprocess
-from typing import Any, Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from command import batch, replay
+from command.spawn import SpawnedProcess, get_spawner
+from command.pipe import Stage
+from command.session import DEFAULT_MAX_IN_FLIGHT, ResponseReader, Session
+from command.scheduler import LIGHT, Cost, get_scheduler
+from command.trace import CommandRecord, children_cpu_time, traced
+
+
+# Runs a command (given its argv, working directory and whether to capture its
+# output) instead of `subprocess.run`
+Runner = Callable[[List[str], str, bool], subprocess.CompletedProcess]
+
+# Size of the reads done while streaming output
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Maximum amount of stderr kept in memory while streaming output
+STREAM_STDERR_LIMIT = 64 * 1024
 
 
 class BaseCommandError(Exception):
@@ -29,6 +54,28 @@ class CommandNotFoundError(BaseCommandError):
         return f"Command not found: {self.command}"
 
 
+class _TailBuffer:
+    """
+    Keeps the last `limit` bytes written to a stream
+    """
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._data = bytearray()
+        self.truncated = False
+
+    def drain(self, stream: IO[bytes]) -> None:
+        for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b""):
+            self._data += chunk
+            if len(self._data) > self._limit:
+                del self._data[: len(self._data) - self._limit]
+                self.truncated = True
+
+    def text(self) -> str:
+        text = self._data.decode(locale.getpreferredencoding(False), errors="replace")
+        return "[...]\n" + text if self.truncated else text
+
+
 class Command:
     """
     Context for running git commands
@@ -41,14 +88,42 @@ class Command:
     Currently, options that require an '=' between the key and the value must be
     supplied as positional arguments:
             git.log('--format=%B')
+
+    Positional arguments that do not fit on one command line are split into
+    several invocations, whose outputs are joined. Subcommands listed in
+    `parallel_subcommands` run those invocations concurrently:
+            git = Command('git', PATH_TO_REPO, parallel_subcommands=['hash-object'])
+            git.hash_object(*paths)
+
+    `options` are placed before the subcommand of every invocation:
+            git = Command('git', PATH_TO_REPO, options=['-c', 'gc.auto=0'])
+
+    Every process waits for a slot from the process-wide scheduler before it is
+    started. Streams and sessions give their slot back once they are started,
+    since how long they run depends on their caller. Subclasses that run expensive processes override `cost`.
+
+    While a recorder or replayer is active (see command.replay), commands that
+    touch its directories go through it instead of running directly. While the
+    spawn helper is running (see command.spawn), it starts the processes.
+
+    Variables in `env` are added to the environment of every process (which is
+    otherwise inherited), including the ones started by the spawn helper. Such
+    commands are never recorded or replayed, since a recording does not keep
+    the environment:
+            git = Command('git', PATH_TO_REPO, env={'GIT_INDEX_FILE': path})
     """
 
+    cost: Cost = LIGHT
+
     def __init__(
         self,
         executabale: str,
         working_dir: str = None,
         capture_output: bool = True,
         error=CommandError,
+        parallel_subcommands: Iterable[str] = (),
+        env: Optional[Dict[str, str]] = None,
+        options: Iterable[str] = (),
     ) -> None:
 
         if not shutil.which(executabale):
@@ -64,22 +139,128 @@ class Command:
 
         self._error = error
 
-    def _run_command(self, command: List[str]) -> str:
-        try:
-            proc = subprocess.run(
-                command,
-                cwd=self._working_dir,
-                check=True,
-                capture_output=self._capture_output,
-                text=True,
-            )
+        self._arg_limit = batch.arg_max()
+        self._parallel_subcommands = set(parallel_subcommands)
+        self._env = env
+        self._options = list(options)
 
-            if self._capture_output:
-                return proc.stdout.strip()
+    def _popen_kwargs(self) -> Dict[str, Any]:
+        # Only pass an environment when there is something to add, so
+        # processes inherit this process's environment as usual otherwise
+        if self._env is None:
+            return {}
+
+        return {"env": {**os.environ, **self._env}}
+
+    @contextmanager
+    def _process(
+        self, command: List[str], measure_cpu: bool = True
+    ) -> Iterator[CommandRecord]:
+        """
+        Wait for a scheduler slot, then trace the process run inside the block
+        (see traced())
+        """
+
+        with get_scheduler().slot(self.cost) as wait:
+            with traced(command, self._working_dir, measure_cpu) as record:
+                record.queue_wait = wait
+                yield record
 
-        except subprocess.CalledProcessError as e:
+    @staticmethod
+    def _decode(output: bytes) -> str:
+        # Match what `subprocess.run(..., text=True)` would have returned
+        encoding = locale.getpreferredencoding(False)
+        return output.decode(encoding).replace("\r\n", "\n")
+
+    def _runner(self, command: List[str], spawn: bool = True) -> Optional[Runner]:
+        """
+        Get the function that should run a command instead of `subprocess.run`
+
+        Commands that touch the directories of an active recorder or replayer
+        go through it (see command.replay). Otherwise, if `spawn` is set and
+        the spawn helper is running, it starts the process (see
+        command.spawn).
+
+        Returns:
+                Optional[Runner]: None to run the command directly
+        """
+
+        interceptor = replay.get_interceptor()
+        if (
+            self._env is None
+            and interceptor is not None
+            and interceptor.handles(command, self._working_dir)
+        ):
+            return interceptor.run
+
+        spawner = get_spawner()
+        if (
+            spawn
+            and spawner is not None
+            and spawner.accepts(command, self._working_dir, self._env)
+        ):
+            return functools.partial(spawner.run, env=self._env)
+
+        return None
+
+    def _run_with(
+        self, runner: Runner, command: List[str], capture_output: bool
+    ) -> subprocess.CompletedProcess:
+        with self._process(command, measure_cpu=False) as record:
+            cpu_before = children_cpu_time()
+            proc = runner(command, self._working_dir, capture_output)
+            record.exit_code = proc.returncode
+            if proc.stdout is not None:
+                record.output_size = len(proc.stdout)
+
+            if isinstance(proc, SpawnedProcess):
+                # The helper reaped the process, so only it knows
+                record.cpu_time = proc.cpu_time
+            elif cpu_before is not None:
+                record.cpu_time = children_cpu_time() - cpu_before
+
+        if proc.returncode != 0:
             # Convert the error to to the user-specified error type
-            raise self._error(command, e.stderr) from e
+            stderr = None
+            if proc.stderr is not None:
+                stderr = proc.stderr.decode(
+                    locale.getpreferredencoding(False), errors="replace"
+                )
+
+            raise self._error(command, stderr)
+
+        return proc
+
+    def _run_command(self, command: List[str]) -> str:
+        runner = self._runner(command)
+        if runner is not None:
+            proc = self._run_with(runner, command, self._capture_output)
+            if self._capture_output:
+                return Command._decode(proc.stdout).strip()
+
+            return None
+
+        with self._process(command) as record:
+            try:
+                proc = subprocess.run(
+                    command,
+                    cwd=self._working_dir,
+                    check=True,
+                    capture_output=self._capture_output,
+                    text=True,
+                    **self._popen_kwargs(),
+                )
+                record.exit_code = proc.returncode
+
+                if self._capture_output:
+                    record.output_size = len(proc.stdout)
+                    return proc.stdout.strip()
+
+            except subprocess.CalledProcessError as e:
+                record.exit_code = e.returncode
+
+                # Convert the error to to the user-specified error type
+                raise self._error(command, e.stderr) from e
 
     def __getattr__(self, name: str):
         """
@@ -91,11 +272,260 @@ class Command:
 
         def func(*args, **kwargs):
             subcommand = name.replace("_", "-")
+            return self._call(subcommand, args, kwargs)
+
+        return func
 
-            command = self._raw_command(subcommand, args, kwargs)
+    def _call(self, subcommand: str, args: List[Any], kwargs: Dict[str, Any]):
+        command = self._raw_command(subcommand, args, kwargs)
+        if batch.command_size(command) <= self._arg_limit:
             return self._run_command(command)
 
-        return func
+        batches = batch.split_args(
+            self._raw_command(subcommand, [], kwargs),
+            [str(arg) for arg in args],
+            self._arg_limit,
+        )
+        return self._run_batches(subcommand, batches)
+
+    @staticmethod
+    def _join_outputs(outputs: List[Optional[str]]) -> Optional[str]:
+        outputs = [output for output in outputs if output is not None]
+        if not outputs:
+            return None
+
+        return "\n".join(output for output in outputs if output)
+
+    def _run_batches(self, subcommand: str, batches: List[List[str]]) -> str:
+        if subcommand in self._parallel_subcommands:
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                futures = [
+                    executor.submit(self._run_command, command) for command in batches
+                ]
+
+            # Report the first batch that failed (its error contains the full
+            # command of that batch)
+            outputs = [future.result() for future in futures]
+
+        else:
+            outputs = [self._run_command(command) for command in batches]
+
+        return Command._join_outputs(outputs)
+
+    def binary(self, subcommand: str, *args, **kwargs) -> memoryview:
+        """
+        Run a subcommand and return its output without decoding it
+
+        The output is not stripped, and the returned view shares the buffer
+        the output was read into, so slicing it does not copy any data.
+
+        Sample usage:
+                blob = git.binary('cat_file', 'blob', 'HEAD:src/Foo.java')
+                digest = hashlib.sha1(blob).hexdigest()
+
+        Args:
+                subcommand (str): Name of the subcommand
+        """
+
+        command = self._raw_command(subcommand.replace("_", "-"), args, kwargs)
+        return self._run_binary_command(command)
+
+    def _run_binary_command(self, command: List[str]) -> memoryview:
+        runner = self._runner(command)
+        if runner is not None:
+            return memoryview(self._run_with(runner, command, True).stdout)
+
+        with self._process(command) as record:
+            try:
+                proc = subprocess.run(
+                    command,
+                    cwd=self._working_dir,
+                    check=True,
+                    capture_output=True,
+                    **self._popen_kwargs(),
+                )
+
+            except subprocess.CalledProcessError as e:
+                record.exit_code = e.returncode
+
+                # Convert the error to to the user-specified error type
+                stderr = e.stderr.decode(
+                    locale.getpreferredencoding(False), errors="replace"
+                )
+                raise self._error(command, stderr) from e
+
+            record.exit_code = proc.returncode
+            record.output_size = len(proc.stdout)
+            return memoryview(proc.stdout)
+
+    def stage(self, subcommand: str, *args, **kwargs) -> Stage:
+        """
+        Prepare a subcommand to be run as part of a pipeline
+
+        Stages are connected with `|`, and the pipeline is started with run().
+        If a stage fails, the error type supplied to the constructor of its
+        command is raised.
+
+        Sample usage:
+                pipeline = git.stage('diff', name_only=True, z=True) | git.stage(
+                        'checkout_index', '-z', stdin=True
+                )
+                pipeline.run()
+
+        Args:
+                subcommand (str): Name of the subcommand
+        """
+
+        command = self._raw_command(subcommand.replace("_", "-"), args, kwargs)
+        return Stage(
+            command,
+            self._working_dir,
+            self._error,
+            self._capture_output,
+            self.cost,
+            env=self._popen_kwargs().get("env"),
+        )
+
+    def session(
+        self,
+        subcommand: str,
+        *args,
+        response: Optional[ResponseReader] = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        terminator: str = "\n",
+        on_close: Optional[Callable[[], None]] = None,
+        **kwargs,
+    ) -> Session:
+        """
+        Start a subcommand that keeps reading requests from stdin
+
+        Sample usage:
+                with git.session('update_index', index_info=True) as session:
+                        for mode, oid, path in entries:
+                                session.request(f'{mode} {oid}\t{path}')
+
+        Args:
+                subcommand (str): Name of the subcommand
+                response (Optional[ResponseReader], optional): Reads the response
+                        to each request (see command.session). Defaults to None
+                        (no responses).
+                max_in_flight (int, optional): Maximum number of requests that
+                        may be waiting for a response
+                terminator (str, optional): Appended to every request. Defaults
+                        to '\n'.
+                on_close (Optional[Callable[[], None]], optional): Called once the
+                        process exited
+        """
+
+        command = self._raw_command(subcommand.replace("_", "-"), args, kwargs)
+
+        # Like streams, sessions only take a scheduler slot while they start,
+        # since they live for as long as their caller keeps sending requests
+        with get_scheduler().slot(self.cost) as wait:
+            return Session(
+                command,
+                self._working_dir,
+                self._error,
+                response=response,
+                max_in_flight=max_in_flight,
+                terminator=terminator,
+                env=self._popen_kwargs().get("env"),
+                queue_wait=wait,
+                on_close=on_close,
+            )
+
+    def stream(
+        self, subcommand: str, *args, separator: str = "\n", **kwargs
+    ) -> Iterator[str]:
+        """
+        Run a subcommand and yield its output one record at a time
+
+        Output is decoded and split while the process is running, so it is
+        never held in memory all at once. Only the end of stderr is kept for
+        the error message.
+
+        Sample usage:
+                for path in git.stream('ls_files', z=True, separator='\0'):
+                        print(path)
+
+        Args:
+                subcommand (str): Name of the subcommand
+                separator (str, optional): Record separator. Defaults to '\n'.
+
+        Raises:
+                The error type supplied to the constructor, once the output has
+                been consumed, if the process fails
+        """
+
+        command = self._raw_command(subcommand.replace("_", "-"), args, kwargs)
+        return self._stream_command(command, separator)
+
+    def _stream_command(self, command: List[str], separator: str) -> Iterator[str]:
+        # Only recorded and replayed commands are handled by a runner, since the
+        # spawn helper cannot stream output
+        runner = self._runner(command, spawn=False)
+        if runner is not None:
+            output = Command._decode(self._run_with(runner, command, True).stdout)
+            records = output.split(separator)
+            if not records[-1]:
+                records.pop()
+
+            yield from records
+            return
+
+        # Only starting the process takes a scheduler slot. The stream then
+        # waits for its consumer, which may run commands of its own in the
+        # meantime (holding the slot would keep them waiting forever when there
+        # is only one)
+        with get_scheduler().slot(self.cost) as wait:
+            proc = subprocess.Popen(
+                command,
+                cwd=self._working_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                **self._popen_kwargs(),
+            )
+
+        with traced(command, self._working_dir) as record:
+            record.queue_wait = wait
+
+            # Drain stderr on another thread so the process can never block on
+            # it
+            stderr = _TailBuffer(STREAM_STDERR_LIMIT)
+            stderr_reader = threading.Thread(target=stderr.drain, args=(proc.stderr,))
+            stderr_reader.start()
+
+            decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))()
+            pending = ""
+            finished = False
+            try:
+                for chunk in iter(lambda: proc.stdout.read1(STREAM_CHUNK_SIZE), b""):
+                    record.output_size += len(chunk)
+                    *records, pending = (pending + decoder.decode(chunk)).split(
+                        separator
+                    )
+                    yield from records
+
+                pending += decoder.decode(b"", final=True)
+                finished = True
+                if pending:
+                    yield pending
+
+            finally:
+                # Stop the process if the caller did not consume all of the
+                # output
+                if not finished:
+                    proc.kill()
+
+                proc.stdout.close()
+                proc.wait()
+                stderr_reader.join()
+                proc.stderr.close()
+                record.exit_code = proc.returncode
+
+        if proc.returncode != 0:
+            # Convert the error to to the user-specified error type
+            raise self._error(command, stderr.text())
 
     @staticmethod
     def _format_option(key: str, value: Any) -> List[str]:
@@ -122,4 +552,71 @@ class Command:
             for token in Command._format_option(key, value)
         ]
         args = [str(arg) for arg in args]
-        return [self._executable, subcommand, *options, *args]
+        return [self._executable, *self._options, subcommand, *options, *args]
+
+
+class AsyncCommand(Command):
+    """
+    Context for running commands on an asyncio event loop
+
+    Subcommands are called just like with Command, but they return coroutines
+    instead of blocking, so independent commands can run concurrently:
+            git = AsyncCommand('git', PATH_TO_REPO)
+            await asyncio.gather(git.fetch(prune=True), git.tag('1.18'))
+    """
+
+    async def _run_command(self, command: List[str]) -> str:
+        runner = self._runner(command, spawn=False)
+        if runner is not None:
+            loop = asyncio.get_running_loop()
+            proc = await loop.run_in_executor(
+                None, self._run_with, runner, command, self._capture_output
+            )
+            if self._capture_output:
+                return AsyncCommand._decode(proc.stdout).strip()
+
+            return None
+
+        # Wait for a slot on another thread, so the event loop keeps running
+        scheduler = get_scheduler()
+        loop = asyncio.get_running_loop()
+        wait = await loop.run_in_executor(None, scheduler.acquire, self.cost)
+        try:
+            with traced(command, self._working_dir) as record:
+                record.queue_wait = wait
+
+                stream = asyncio.subprocess.PIPE if self._capture_output else None
+                proc = await asyncio.create_subprocess_exec(
+                    *command,
+                    cwd=self._working_dir,
+                    stdout=stream,
+                    stderr=stream,
+                    **self._popen_kwargs(),
+                )
+                stdout, stderr = await proc.communicate()
+                record.exit_code = proc.returncode
+                if stdout is not None:
+                    record.output_size = len(stdout)
+
+        finally:
+            scheduler.release(self.cost)
+
+        if proc.returncode != 0:
+            # Convert the error to to the user-specified error type
+            raise self._error(
+                command, AsyncCommand._decode(stderr) if stderr is not None else None
+            )
+
+        if self._capture_output:
+            return AsyncCommand._decode(stdout).strip()
+
+    async def _run_batches(self, subcommand: str, batches: List[List[str]]) -> str:
+        if subcommand in self._parallel_subcommands:
+            outputs = await asyncio.gather(
+                *[self._run_command(command) for command in batches]
+            )
+
+        else:
+            outputs = [await self._run_command(command) for command in batches]
+
+        return Command._join_outputs(outputs)
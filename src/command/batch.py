@@ -0,0 +1,99 @@
+"""
+Splitting of argument lists that are too long for one command line
+"""
+
+import os
+from typing import List
+
+# Limit used if the system does not report one (the POSIX minimum is 4096, but
+# every platform shulkr supports allows far more)
+DEFAULT_ARG_MAX = 128 * 1024
+
+# Maximum command line length on Windows (in characters)
+WINDOWS_ARG_MAX = 32767
+
+# Space left unused for anything the estimate misses (matches the recommendation
+# in the POSIX xargs specification)
+HEADROOM = 2048
+
+# Size of one entry in argv/envp
+POINTER_SIZE = 8
+
+
+def arg_size(arg: str) -> int:
+    """
+    Number of bytes an argument takes up in a new process
+    """
+
+    return len(os.fsencode(arg)) + 1 + POINTER_SIZE
+
+
+def command_size(command: List[str]) -> int:
+    return sum(arg_size(arg) for arg in command)
+
+
+def arg_max() -> int:
+    """
+    Number of bytes available for the arguments of a new process
+
+    The environment is passed to the child in the same space, so its size is
+    subtracted from the system limit.
+    """
+
+    if os.name == "nt":
+        return WINDOWS_ARG_MAX - HEADROOM
+
+    try:
+        limit = os.sysconf("SC_ARG_MAX")
+    except (AttributeError, ValueError, OSError):
+        limit = -1
+
+    if limit <= 0:
+        limit = DEFAULT_ARG_MAX
+
+    env_size = sum(arg_size(f"{key}={value}") for key, value in os.environ.items())
+    return limit - env_size - HEADROOM
+
+
+def split_args(prefix: List[str], args: List[str], limit: int) -> List[List[str]]:
+    """
+    Split positional arguments into commands that each fit in `limit` bytes
+
+    If the arguments contain '--', everything up to and including it is
+    repeated in every batch, and only the arguments after it are split (so
+    `git checkout HEAD -- PATHS...` keeps working).
+
+    Args:
+            prefix (List[str]): Executable, subcommand and options
+            args (List[str]): Positional arguments
+            limit (int): Maximum size of each command (see command_size())
+
+    Returns:
+            List[List[str]]: One full command per batch
+    """
+
+    if "--" in args:
+        separator = args.index("--")
+        prefix = prefix + args[: separator + 1]
+        args = args[separator + 1 :]
+
+    prefix_size = command_size(prefix)
+
+    batches = []
+    batch = []
+    size = prefix_size
+    for arg in args:
+        # An argument that does not fit on its own still gets a batch, so git
+        # can report the error
+        if batch and size + arg_size(arg) > limit:
+            batches.append(prefix + batch)
+            batch = []
+            size = prefix_size
+
+        batch.append(arg)
+        size += arg_size(arg)
+
+    if batch or not batches:
+        batches.append(prefix + batch)
+
+    return batches
@@ -0,0 +1,194 @@
+"""
+Pipelines of commands connected with OS pipes
+
+The output of each stage is passed to the next stage by the operating system,
+so it never goes through Python. For the same reason, pipelines cannot be
+recorded or replayed (see command.replay).
+
+Sample usage:
+        git = Command('git', PATH_TO_REPO)
+        pipeline = git.stage('ls_files') | git.stage('hash_object', stdin_paths=True)
+        hashes = pipeline.run()
+"""
+
+from __future__ import annotations
+import locale
+import signal
+import subprocess
+import tempfile
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Type
+
+from command import replay
+from command.scheduler import Cost, get_scheduler
+from command.trace import traced
+
+
+class Stage:
+    """
+    One command in a pipeline
+
+    Stages are created with Command.stage() and combined with `|`.
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        working_dir: str,
+        error: Type[Exception],
+        capture_output: bool,
+        cost: Cost,
+        env: Optional[Dict[str, str]] = None,
+    ) -> None:
+
+        self.command = command
+        self.working_dir = working_dir
+        self.error = error
+        self.capture_output = capture_output
+        self.cost = cost
+        # Full environment of the process (None to inherit it)
+        self.env = env
+
+    def __or__(self, other: Stage) -> Pipeline:
+        return Pipeline([self]) | other
+
+    def run(self) -> Optional[str]:
+        return Pipeline([self]).run()
+
+
+class Pipeline:
+    """
+    Commands whose standard output is connected to the standard input of the
+    next command
+    """
+
+    def __init__(self, stages: List[Stage]) -> None:
+        self.stages = stages
+
+    def __or__(self, other: Stage) -> Pipeline:
+        other_stages = other.stages if isinstance(other, Pipeline) else [other]
+        return Pipeline(self.stages + other_stages)
+
+    @staticmethod
+    def _succeeded(returncode: int) -> bool:
+        # A stage that is killed by SIGPIPE stopped because a later stage
+        # stopped reading (like `git log | head`), which is not an error
+        return returncode == 0 or returncode == -getattr(signal, "SIGPIPE", 13)
+
+    @staticmethod
+    def _stop(procs: List[subprocess.Popen]) -> None:
+        for proc in procs:
+            proc.kill()
+
+        for proc in procs:
+            proc.wait()
+            if proc.stdout is not None:
+                proc.stdout.close()
+
+    def run(self) -> Optional[str]:
+        """
+        Run all stages concurrently and return the output of the last one
+
+        The output is decoded and stripped like the output of a regular
+        command. If the last stage does not capture its output, it goes to
+        this process's stdout and None is returned.
+
+        Raises:
+                The error type of the first stage that failed, with that
+                stage's command and stderr
+                ReplayError: If a recorder or replayer would handle one of the
+                        stages
+        """
+
+        interceptor = replay.get_interceptor()
+        if interceptor is not None:
+            for stage in self.stages:
+                if stage.env is None and interceptor.handles(
+                    stage.command, stage.working_dir
+                ):
+                    raise replay.ReplayError(
+                        "Pipelines cannot be recorded or replayed: "
+                        + " ".join(stage.command)
+                    )
+
+        # The stages run at the same time, so they take one slot for their
+        # combined cost (acquiring one slot per stage could wait forever)
+        cost = Cost(
+            sum(stage.cost.cpus for stage in self.stages),
+            sum(stage.cost.memory for stage in self.stages),
+        )
+
+        with ExitStack() as stack:
+            wait = stack.enter_context(get_scheduler().slot(cost))
+
+            procs = []
+            stderr_files = []
+            stdin = None
+            for i, stage in enumerate(self.stages):
+                record = stack.enter_context(traced(stage.command, stage.working_dir))
+                record.queue_wait = wait
+
+                last = i == len(self.stages) - 1
+                stderr_file = None
+                if stage.capture_output:
+                    stderr_file = tempfile.TemporaryFile()
+                    stack.callback(stderr_file.close)
+
+                try:
+                    proc = subprocess.Popen(
+                        stage.command,
+                        cwd=stage.working_dir,
+                        stdin=stdin,
+                        stdout=(
+                            subprocess.PIPE
+                            if not last or stage.capture_output
+                            else None
+                        ),
+                        stderr=stderr_file,
+                        env=stage.env,
+                    )
+                except BaseException:
+                    # Nothing will read the output of the stages that were
+                    # started, so stop them
+                    Pipeline._stop([proc for proc, _ in procs])
+                    raise
+                finally:
+                    # Only the child reads from the previous stage now
+                    if stdin is not None:
+                        stdin.close()
+
+                procs.append((proc, record))
+                stderr_files.append(stderr_file)
+                stdin = proc.stdout
+
+            last_proc, last_record = procs[-1]
+            stdout = None
+            if last_proc.stdout is not None:
+                stdout = last_proc.stdout.read()
+                last_proc.stdout.close()
+                last_record.output_size = len(stdout)
+
+            for proc, record in procs:
+                proc.wait()
+                record.exit_code = proc.returncode
+
+            for stage, (proc, _), stderr_file in zip(self.stages, procs, stderr_files):
+                if Pipeline._succeeded(proc.returncode):
+                    continue
+
+                stderr = None
+                if stderr_file is not None:
+                    stderr_file.seek(0)
+                    stderr = stderr_file.read().decode(
+                        locale.getpreferredencoding(False), errors="replace"
+                    )
+
+                # Convert the error to to the user-specified error type
+                raise stage.error(stage.command, stderr)
+
+        if stdout is None:
+            return None
+
+        # Match what `subprocess.run(..., text=True)` would have returned
+        encoding = locale.getpreferredencoding(False)
+        return stdout.decode(encoding).replace("\r\n", "\n").strip()
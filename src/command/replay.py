@@ -0,0 +1,386 @@
+"""
+Record and replay processes run through Command
+
+A Recorder runs commands for real and saves their output, exit code, duration
+and the files they changed under a set of root directories. A Replayer then
+answers the same commands from the recording without running anything: it
+recreates the recorded files, waits for a configurable latency and returns the
+recorded output. Only commands that touch one of the roots (by working
+directory or by argument) are recorded or replayed; all other commands run
+normally.
+
+Sample usage:
+        # Once, with network access
+        set_interceptor(Recorder(STORE, roots=[YARN_DIR]))
+        ...
+        get_interceptor().save()
+
+        # Any number of times, offline
+        set_interceptor(Replayer(STORE, roots=[YARN_DIR], latency=0))
+"""
+
+from __future__ import annotations
+import abc
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Directories whose contents are never recorded (only their existence is)
+DEFAULT_EXCLUDE = (".git", ".gradle", "build")
+
+INDEX_FILE = "commands.json"
+
+# Size, modification time and permissions of a file
+FileInfo = Tuple[int, int, int]
+
+
+class ReplayError(Exception):
+    pass
+
+
+def _snapshot(
+    root: str, exclude: Iterable[str]
+) -> Tuple[Dict[str, FileInfo], Set[str]]:
+    """
+    List all files (with their stat info) and directories under `root`
+
+    Paths are relative to `root` and use '/' as the separator.
+    """
+
+    files = {}
+    dirs = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        prefix = "" if rel_dir == "." else rel_dir + "/"
+        if rel_dir != ".":
+            dirs.add(rel_dir)
+
+        for name in [name for name in dirnames if name in exclude]:
+            dirs.add(prefix + name)
+            dirnames.remove(name)
+
+        for name in filenames:
+            info = os.lstat(os.path.join(dirpath, name))
+            if stat.S_ISREG(info.st_mode):
+                files[prefix + name] = (
+                    info.st_size,
+                    info.st_mtime_ns,
+                    stat.S_IMODE(info.st_mode),
+                )
+
+    return files, dirs
+
+
+class _Store:
+    """
+    Directory holding the recorded commands and the contents of the files they
+    created
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.path, "objects", digest[:2], digest[2:])
+
+    def put_file(self, path: str) -> str:
+        hasher = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+
+        digest = hasher.hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            shutil.copyfile(path, object_path)
+
+        return digest
+
+    def put_bytes(self, data: bytes) -> str:
+        digest = hashlib.sha1(data).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            with open(object_path, "wb") as f:
+                f.write(data)
+
+        return digest
+
+    def get_bytes(self, digest: str) -> bytes:
+        with open(self._object_path(digest), "rb") as f:
+            return f.read()
+
+    def copy_to(self, digest: str, path: str, mode: int) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(self._object_path(digest), path)
+        os.chmod(path, mode)
+
+
+class _Interceptor(abc.ABC):
+    def __init__(
+        self, store_path: str, roots: List[str], exclude: Iterable[str]
+    ) -> None:
+        self._store = _Store(store_path)
+        self._roots = [os.path.abspath(root) for root in roots]
+        self._exclude = set(exclude)
+        self._lock = threading.Lock()
+
+    def _normalize(self, path: str) -> Optional[str]:
+        """
+        Express a path relative to one of the roots ('{0}/src', for example)
+
+        Returns:
+                Optional[str]: None if the path is not inside any root
+        """
+
+        if not os.path.isabs(path):
+            return None
+
+        for i, root in enumerate(self._roots):
+            if path == root:
+                return f"{{{i}}}"
+
+            if path.startswith(root + os.sep):
+                rel_path = os.path.relpath(path, root).replace(os.sep, "/")
+                return f"{{{i}}}/{rel_path}"
+
+        return None
+
+    def _key(self, command: List[str], cwd: str) -> str:
+        argv = [self._normalize(arg) or arg for arg in command]
+        return json.dumps([argv, self._normalize(cwd)])
+
+    def handles(self, command: List[str], cwd: str) -> bool:
+        """
+        Check if a command touches one of the roots
+        """
+
+        return self._normalize(cwd) is not None or any(
+            self._normalize(arg) is not None for arg in command
+        )
+
+    def _root_path(self, i: int, rel_path: str) -> str:
+        return os.path.join(self._roots[i], *rel_path.split("/"))
+
+    @abc.abstractmethod
+    def run(
+        self, command: List[str], cwd: str, capture_output: bool
+    ) -> subprocess.CompletedProcess:
+        pass
+
+
+class Recorder(_Interceptor):
+    """
+    Runs commands and records everything needed to replay them
+
+    Args:
+            store_path (str): Directory to save the recording in
+            roots (List[str]): Directories whose commands are recorded, along
+                    with the files they change
+            exclude (Iterable[str], optional): Names of directories whose
+                    contents are not recorded
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        roots: List[str],
+        exclude: Iterable[str] = DEFAULT_EXCLUDE,
+    ) -> None:
+
+        super().__init__(store_path, roots, exclude)
+
+        os.makedirs(store_path, exist_ok=True)
+        self._entries: List[Dict] = []
+        self._data: Dict[str, object] = {}
+
+        # Record the state of the roots before the first command, so a replay
+        # can start from the same state
+        self._initial = [
+            self._record_changes(i, ({}, set())) for i in range(len(roots))
+        ]
+
+    def _snapshots(self) -> List[Tuple[Dict[str, FileInfo], Set[str]]]:
+        return [_snapshot(root, self._exclude) for root in self._roots]
+
+    def _record_changes(
+        self, i: int, before: Tuple[Dict[str, FileInfo], Set[str]]
+    ) -> Dict:
+        before_files, before_dirs = before
+        after_files, after_dirs = _snapshot(self._roots[i], self._exclude)
+
+        files = {
+            path: [self._store.put_file(self._root_path(i, path)), info[2]]
+            for path, info in sorted(after_files.items())
+            if before_files.get(path) != info
+        }
+
+        return {
+            "exists": os.path.isdir(self._roots[i]),
+            "created_dirs": sorted(after_dirs - before_dirs),
+            "deleted_dirs": sorted(before_dirs - after_dirs),
+            "files": files,
+            "deleted_files": sorted(before_files.keys() - after_files.keys()),
+        }
+
+    def run(
+        self, command: List[str], cwd: str, capture_output: bool
+    ) -> subprocess.CompletedProcess:
+
+        with self._lock:
+            before = self._snapshots()
+            start = time.perf_counter()
+            proc = subprocess.run(command, cwd=cwd, capture_output=capture_output)
+            duration = time.perf_counter() - start
+
+            self._entries.append(
+                {
+                    "key": self._key(command, cwd),
+                    "returncode": proc.returncode,
+                    "stdout": self._store.put_bytes(proc.stdout or b""),
+                    "stderr": self._store.put_bytes(proc.stderr or b""),
+                    "duration": duration,
+                    "changes": [
+                        self._record_changes(i, before[i])
+                        for i in range(len(self._roots))
+                    ],
+                }
+            )
+
+        return proc
+
+    def set_data(self, name: str, value: object) -> None:
+        """
+        Save extra JSON-serializable data with the recording (like data that
+        was downloaded without running a command)
+        """
+
+        self._data[name] = value
+
+    def save(self) -> None:
+        with self._lock:
+            index = {
+                "initial": self._initial,
+                "entries": self._entries,
+                "data": self._data,
+            }
+
+        with open(os.path.join(self._store.path, INDEX_FILE), "w") as index_file:
+            json.dump(index, index_file)
+
+
+class Replayer(_Interceptor):
+    """
+    Answers commands from a recording without running them
+
+    Commands are matched by their arguments and working directory (relative to
+    the roots). When the same command was recorded several times, the
+    recordings are replayed in order, and the last one is repeated after that.
+
+    Args:
+            store_path (str): Directory the recording was saved in
+            roots (List[str]): Directories to replay the recorded changes in
+                    (in the same order as when recording)
+            latency (Optional[float], optional): Seconds each command takes. If
+                    None, each command takes as long as it did when it was
+                    recorded.
+            exclude (Iterable[str], optional): Must match the recording
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        roots: List[str],
+        latency: Optional[float] = None,
+        exclude: Iterable[str] = DEFAULT_EXCLUDE,
+    ) -> None:
+
+        super().__init__(store_path, roots, exclude)
+
+        with open(os.path.join(store_path, INDEX_FILE)) as index_file:
+            index = json.load(index_file)
+
+        self._latency = latency
+        self._data = index["data"]
+        self._entries: Dict[str, List[Dict]] = {}
+        for entry in index["entries"]:
+            self._entries.setdefault(entry["key"], []).append(entry)
+
+        self._next: Dict[str, int] = {}
+
+        # Start from the state the roots were in when recording started (unless
+        # a previous replay already created them)
+        for i, changes in enumerate(index["initial"]):
+            if changes["exists"] and not os.path.exists(self._roots[i]):
+                self._apply_changes(i, changes)
+
+    def get_data(self, name: str) -> object:
+        return self._data[name]
+
+    def _apply_changes(self, i: int, changes: Dict) -> None:
+        for path in changes["deleted_files"]:
+            full_path = self._root_path(i, path)
+            if os.path.exists(full_path):
+                os.remove(full_path)
+
+        for path in reversed(changes["deleted_dirs"]):
+            shutil.rmtree(self._root_path(i, path), ignore_errors=True)
+
+        if changes["exists"]:
+            os.makedirs(self._roots[i], exist_ok=True)
+        for path in changes["created_dirs"]:
+            os.makedirs(self._root_path(i, path), exist_ok=True)
+
+        for path, (digest, mode) in changes["files"].items():
+            self._store.copy_to(digest, self._root_path(i, path), mode)
+
+    def run(
+        self, command: List[str], cwd: str, capture_output: bool
+    ) -> subprocess.CompletedProcess:
+
+        key = self._key(command, cwd)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise ReplayError(f"No recording of {command} in {cwd}")
+
+            n = self._next.get(key, 0)
+            self._next[key] = n + 1
+            entry = entries[min(n, len(entries) - 1)]
+
+        time.sleep(entry["duration"] if self._latency is None else self._latency)
+
+        with self._lock:
+            for i, changes in enumerate(entry["changes"]):
+                self._apply_changes(i, changes)
+
+        stdout = self._store.get_bytes(entry["stdout"]) if capture_output else None
+        stderr = self._store.get_bytes(entry["stderr"]) if capture_output else None
+        return subprocess.CompletedProcess(
+            command, entry["returncode"], stdout=stdout, stderr=stderr
+        )
+
+
+def get_interceptor() -> Optional[_Interceptor]:
+    return interceptor
+
+
+def set_interceptor(new_interceptor: Optional[_Interceptor]) -> None:
+    """
+    Record or replay commands from now on (None to run commands normally)
+    """
+
+    global interceptor
+
+    interceptor = new_interceptor
+
+
+interceptor = None
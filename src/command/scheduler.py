@@ -0,0 +1,334 @@
+"""
+Process-wide admission control for processes started through Command
+
+Every process asks the scheduler for a slot before it is started. Light jobs
+(like most git commands) take one CPU slot, while heavy jobs (JVM decompilers)
+take several slots and reserve memory. When the host is under memory pressure,
+only one job runs at a time.
+
+Sample usage:
+        with get_scheduler().slot(HEAVY) as wait:
+                run_decompiler()
+"""
+
+from __future__ import annotations
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+GiB = 1024**3
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# Share of stalled time (over the last 10 seconds) above which the host is
+# considered to be under memory pressure
+DEFAULT_PRESSURE_THRESHOLD = 10.0
+
+# Memory that should stay available for everything else on the host
+DEFAULT_MEMORY_RESERVE = GiB // 2
+
+# How often waiting jobs check whether the memory pressure went away
+PRESSURE_POLL_INTERVAL = 1.0
+
+
+class Cost:
+    """
+    Resources a process is expected to use
+
+    Attributes:
+            cpus (float): Number of CPU slots taken while the process runs
+            memory (int): Bytes of memory reserved while the process runs
+    """
+
+    __slots__ = ("cpus", "memory")
+
+    def __init__(self, cpus: float, memory: int = 0) -> None:
+        self.cpus = cpus
+        self.memory = memory
+
+    def __repr__(self) -> str:
+        return f"Cost(cpus={self.cpus}, memory={self.memory})"
+
+
+# Short-lived processes like git commands
+LIGHT = Cost(cpus=1)
+
+# JVM-based decompilers
+HEAVY = Cost(cpus=4, memory=2 * GiB)
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus(cgroup_root: str = CGROUP_ROOT) -> float:
+    """
+    Number of CPUs this process may use, taking the cgroup quota into account
+    """
+
+    if hasattr(os, "sched_getaffinity"):
+        cpus = float(len(os.sched_getaffinity(0)))
+    else:
+        cpus = float(os.cpu_count() or 1)
+
+    # cgroup v2
+    quota = _read(os.path.join(cgroup_root, "cpu.max"))
+    if quota is not None:
+        limit, period = quota.split()
+        if limit != "max":
+            cpus = min(cpus, int(limit) / int(period))
+
+        return max(cpus, 1.0)
+
+    # cgroup v1
+    limit = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+    if limit is not None and period is not None and int(limit) > 0:
+        cpus = min(cpus, int(limit) / int(period))
+
+    return max(cpus, 1.0)
+
+
+def _meminfo(field: str) -> Optional[int]:
+    meminfo = _read("/proc/meminfo")
+    if meminfo is None:
+        return None
+
+    for line in meminfo.splitlines():
+        if line.startswith(f"{field}:"):
+            # Values are in kB
+            return int(line.split()[1]) * 1024
+
+    return None
+
+
+def _cgroup_memory_limit(cgroup_root: str) -> Optional[int]:
+    # cgroup v2 reports 'max' when there is no limit, v1 a huge number
+    for path in (
+        os.path.join(cgroup_root, "memory.max"),
+        os.path.join(cgroup_root, "memory", "memory.limit_in_bytes"),
+    ):
+        limit = _read(path)
+        if limit is not None and limit != "max" and int(limit) < 2**60:
+            return int(limit)
+
+    return None
+
+
+def _cgroup_memory_usage(cgroup_root: str) -> Optional[int]:
+    for path in (
+        os.path.join(cgroup_root, "memory.current"),
+        os.path.join(cgroup_root, "memory", "memory.usage_in_bytes"),
+    ):
+        usage = _read(path)
+        if usage is not None:
+            return int(usage)
+
+    return None
+
+
+def memory_limit(cgroup_root: str = CGROUP_ROOT) -> Optional[int]:
+    """
+    Memory available to this process in total (None if unknown)
+    """
+
+    limits = [
+        limit
+        for limit in (_meminfo("MemTotal"), _cgroup_memory_limit(cgroup_root))
+        if limit is not None
+    ]
+    return min(limits) if limits else None
+
+
+def available_memory(cgroup_root: str = CGROUP_ROOT) -> Optional[int]:
+    """
+    Memory that can currently be allocated without swapping (None if unknown)
+    """
+
+    available = [_meminfo("MemAvailable")]
+
+    limit = _cgroup_memory_limit(cgroup_root)
+    usage = _cgroup_memory_usage(cgroup_root)
+    if limit is not None and usage is not None:
+        available.append(limit - usage)
+
+    available = [value for value in available if value is not None]
+    return min(available) if available else None
+
+
+def memory_pressure(cgroup_root: str = CGROUP_ROOT) -> Optional[float]:
+    """
+    Percentage of time some tasks were stalled on memory in the last 10 seconds
+
+    Returns:
+            Optional[float]: None if pressure stall information is unavailable
+    """
+
+    for path in (
+        os.path.join(cgroup_root, "memory.pressure"),
+        "/proc/pressure/memory",
+    ):
+        pressure = _read(path)
+        if pressure is None:
+            continue
+
+        for line in pressure.splitlines():
+            if line.startswith("some "):
+                fields = dict(field.split("=") for field in line.split()[1:])
+                return float(fields["avg10"])
+
+    return None
+
+
+class Scheduler:
+    """
+    Hands out slots to processes based on their cost
+
+    A job is admitted when its CPU slots fit in the CPU capacity, its memory
+    fits in the memory budget and the host is not under memory pressure. A job
+    is always admitted when nothing else is running, so jobs that are larger
+    than the whole capacity still run (on their own).
+
+    Attributes:
+            total_wait (float): Seconds that all jobs spent waiting for a slot
+            max_wait (float): Longest time a single job waited for a slot
+            jobs (int): Number of jobs admitted
+    """
+
+    def __init__(
+        self,
+        cpus: Optional[float] = None,
+        memory: Optional[int] = None,
+        memory_reserve: int = DEFAULT_MEMORY_RESERVE,
+        pressure_threshold: float = DEFAULT_PRESSURE_THRESHOLD,
+    ) -> None:
+
+        self.cpus = cpus if cpus is not None else available_cpus()
+        self.memory = memory if memory is not None else memory_limit()
+        self._memory_reserve = memory_reserve
+        self._pressure_threshold = pressure_threshold
+
+        self._running = 0
+        self._running_cpus = 0.0
+        self._running_memory = 0
+        self._condition = threading.Condition()
+        self._pressure_checked: Optional[float] = None
+        self._pressure = False
+
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.jobs = 0
+
+    def _read_pressure(self) -> bool:
+        pressure = memory_pressure()
+        if pressure is not None and pressure >= self._pressure_threshold:
+            return True
+
+        available = available_memory()
+        return available is not None and available < self._memory_reserve
+
+    def _under_pressure(self) -> bool:
+        # Every waiting job checks at each wake-up, so the answer is reused
+        # until the next poll interval instead of reading the files each time
+        now = time.monotonic()
+        if (
+            self._pressure_checked is None
+            or now - self._pressure_checked >= PRESSURE_POLL_INTERVAL
+        ):
+            self._pressure = self._read_pressure()
+            self._pressure_checked = now
+
+        return self._pressure
+
+    def _fits(self, cost: Cost) -> bool:
+        if self._running == 0:
+            return True
+
+        if self._running_cpus + cost.cpus > self.cpus:
+            return False
+
+        if (
+            cost.memory
+            and self.memory is not None
+            and self._running_memory + cost.memory > self.memory - self._memory_reserve
+        ):
+            return False
+
+        return not self._under_pressure()
+
+    def acquire(self, cost: Cost = LIGHT) -> float:
+        """
+        Wait until a job of the given cost may run and reserve its resources
+
+        Returns:
+                float: Seconds spent waiting
+        """
+
+        start = time.perf_counter()
+        with self._condition:
+            while not self._fits(cost):
+                # Wake up periodically, since memory pressure can go away
+                # without another job finishing
+                self._condition.wait(PRESSURE_POLL_INTERVAL)
+
+            self._running += 1
+            self._running_cpus += cost.cpus
+            self._running_memory += cost.memory
+
+            wait = time.perf_counter() - start
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.jobs += 1
+
+        return wait
+
+    def release(self, cost: Cost = LIGHT) -> None:
+        with self._condition:
+            self._running -= 1
+            self._running_cpus -= cost.cpus
+            self._running_memory -= cost.memory
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, cost: Cost = LIGHT) -> Iterator[float]:
+        """
+        Hold a slot for the duration of the block
+
+        Yields:
+                float: Seconds spent waiting for the slot
+        """
+
+        wait = self.acquire(cost)
+        try:
+            yield wait
+        finally:
+            self.release(cost)
+
+
+def get_scheduler() -> Scheduler:
+    global scheduler
+
+    if scheduler is None:
+        scheduler = Scheduler()
+
+    return scheduler
+
+
+def set_scheduler(new_scheduler: Optional[Scheduler]) -> None:
+    """
+    Replace the process-wide scheduler (None to create a default one on the
+    next use)
+    """
+
+    global scheduler
+
+    scheduler = new_scheduler
+
+
+scheduler = None
@@ -0,0 +1,379 @@
+"""
+Long-lived processes that take one request after another on stdin
+
+Many git plumbing commands (`hash-object --stdin-paths`, `update-index
+--index-info`, `update-ref --stdin`, ...) read requests from stdin until it is
+closed. A session keeps such a process open, so thousands of requests go
+through one process instead of one process each.
+
+Requests are written without waiting for the process to answer. Responses are
+read on a background thread and handed out as futures, and at most
+`max_in_flight` requests may be waiting for a response at a time.
+
+Sample usage:
+        git = Command('git', PATH_TO_REPO)
+        with git.session('hash_object', stdin_paths=True, response=read_line) as s:
+                futures = [s.request(path) for path in paths]
+                s.flush()
+                oids = [future.result() for future in futures]
+"""
+
+from __future__ import annotations
+import collections
+import locale
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future
+from contextlib import ExitStack
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from command.trace import traced
+
+# Default limit of requests waiting for a response
+DEFAULT_MAX_IN_FLIGHT = 1024
+
+# Reads one response from the stdout of the process
+ResponseReader = Callable[[IO[bytes]], Any]
+
+# Marks that a request uses the session's default response reader
+DEFAULT = object()
+
+
+def read_line(stdout: IO[bytes]) -> str:
+    """
+    Read one line of output (without the newline)
+
+    Raises:
+            EOFError: If the process exited
+    """
+
+    line = stdout.readline()
+    if not line.endswith(b"\n"):
+        raise EOFError
+
+    return line[:-1].decode(locale.getpreferredencoding(False))
+
+
+def read_fields(count: int, separator: bytes = b"\0") -> ResponseReader:
+    """
+    Create a reader for responses made of `count` separated fields
+
+    Returns:
+            ResponseReader: Reads the fields and returns them as a list of
+            strings
+    """
+
+    def read(stdout: IO[bytes]) -> List[str]:
+        fields = []
+        field = bytearray()
+        while len(fields) < count:
+            byte = stdout.read(1)
+            if not byte:
+                raise EOFError
+
+            if byte == separator:
+                fields.append(field.decode(locale.getpreferredencoding(False)))
+                field = bytearray()
+            else:
+                field += byte
+
+        return fields
+
+    return read
+
+
+class _ResponseFuture(Future):
+    """
+    Future that sends the buffered requests before waiting for its result, so
+    waiting for a response can never wait for a request that was not sent
+    """
+
+    def __init__(self, session: Session) -> None:
+        super().__init__()
+        self._session = session
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        if not self.done():
+            self._session._flush_stdin()
+
+        return super().result(timeout)
+
+    def exception(self, timeout: Optional[float] = None) -> Optional[BaseException]:
+        if not self.done():
+            self._session._flush_stdin()
+
+        return super().exception(timeout)
+
+
+class Session:
+    """
+    One long-lived process that takes requests on stdin
+
+    Sessions are usually created with Command.session().
+
+    Args:
+            command (List[str]): Full argument vector
+            working_dir (str): Working directory of the process
+            error (Type[Exception]): Raised (with the command and stderr) when the
+                    process fails
+            response (Optional[ResponseReader]): Reads the response to one
+                    request. If None, requests do not get responses by default.
+            max_in_flight (int): Maximum number of requests that may be waiting
+                    for a response. Making another request blocks until the
+                    oldest one is answered.
+            terminator (str): Appended to every request
+            env (Optional[Dict[str, str]]): Full environment of the process
+                    (None to inherit it)
+            queue_wait (float): Seconds spent waiting for a scheduler slot before
+                    the session was created (for its trace record)
+            on_close (Optional[Callable[[], None]]): Called once the process
+                    exited (whether it succeeded or not)
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        working_dir: str,
+        error: Type[Exception],
+        response: Optional[ResponseReader] = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        terminator: str = "\n",
+        env: Optional[Dict[str, str]] = None,
+        queue_wait: float = 0.0,
+        on_close: Optional[Callable[[], None]] = None,
+    ) -> None:
+
+        self.command = command
+        self._error = error
+        self._response = response
+        self._terminator = terminator
+        self._on_close = on_close
+        self._encoding = locale.getpreferredencoding(False)
+
+        # Stderr goes to a file, so a chatty process can never block on a full
+        # pipe that nobody reads
+        self._stderr = tempfile.TemporaryFile()
+
+        self._trace = ExitStack()
+        self._record = self._trace.enter_context(traced(command, working_dir))
+        self._record.queue_wait = queue_wait
+        self._proc = subprocess.Popen(
+            command,
+            cwd=working_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+            env=env,
+        )
+
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._pending: Deque[Tuple[Future, ResponseReader]] = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._failure: Optional[BaseException] = None
+
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+
+    def _read_responses(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+
+                if not self._pending:
+                    return
+
+                future, read_response = self._pending[0]
+
+            try:
+                result = read_response(self._proc.stdout)
+            except BaseException as e:
+                self._fail(e)
+                return
+
+            with self._condition:
+                self._pending.popleft()
+                self._condition.notify_all()
+
+            self._in_flight.release()
+            future.set_result(result)
+
+    def _fail(self, failure: BaseException) -> None:
+        # The process cannot be trusted to answer any more requests
+        if self._proc.poll() is None:
+            self._proc.kill()
+
+        with self._condition:
+            self._failure = failure
+            pending = list(self._pending)
+            self._pending.clear()
+            self._condition.notify_all()
+
+        for future, _ in pending:
+            self._in_flight.release()
+            future.set_exception(failure)
+
+    def request(
+        self, data: Union[str, bytes], response: Any = DEFAULT
+    ) -> Optional[Future]:
+        """
+        Send one request to the process
+
+        The request is buffered, so it may not reach the process until flush()
+        is called (or the buffer fills up).
+
+        Args:
+                data (Union[str, bytes]): Request (the terminator is added)
+                response (optional): Reader for the response to this request
+                        (None if there is none). Defaults to the reader of the
+                        session.
+
+        Returns:
+                Optional[Future]: Result of the response reader, or None if
+                the request does not get a response
+        """
+
+        if response is DEFAULT:
+            response = self._response
+
+        if isinstance(data, str):
+            data = data.encode(self._encoding)
+
+        if self._failure is not None:
+            raise self._process_error() from self._failure
+
+        future = None
+        if response is not None:
+            # Wait until the process answered enough of the earlier requests
+            # (which it can only do once it has received them)
+            if not self._in_flight.acquire(blocking=False):
+                self._flush_stdin()
+                self._in_flight.acquire()
+
+            future = _ResponseFuture(self)
+            with self._condition:
+                self._pending.append((future, response))
+                self._condition.notify_all()
+
+        try:
+            self._proc.stdin.write(data + self._terminator.encode(self._encoding))
+        except BrokenPipeError as e:
+            self._fail(e)
+            raise self._process_error() from e
+
+        return future
+
+    def _flush_stdin(self) -> None:
+        if self._proc.stdin.closed:
+            return
+
+        try:
+            self._proc.stdin.flush()
+        except BrokenPipeError as e:
+            self._fail(e)
+            raise self._process_error() from e
+
+    def flush(self) -> None:
+        """
+        Send all buffered requests and wait until all of them are answered
+
+        Call this at transaction boundaries (like after the last update of a
+        ref transaction).
+        """
+
+        self._flush_stdin()
+
+        with self._condition:
+            while self._pending:
+                self._condition.wait()
+
+        if self._failure is not None:
+            raise self._process_error() from self._failure
+
+    def _process_error(self) -> Exception:
+        self._proc.wait()
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode(self._encoding, errors="replace")
+        return self._error(self.command, stderr)
+
+    def close(self) -> None:
+        """
+        Close stdin and wait for the process to exit
+
+        Raises:
+                The error type supplied to the constructor if the process fails
+        """
+
+        if self._closed:
+            return
+
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        self._reader.join()
+
+        # Discard any output that is not a response, so the process does not
+        # block on (or fail writing to) its stdout
+        for _ in iter(lambda: self._proc.stdout.read(64 * 1024), b""):
+            pass
+
+        self._proc.stdout.close()
+        self._proc.wait()
+        self._record.exit_code = self._proc.returncode
+        self._trace.close()
+
+        try:
+            if self._proc.returncode != 0:
+                raise self._process_error()
+
+            if self._failure is not None:
+                raise self._process_error() from self._failure
+
+        finally:
+            self._stderr.close()
+            if self._on_close is not None:
+                self._on_close()
+
+    def abort(self) -> None:
+        """
+        Kill the process, discarding any requests it has not finished
+
+        Use this instead of close() when the requests sent so far must not take
+        effect (for example, when an error interrupted a half-written request).
+        """
+
+        if self._closed:
+            return
+
+        if self._proc.poll() is None:
+            self._proc.kill()
+
+        try:
+            self.close()
+        except self._error:
+            pass
+
+    def __enter__(self) -> Session:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,311 @@
+"""
+Starting processes through a small helper process
+
+Starting a process with fork() copies the page tables of the parent, so every
+command gets slower as the parent grows (for example, after many Java ASTs
+have been loaded). The spawner starts a helper process while the parent is
+still small and asks it to start commands instead. The helper gets the
+child's stdin, stdout and stderr as file descriptors, so the output still goes
+straight to the parent.
+
+Sample usage:
+        init_spawner()
+        ...  # Command now starts processes through the helper when it can
+        close_spawner()
+"""
+
+from __future__ import annotations
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from command import spawn_server
+
+# Requests that do not fit in one message are run directly
+MAX_MESSAGE_SIZE = spawn_server.MAX_MESSAGE_SIZE
+
+
+class SpawnError(OSError):
+    pass
+
+
+class SpawnedProcess(subprocess.CompletedProcess):
+    """
+    A process run by the helper
+
+    Attributes:
+            cpu_time (Optional[float]): User and system seconds used by the
+                    process (None if the helper could not tell)
+    """
+
+    def __init__(self, *args, cpu_time: Optional[float] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.cpu_time = cpu_time
+
+
+def _read_all(fd: int, chunks: List[bytes]) -> None:
+    with open(fd, "rb") as f:
+        chunks.append(f.read())
+
+
+class Spawner:
+    """
+    Connection to a helper process that starts processes for this process
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # Requests that were not answered yet, with the socket they were sent
+        # on
+        self._pending: Dict[int, Tuple[socket.socket, Future]] = {}
+        self._sock = None
+        self._proc = None
+
+        # Children read from the same stdin as the parent (if it has one)
+        try:
+            os.fstat(0)
+            self._stdin = 0
+        except OSError:
+            self._stdin = os.open(os.devnull, os.O_RDONLY)
+
+        self._start()
+
+    def _start(self) -> None:
+        if self._proc is not None:
+            # Reap the previous helper
+            self._proc.wait()
+
+        parent_sock, child_sock = socket.socketpair(
+            socket.AF_UNIX, socket.SOCK_SEQPACKET
+        )
+        with child_sock:
+            self._proc = subprocess.Popen(
+                [sys.executable, spawn_server.__file__, str(child_sock.fileno())],
+                stdin=subprocess.DEVNULL,
+                pass_fds=(child_sock.fileno(),),
+            )
+
+        self._sock = parent_sock
+        reader = threading.Thread(
+            target=self._read_responses, args=(parent_sock,), daemon=True
+        )
+        reader.start()
+
+    def _read_responses(self, sock: socket.socket) -> None:
+        while True:
+            try:
+                data = sock.recv(MAX_MESSAGE_SIZE)
+            except OSError:
+                data = b""
+
+            if not data:
+                break
+
+            response = json.loads(data)
+            with self._lock:
+                _, future = self._pending.pop(response["id"])
+
+            future.set_result(response)
+
+        # The helper exited, so the remaining requests will never be answered
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
+
+            sock.close()
+
+            pending = [
+                self._pending.pop(request_id)[1]
+                for request_id, (request_sock, _) in list(self._pending.items())
+                if request_sock is sock
+            ]
+
+        for future in pending:
+            future.set_exception(SpawnError("The spawn helper exited"))
+
+    @staticmethod
+    def _request(
+        request_id: int,
+        command: List[str],
+        cwd: str,
+        env: Optional[Dict[str, str]],
+    ) -> bytes:
+        return json.dumps(
+            {"id": request_id, "argv": command, "cwd": cwd, "env": env}
+        ).encode()
+
+    def accepts(
+        self, command: List[str], cwd: str, env: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """
+        Check if a command is small enough to be sent to the helper
+        """
+
+        # The id takes more space than the placeholder
+        return len(Spawner._request(0, command, cwd, env)) + 32 < MAX_MESSAGE_SIZE
+
+    def _send(
+        self,
+        command: List[str],
+        cwd: str,
+        env: Optional[Dict[str, str]],
+        fds: List[int],
+    ) -> Future:
+        future = Future()
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            request = Spawner._request(request_id, command, cwd, env)
+
+            for attempt in range(2):
+                # Restart the helper if it exited (the request was not sent
+                # yet)
+                if self._sock is None:
+                    self._start()
+
+                sock = self._sock
+                self._pending[request_id] = (sock, future)
+                try:
+                    socket.send_fds(sock, [request], fds)
+                    break
+
+                except OSError:
+                    del self._pending[request_id]
+                    if attempt == 1:
+                        raise
+
+                    # The helper died before the reader thread noticed
+                    sock.shutdown(socket.SHUT_RDWR)
+                    self._sock = None
+
+        return future
+
+    def run(
+        self,
+        command: List[str],
+        cwd: str,
+        capture_output: bool,
+        env: Optional[Dict[str, str]] = None,
+    ) -> SpawnedProcess:
+        """
+        Run a command to completion, like `subprocess.run()`
+
+        Args:
+                command (List[str])
+                cwd (str)
+                capture_output (bool)
+                env (Optional[Dict[str, str]]): Variables to add to the
+                        environment of the process
+
+        Raises:
+                FileNotFoundError: If the executable does not exist (and other
+                        errors raised while starting the process)
+                SpawnError: If the helper exited before the process finished
+        """
+
+        if not capture_output:
+            future = self._send(command, cwd, env, [self._stdin, 1, 2])
+            stdout = stderr = None
+
+        else:
+            stdout_read, stdout_write = os.pipe()
+            stderr_read, stderr_write = os.pipe()
+            try:
+                future = self._send(
+                    command, cwd, env, [self._stdin, stdout_write, stderr_write]
+                )
+            except OSError:
+                for fd in (stdout_read, stderr_read):
+                    os.close(fd)
+                raise
+            finally:
+                # Only the child writes to the pipes now
+                os.close(stdout_write)
+                os.close(stderr_write)
+
+            # Read stderr on another thread, so the child can never block on
+            # a full pipe
+            stderr_chunks = []
+            stderr_reader = threading.Thread(
+                target=_read_all, args=(stderr_read, stderr_chunks)
+            )
+            stderr_reader.start()
+
+            stdout_chunks = []
+            _read_all(stdout_read, stdout_chunks)
+            stderr_reader.join()
+
+            stdout = stdout_chunks[0]
+            stderr = stderr_chunks[0]
+
+        response = future.result()
+        if "returncode" not in response:
+            raise OSError(response["errno"], response["error"])
+
+        return SpawnedProcess(
+            command,
+            response["returncode"],
+            stdout=stdout,
+            stderr=stderr,
+            cpu_time=response.get("cpu_time"),
+        )
+
+    def close(self) -> None:
+        """
+        Stop the helper (processes it already started keep running)
+        """
+
+        with self._lock:
+            sock = self._sock
+            self._sock = None
+
+        if sock is not None:
+            # Wakes up the thread reading responses, and tells the helper to
+            # exit
+            sock.shutdown(socket.SHUT_RDWR)
+
+        if self._proc is not None:
+            self._proc.wait()
+
+        if self._stdin != 0:
+            os.close(self._stdin)
+
+
+def get_spawner() -> Optional[Spawner]:
+    return spawner
+
+
+def init_spawner() -> Optional[Spawner]:
+    """
+    Start the helper process, so Command starts processes through it
+
+    Should be called early, while this process is still small. Does nothing on
+    platforms that cannot pass file descriptors between processes.
+
+    Returns:
+            Optional[Spawner]: None if the platform is unsupported
+    """
+
+    global spawner
+
+    if spawner is None and hasattr(socket, "send_fds") and hasattr(socket, "AF_UNIX"):
+        spawner = Spawner()
+
+    return spawner
+
+
+def close_spawner() -> None:
+    global spawner
+
+    if spawner is not None:
+        spawner.close()
+        spawner = None
+
+
+spawner = None
@@ -0,0 +1,103 @@
+"""
+Helper process that starts child processes on behalf of a (large) parent
+
+This file is run as a script by command.spawn, so it must not import anything
+from the rest of the package. Requests arrive on a SOCK_SEQPACKET socket, one
+per message: a JSON object with an id, argv and working directory, along with
+the child's stdin, stdout and stderr as file descriptors (and optionally
+environment variables to add). Every request is answered with a JSON object
+holding the same id and either the exit code and CPU time of the child or the
+error that prevented it from starting.
+
+Children are reaped here, so their CPU time only shows up in the resource
+usage of this process. That is why it is sent back with the exit code.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+# Must match command.spawn
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+def _exit_code(status: int) -> int:
+    # Same as Popen.returncode (negative for a signal)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+
+    return os.WEXITSTATUS(status)
+
+
+def _wait(proc: subprocess.Popen) -> dict:
+    # Reap the child with its own resource usage
+    while True:
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+            break
+        except InterruptedError:
+            continue
+
+    proc.returncode = _exit_code(status)
+    return {
+        "returncode": proc.returncode,
+        "cpu_time": usage.ru_utime + usage.ru_stime,
+    }
+
+
+def _run(sock: socket.socket, lock: threading.Lock, request: dict, fds: list) -> None:
+    env = None
+    if request.get("env") is not None:
+        env = {**os.environ, **request["env"]}
+
+    try:
+        proc = subprocess.Popen(
+            request["argv"],
+            cwd=request["cwd"],
+            stdin=fds[0],
+            stdout=fds[1],
+            stderr=fds[2],
+            env=env,
+        )
+    except OSError as e:
+        response = {"id": request["id"], "errno": e.errno, "error": str(e)}
+    else:
+        response = None
+    finally:
+        # The child has its own copies now
+        for fd in fds:
+            try:
+                socket.close(fd)
+            except OSError:
+                pass
+
+    if response is None:
+        response = {"id": request["id"], **_wait(proc)}
+
+    with lock:
+        sock.send(json.dumps(response).encode())
+
+
+def main(fd: int) -> None:
+    sock = socket.socket(fileno=fd)
+    lock = threading.Lock()
+
+    while True:
+        try:
+            data, fds, _, _ = socket.recv_fds(sock, MAX_MESSAGE_SIZE, 3)
+        except OSError:
+            break
+
+        # The parent closed its end
+        if not data:
+            break
+
+        request = json.loads(data)
+        threading.Thread(target=_run, args=(sock, lock, request, fds)).start()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]))
@@ -0,0 +1,127 @@
+"""
+Hooks for observing every process run through Command
+
+Sample usage:
+        def print_record(record: CommandRecord) -> None:
+                print(record.command, record.wall_time)
+
+        add_hook(print_record)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+class CommandRecord:
+    """
+    Measurements for one process
+
+    Attributes:
+            command (List[str]): Full argument vector
+            cwd (str): Working directory of the process
+            thread (int): Identifier of the thread that ran the process
+            queue_wait (float): Seconds spent waiting for a scheduler slot before
+                    the process was started
+            start (float): `time.perf_counter()` when the process was started
+            wall_time (float): Seconds until the process finished
+            cpu_time (Optional[float]): User and system seconds used by child
+                    processes in the meantime (None if unsupported). When
+                    several commands run concurrently, their CPU time cannot be
+                    told apart.
+            exit_code (Optional[int]): None if the process could not be run
+            output_size (int): Number of characters (or bytes) of captured
+                    output
+    """
+
+    __slots__ = (
+        "command",
+        "cwd",
+        "thread",
+        "queue_wait",
+        "start",
+        "wall_time",
+        "cpu_time",
+        "exit_code",
+        "output_size",
+    )
+
+    def __init__(self, command: List[str], cwd: str) -> None:
+        self.command = command
+        self.cwd = cwd
+        self.thread = threading.get_ident()
+        self.queue_wait = 0.0
+        self.start = None
+        self.wall_time = None
+        self.cpu_time = None
+        self.exit_code = None
+        self.output_size = 0
+
+
+Hook = Callable[[CommandRecord], None]
+
+_hooks: List[Hook] = []
+
+
+def add_hook(hook: Hook) -> None:
+    """
+    Call `hook` with a CommandRecord after every process run through Command
+    """
+
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    _hooks.remove(hook)
+
+
+def children_cpu_time() -> Optional[float]:
+    """
+    Returns:
+            Optional[float]: User and system seconds used by the child processes
+            of this process that were reaped so far (None if unsupported)
+    """
+
+    if resource is None:
+        return None
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def traced(
+    command: List[str], cwd: str, measure_cpu: bool = True
+) -> Iterator[CommandRecord]:
+    """
+    Measure the process run inside the block and pass the result to the hooks
+
+    The block is responsible for setting `exit_code` and `output_size` on the
+    yielded record. If `measure_cpu` is False, it sets `cpu_time` too (for
+    processes that are not reaped by this process).
+    """
+
+    record = CommandRecord(command, cwd)
+    if not _hooks:
+        yield record
+        return
+
+    cpu_before = children_cpu_time() if measure_cpu else None
+    record.start = time.perf_counter()
+    try:
+        yield record
+
+    finally:
+        record.wall_time = time.perf_counter() - record.start
+        if cpu_before is not None:
+            record.cpu_time = children_cpu_time() - cpu_before
+
+        for hook in list(_hooks):
+            hook(record)
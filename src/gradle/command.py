@@ -1,9 +1,14 @@
 import os
 
-from command import Command
+from command import AsyncCommand, Command
+from command.pipe import Stage
+from command.scheduler import HEAVY
 
 
 class Gradle(Command):
+    # Gradle tasks run in a JVM, and decompiling uses several cores
+    cost = HEAVY
+
     # `capture_output` is set to False by default because gradle commands can
     # be very verbose and can cause the command to hang on windows
     def __init__(self, project_dir: str, capture_output=False) -> None:
@@ -24,6 +29,9 @@ class Gradle(Command):
 
         return func
 
+    def stage(self, task: str, *args, **kwargs) -> Stage:
+        return super().stage(task, *args, quiet=True, **kwargs)
+
     @staticmethod
     def _executable(project_dir: str) -> bool:
         """
@@ -38,3 +46,13 @@ class Gradle(Command):
             return gradlew_exec
 
         return "gradle"
+
+
+class AsyncGradle(Gradle, AsyncCommand):
+    """
+    Gradle context whose tasks return coroutines
+
+    Sample usage:
+            gradle = AsyncGradle(PROJECT_DIR)
+            await gradle.decompileCFR()
+    """
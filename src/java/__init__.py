@@ -1,13 +1,15 @@
+import io
 import os
 from typing import Dict, List, Tuple, Union
 
-import git
 import javalang
 from javalang.ast import Node
 from javalang.tokenizer import Identifier, tokenize
 from javalang.tree import MemberReference, VariableDeclaration
 
-from java.blob import get_blob
+from mint.objects import blob_oid
+from mint.repo import Repo
+from mint.session import NULL_OID
 
 
 class JavaAnalyzationError(Exception):
@@ -122,7 +124,7 @@ def filter_ast_node(node: Node, t: type) -> List[Union[Node, str]]:
 
 
 def chunk_ast_nodes_by_path(
-    nodes: List[Tuple[List, Node]]
+    nodes: List[Tuple[List, Node]],
 ) -> List[Tuple[List, List[Node]]]:
 
     chunks = []
@@ -375,38 +377,44 @@ def undo_variable_renames(code: str, renamed_var_names: List[Tuple]) -> str:
     return "\n".join(lines)
 
 
-def undo_renames(repo: git.Repo) -> None:
-    # Since mint does not parse commits into objects, the repo needs to be a #
-    # gitpython repo
+def _decode_text(data: bytes) -> str:
+    # Decode a file like `open(path, "r")` would (with the locale's encoding and
+    # universal newlines), so the code is split into the same lines
+    return io.TextIOWrapper(io.BytesIO(data)).read()
 
-    commit1 = repo.commit("HEAD")
-    commit2 = None  # working tree
-    diff_index = commit1.diff(commit2)
 
+def undo_renames(repo: Repo) -> None:
     updated_count = 0
 
-    # For each file changed (in reverse, with indices, so we can remove elements
-    # in the for loop)
-    for diff in diff_index:
+    # Compare HEAD with the working tree
+    for entry in repo.diff_index("HEAD"):
         # Only process modified files (no new, deleted, ... files)
-        if diff.change_type != "M":
+        if entry.status != "M":
             continue
 
         # Only process Java files; leave everything else unchanged
-        if not diff.a_path.endswith(".java"):
+        if not entry.src_path.endswith(".java"):
             continue
 
-        source = get_blob(repo, commit1, diff.a_path)
-        target = get_blob(repo, commit2, diff.b_path)
+        p = os.path.join(repo.path, entry.dst_path)
+        with open(p, "rb") as f:
+            target_data = f.read()
+
+        # Files that were rewritten with the same content are listed too (the
+        # index only knows that they were touched)
+        if entry.dst_oid == NULL_OID and blob_oid(target_data) == entry.src_oid:
+            continue
+
+        source = _decode_text(repo.reader.read(entry.src_oid))
+        target = _decode_text(target_data)
 
         try:
             renamed_variables = get_renamed_variables(source, target)
         except JavaAnalyzationError as e:
-            raise Exception(f"{e} [{diff.a_path} -> {diff.b_path}]")
+            raise Exception(f"{e} [{entry.src_path} -> {entry.dst_path}]")
 
         if renamed_variables is not None:
             updated_target = undo_variable_renames(target, renamed_variables)
-            p = os.path.join(repo.working_tree_dir, diff.a_path)
             with open(p, "w") as f:
                 f.write(updated_target)
 
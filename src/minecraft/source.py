@@ -1,11 +1,12 @@
 import os
 import shutil
-import subprocess
 
 import click
 
+from command import Command, CommandError
+from command.scheduler import HEAVY
 from gradle.project import Project
-from mint.repo import Repo
+from mint.repo import BLOBLESS, Repo
 
 from minecraft.version import Version
 
@@ -14,14 +15,37 @@ DECOMPILER_MC_REMOTE_URL = "https://github.com/hube12/DecompilerMC.git"
 YARN_REMOTE_URL = "https://github.com/FabricMC/yarn.git"
 
 
-def _setup_decompiler(local_dir: str, remote_url: str) -> Repo:
+class DecompilerError(CommandError):
+    pass
+
+
+class DecompilerMC(Command):
+    """
+    Context for running DecompilerMC's main.py
+
+    Sample usage:
+            decompiler = DecompilerMC(PATH_TO_DECOMPILER)
+            decompiler.run(mcv='1.18', s='client')
+    """
+
+    # DecompilerMC runs a JVM decompiler
+    cost = HEAVY
+
+    def __init__(self, decompiler_dir: str) -> None:
+        super().__init__("python3", working_dir=decompiler_dir, error=DecompilerError)
+
+    def run(self, **kwargs) -> None:
+        self._call("main.py", [], kwargs)
+
+
+def _setup_decompiler(local_dir: str, remote_url: str, **clone_options) -> Repo:
     if os.path.exists(os.path.join(local_dir, ".git")):
         # Used cached yarn repo
         return Repo(local_dir)
     else:
         # Clone the yarn repo
         click.echo(f"Cloning {remote_url} into {local_dir}")
-        return Repo.clone(remote_url, local_dir)
+        return Repo.clone(remote_url, local_dir, **clone_options)
 
 
 def _generate_sources_with_yarn(version: Version, path: str) -> None:
@@ -31,12 +55,20 @@ def _generate_sources_with_yarn(version: Version, path: str) -> None:
         shutil.rmtree(old_decompiler_path)
 
     decompiler_path = os.path.join(path, "yarn")
-    decompiler_repo = _setup_decompiler(decompiler_path, YARN_REMOTE_URL)
+    # Yarn has a long history and a branch for every version, but only the
+    # latest commit of a few branches is ever needed (and their files are
+    # downloaded when they are checked out)
+    decompiler_repo = _setup_decompiler(
+        decompiler_path, YARN_REMOTE_URL, filter=BLOBLESS, depth=1
+    )
 
     click.echo(f"Updating mappings to version {version}")
 
-    # Get latest versions from remote
-    decompiler_repo.git.fetch(prune=True)
+    # Get the latest commit of the version's branch from the remote. Clones
+    # made by older versions of shulkr have the full history, which a depth
+    # would throw away.
+    fetch_options = {"depth": 1} if decompiler_repo.is_shallow() else {}
+    decompiler_repo.fetch_branches("origin", str(version), **fetch_options)
 
     decompiler_repo.git.reset("HEAD", hard=True)
     decompiler_repo.git.clean(force=True, d=True)
@@ -80,7 +112,7 @@ def _generate_sources_with_mojang(version: Version, path: str) -> None:
             version (Version):
 
     Raises:
-            Exception: If DecompilerMC fails
+            DecompilerError: If DecompilerMC fails
     """
 
     # Remove decompiler generated by previous versions of shulkr
@@ -89,18 +121,15 @@ def _generate_sources_with_mojang(version: Version, path: str) -> None:
         shutil.rmtree(old_decompiler_path)
 
     decompiler_path = os.path.join(path, "DecompilerMC")
-    decompiler_repo = _setup_decompiler(decompiler_path, DECOMPILER_MC_REMOTE_URL)
+    decompiler_repo = _setup_decompiler(
+        decompiler_path, DECOMPILER_MC_REMOTE_URL, depth=1
+    )
 
     click.echo("Running decompiler")
 
     # Decompile client
-    p = subprocess.run(
-        ["python3", "main.py", "--mcv", str(version), "-s", "client", "-c", "-f", "-q"],
-        stderr=subprocess.PIPE,
-        cwd=decompiler_repo.path,
-    )
-    if p.returncode != 0:
-        raise Exception(p.stderr.decode())
+    decompiler = DecompilerMC(decompiler_repo.path)
+    decompiler.run(mcv=version, s="client", c=True, f=True, q=True)
 
     click.echo("Moving generated sources")
 
@@ -27,6 +27,15 @@ class Version:
     def __str__(self) -> str:
         return self.id
 
+    @property
+    def index(self) -> int:
+        """
+        Position of the version in the manifest, counting from the oldest
+        version (it never changes when new versions are released)
+        """
+
+        return self._index
+
     def __lt__(self, other) -> bool:
         if not isinstance(other, Version):
             return False
@@ -251,6 +260,14 @@ class Manifest:
         )
 
 
+def fetch_manifest() -> Dict:
+    """
+    Download the raw version manifest
+    """
+
+    return requests.get(MANIFEST_LOCATION).json()
+
+
 def load_manifest(
     raw: Optional[Dict] = None,
     earliest_supported_version_id: Optional[str] = EARLIEST_SUPPORTED_VERSION_ID,
@@ -259,7 +276,7 @@ def load_manifest(
     global manifest
 
     if raw is None:
-        raw = requests.get(MANIFEST_LOCATION).json()
+        raw = fetch_manifest()
     manifest = Manifest.parse(raw, earliest_supported_version_id)
 
 
@@ -0,0 +1,254 @@
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from command import Command
+from command.pipe import Stage
+from command.session import Session
+
+
+# Subcommands that never change the repo, and whose results only depend on
+# HEAD, the refs and the index (so they can be cached)
+QUERY_SUBCOMMANDS = {"describe", "rev-parse", "for-each-ref", "show-ref"}
+
+# Other subcommands that never change HEAD, the refs or the index. Their
+# results depend on more than that (like the working tree, or the time), so
+# they are not cached either.
+READ_ONLY_SUBCOMMANDS = {
+    "cat-file",
+    "check-attr",
+    "count-objects",
+    "diff",
+    "diff-index",
+    "diff-tree",
+    "log",
+    "ls-files",
+    "ls-tree",
+    "merge-base",
+    "rev-list",
+    "show",
+    "status",
+    "var",
+}
+
+# Number of changes made to each repo (by its common git directory) through the
+# CachedCommands of this process. Changes are shared this way because two of
+# them can be too close together to show in the timestamps of the files.
+_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+
+class CachedCommand(Command):
+    """
+    Git context that remembers the results of read-only queries
+
+    Queries (describe, rev-parse, for-each-ref, show-ref and listing tags) are
+    only run again when HEAD, the refs or the index change, whoever changed
+    them. Read-only subcommands (READ_ONLY_SUBCOMMANDS) are passed through. Any
+    other subcommand run through a CachedCommand (including streams, sessions
+    and binary output) is assumed to modify the repo, so it clears the cache of
+    every CachedCommand for the same repo (including linked worktrees and ones
+    with a private index) when it starts and once it is done.
+
+    Sample usage:
+            git = CachedCommand('git', PATH_TO_REPO, error=GitError)
+            git.describe(tags=True)  # runs git
+            git.describe(tags=True)  # cached
+            git.tag('1.18')  # clears the cache
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        self._cache: Dict[Tuple[str, ...], Tuple[bool, Any]] = {}
+        self._cache_state = None
+        # Git directory and common git directory, once they are known
+        self._git_dirs: Optional[Tuple[str, str]] = None
+
+    @staticmethod
+    def _is_query(subcommand: str, args: List[Any], kwargs: Dict[str, Any]) -> bool:
+        if subcommand == "tag":
+            # `git tag` only lists tags when it is not given a tag name
+            return not args or bool(kwargs.get("l") or kwargs.get("list"))
+
+        if subcommand == "describe":
+            # The result of --dirty and --broken depends on the working tree
+            return not any(key in kwargs for key in ("dirty", "broken")) and not any(
+                str(arg).startswith(("--dirty", "--broken")) for arg in args
+            )
+
+        return subcommand in QUERY_SUBCOMMANDS
+
+    @staticmethod
+    def _changes_repo(subcommand: str, args: List[Any], kwargs: Dict[str, Any]) -> bool:
+        return subcommand not in READ_ONLY_SUBCOMMANDS and not CachedCommand._is_query(
+            subcommand, args, kwargs
+        )
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _find_git_dirs(self) -> Optional[Tuple[str, str]]:
+        # In a linked worktree, `.git` is a file, and HEAD and the index are
+        # kept apart from the refs (in the common directory)
+        if self._git_dirs is None:
+            try:
+                output = super()._call(
+                    "rev-parse", ["--absolute-git-dir", "--git-common-dir"], {}
+                )
+            except (self._error, OSError):
+                # Not a repo (yet)
+                return None
+
+            git_dir, common_dir = output.split("\n")
+            common_dir = os.path.normpath(os.path.join(self._working_dir, common_dir))
+            self._git_dirs = (git_dir, common_dir)
+
+        return self._git_dirs
+
+    def _state(self) -> Optional[Tuple]:
+        """
+        Cheap fingerprint of HEAD, the refs and the index
+
+        Returns:
+                Optional[Tuple]: None if the state could not be determined
+        """
+
+        git_dirs = self._find_git_dirs()
+        if git_dirs is None:
+            return None
+
+        git_dir, common_dir = git_dirs
+        try:
+            with open(os.path.join(git_dir, "HEAD")) as head_file:
+                head = head_file.read().strip()
+        except OSError:
+            return None
+
+        ref = None
+        if head.startswith("ref: "):
+            ref = CachedCommand._stat(os.path.join(common_dir, head[len("ref: ") :]))
+
+        # Writing a loose ref renames a file into its directory, which changes
+        # the directory's modification time
+        ref_dirs = tuple(
+            (path, CachedCommand._stat(path))
+            for path, _, _ in os.walk(os.path.join(common_dir, "refs"))
+        )
+
+        index = os.path.join(git_dir, "index")
+        if self._env is not None and "GIT_INDEX_FILE" in self._env:
+            index = self._env["GIT_INDEX_FILE"]
+
+        return (
+            _generations.get(common_dir, 0),
+            head,
+            ref,
+            CachedCommand._stat(os.path.join(common_dir, "packed-refs")),
+            ref_dirs,
+            CachedCommand._stat(index),
+        )
+
+    def invalidate(self) -> None:
+        """
+        Forget the results of all previous queries, here and in the other
+        CachedCommands for the same repo
+        """
+
+        self._cache.clear()
+        if self._git_dirs is not None:
+            common_dir = self._git_dirs[1]
+            with _generations_lock:
+                _generations[common_dir] = _generations.get(common_dir, 0) + 1
+
+    def _query(self, subcommand: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        state = self._state()
+        if state is None:
+            return super()._call(subcommand, args, kwargs)
+
+        if state != self._cache_state:
+            # Someone else changed the repo (so the other CachedCommands will
+            # notice by themselves)
+            self._cache.clear()
+            self._cache_state = state
+
+        key = tuple(self._raw_command(subcommand, args, kwargs))
+        if key not in self._cache:
+            try:
+                self._cache[key] = (True, super()._call(subcommand, args, kwargs))
+            except self._error as e:
+                # Failed queries (like describing a repo without tags) are just
+                # as deterministic as successful ones
+                self._cache[key] = (False, e)
+
+        succeeded, result = self._cache[key]
+        if not succeeded:
+            raise result
+
+        return result
+
+    def _call(self, subcommand: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        if CachedCommand._is_query(subcommand, args, kwargs):
+            return self._query(subcommand, args, kwargs)
+
+        if subcommand in READ_ONLY_SUBCOMMANDS:
+            return super()._call(subcommand, args, kwargs)
+
+        self.invalidate()
+        try:
+            return super()._call(subcommand, args, kwargs)
+        finally:
+            self.invalidate()
+
+    def stage(self, subcommand: str, *args, **kwargs) -> Stage:
+        # Stages are never cached, since their input comes from another process
+        subcommand = subcommand.replace("_", "-")
+        if CachedCommand._changes_repo(subcommand, args, kwargs):
+            self.invalidate()
+
+        return super().stage(subcommand, *args, **kwargs)
+
+    def binary(self, subcommand: str, *args, **kwargs) -> memoryview:
+        subcommand = subcommand.replace("_", "-")
+        if not CachedCommand._changes_repo(subcommand, args, kwargs):
+            return super().binary(subcommand, *args, **kwargs)
+
+        self.invalidate()
+        try:
+            return super().binary(subcommand, *args, **kwargs)
+        finally:
+            self.invalidate()
+
+    def session(self, subcommand: str, *args, **kwargs) -> Session:
+        # Sessions like `update-ref --stdin` change the repo for as long as
+        # they run, so the cache is cleared when they start and once their
+        # process exited
+        subcommand = subcommand.replace("_", "-")
+        if not CachedCommand._changes_repo(subcommand, args, kwargs):
+            return super().session(subcommand, *args, **kwargs)
+
+        self.invalidate()
+        return super().session(subcommand, *args, on_close=self.invalidate, **kwargs)
+
+    def _invalidate_after(self, records: Iterator[str]) -> Iterator[str]:
+        try:
+            yield from records
+        finally:
+            self.invalidate()
+
+    def stream(
+        self, subcommand: str, *args, separator: str = "\n", **kwargs
+    ) -> Iterator[str]:
+        subcommand = subcommand.replace("_", "-")
+        records = super().stream(subcommand, *args, separator=separator, **kwargs)
+        if not CachedCommand._changes_repo(subcommand, args, kwargs):
+            return records
+
+        self.invalidate()
+        return self._invalidate_after(records)
@@ -0,0 +1,239 @@
+"""
+Committing snapshots of directories through a private index
+
+`git add` stats every file in the working tree and hashes the ones whose stat
+data changed. When a generator rewrites the whole tree, every file looks
+changed, so every file is hashed and written again. CommitBuilder compares the
+files that `git status` reports with the previous commit itself (by size
+first, and only by content if the sizes match), and only writes the ones that
+really changed. The commits
+are built in an index file of their own, so the repo's index is only touched
+to record the changes.
+
+Sample usage:
+        with CommitBuilder(repo) as builder:
+                for version in versions:
+                        generate(version)
+                        builder.commit(f'Minecraft {version}', 'src')
+                        builder.tag(str(version))
+                        builder.checkpoint()
+"""
+
+from __future__ import annotations
+import os
+import stat
+from typing import Dict, List, Optional, Tuple
+
+from mint.objects import blob_oid
+from mint.repo import Repo
+from mint.session import NULL_OID, IndexUpdater, ObjectWriter, RefTransaction
+from mint.snapshot import Snapshot, Snapshots, file_mode
+
+
+# Name of the private index file (in the git directory)
+INDEX_FILE = "mint-commit-index"
+
+
+def _file_mode(info: os.stat_result) -> str:
+    mode = file_mode(info)
+    if mode == "120000":
+        # `hash-object --stdin-paths` would hash the file the link points to
+        raise ValueError("Symbolic links cannot be committed with CommitBuilder")
+
+    return mode
+
+
+class CommitBuilder:
+    """
+    Commits snapshots of directories in the working tree without `git add`
+
+    Each commit only writes the files that changed since the previous commit
+    (`git hash-object -w --stdin-paths`), applies them to a private index
+    that starts out as the tree of HEAD (`git update-index --index-info`), and
+    commits the tree of that index (`git write-tree` and `git commit-tree`).
+    Only the files that `git status` reports and the ones committed since the
+    last checkpoint are compared with the previous commit, and files whose
+    size did not change are only written if their content did.
+    Clean filters are applied to the files that are written, but .gitignore is
+    not.
+
+    Like with FastImport, the branch and the tags only change at checkpoint(),
+    in one ref transaction (`git update-ref --stdin`) that fails instead of
+    moving a tag that exists. The repo's index is updated with the files that
+    changed at the same time, so it matches the new commit.
+
+    Args:
+            repo (Repo)
+            ref (Optional[str]): Branch to commit to. Defaults to the branch
+                    HEAD points to.
+    """
+
+    def __init__(self, repo: Repo, ref: Optional[str] = None) -> None:
+        if ref is None:
+            ref = repo.git.symbolic_ref("HEAD")
+
+        self._repo = repo
+        self._ref = ref
+        self._parent = repo.head_commit()
+        # What the branch points to in the repo (it only moves at checkpoints)
+        self._tip = self._parent
+        # Commit of each tag to write at the next checkpoint
+        self._tags: Dict[str, str] = {}
+
+        git_dir = repo.git.rev_parse(absolute_git_dir=True)
+        self._index = Repo(
+            repo.path,
+            check_path=False,
+            index_file=os.path.join(git_dir, INDEX_FILE),
+            config=repo.config,
+        )
+        if self._parent is None:
+            self._index.git.read_tree(empty=True)
+        else:
+            self._index.git.read_tree(self._parent)
+
+        self._snapshots = Snapshots(repo, self._parent)
+
+    def _is_unchanged(
+        self, path: str, mode: str, size: int, snapshot: Snapshot
+    ) -> bool:
+        # Only read files that could not have changed according to their size
+        if path not in snapshot:
+            return False
+
+        old_mode, old_oid, old_size = snapshot[path]
+        if old_mode != mode or old_size != size:
+            return False
+
+        with open(os.path.join(self._repo.path, path), "rb") as f:
+            return blob_oid(f.read()) == old_oid
+
+    def commit(self, message: str, *directories: str) -> int:
+        """
+        Commit the current contents of some directories
+
+        Everything outside of the directories stays as it was in the previous
+        commit. The directories must not contain each other.
+
+        Args:
+                message (str): Commit message
+                directories (str): Paths relative to the repo
+
+        Returns:
+                int: Number of files that changed
+        """
+
+        # Directory, path, mode and size of each file to write
+        changed: List[Tuple[str, str, str, int]] = []
+        # Directory and path of each file to remove
+        removed: List[Tuple[str, str]] = []
+        for directory in directories:
+            snapshot = self._snapshots.get(directory)
+
+            for path in self._snapshots.changed_paths(directory):
+                try:
+                    info = os.lstat(os.path.join(self._repo.path, path))
+                except (FileNotFoundError, NotADirectoryError):
+                    info = None
+
+                if info is None or stat.S_ISDIR(info.st_mode):
+                    if path in snapshot:
+                        removed.append((directory, path))
+
+                    continue
+
+                mode = _file_mode(info)
+                if not self._is_unchanged(path, mode, info.st_size, snapshot):
+                    changed.append((directory, path, mode, info.st_size))
+
+        # Write the objects in one batch, before changing anything else
+        oids = []
+        if changed:
+            with ObjectWriter(self._repo) as objects:
+                futures = [objects.write(path) for _, path, _, _ in changed]
+                objects.flush()
+                oids = [future.result() for future in futures]
+
+        if changed or removed:
+            with IndexUpdater(self._index) as index:
+                for (_, path, mode, _), oid in zip(changed, oids):
+                    index.add(mode, oid, path)
+
+                for _, path in removed:
+                    index.remove(path)
+
+        tree = self._index.git.write_tree()
+        parents = [] if self._parent is None else ["-p", self._parent]
+        self._parent = self._repo.git.commit_tree(*parents, tree, m=message)
+
+        for (directory, path, mode, size), oid in zip(changed, oids):
+            self._snapshots.add(directory, path, mode, oid, size)
+
+        for directory, path in removed:
+            self._snapshots.remove(directory, path)
+
+        return len(changed) + len(removed)
+
+    def tag(self, name: str) -> None:
+        """
+        Point a new lightweight tag at the last commit
+
+        The tag is created at the next checkpoint, which fails if a tag with
+        the same name exists.
+        """
+
+        if self._parent is None:
+            raise ValueError("Nothing has been committed yet")
+
+        self._tags[name] = self._parent
+
+    def checkpoint(self) -> None:
+        """
+        Point the branch at the last commit, write the tags and update the
+        repo's index to match
+
+        Raises:
+                GitError: If someone else moved the branch since the last
+                        checkpoint, or one of the tags exists (in which case no
+                        refs are changed)
+        """
+
+        self._update_refs()
+        self._snapshots.update_index()
+
+    def _update_refs(self) -> None:
+        if self._parent == self._tip and not self._tags:
+            return
+
+        with RefTransaction(self._repo) as refs:
+            if self._parent != self._tip:
+                refs.update(self._ref, self._parent, self._tip or NULL_OID)
+
+            for name, commit in self._tags.items():
+                refs.create(f"refs/tags/{name}", commit)
+
+            refs.commit()
+
+        self._tip = self._parent
+        self._tags.clear()
+
+    def close(self) -> None:
+        """
+        Write everything committed so far to the repo (see checkpoint()) and
+        delete the private index
+        """
+
+        try:
+            self.checkpoint()
+        finally:
+            self._index.close()
+            try:
+                os.remove(self._index.index_file)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> CommitBuilder:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,225 @@
+"""
+Committing snapshots of directories through one long-running `git fast-import`
+
+`git add` stats and hashes every file in the working tree and rewrites the
+index, so committing a large generated tree over and over is slow.
+FastImport asks `git status` which files may have changed, and only sends the
+ones that did to `git fast-import`, which keeps running for every commit made
+with it.
+
+Sample usage:
+        with FastImport(repo) as fast_import:
+                for version in versions:
+                        generate(version)
+                        fast_import.commit(f'Minecraft {version}', 'src')
+                        fast_import.tag(str(version))
+                        fast_import.checkpoint()
+"""
+
+from __future__ import annotations
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from command.session import read_line
+
+from mint.objects import blob_oid
+from mint.session import RefTransaction, _RepoSession
+from mint.snapshot import Snapshots, read_file
+
+if TYPE_CHECKING:
+    from mint.repo import Repo
+
+
+def _quote(path: str) -> str:
+    # Paths are quoted like C strings, so they may contain spaces
+    return path.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class FastImport(_RepoSession):
+    """
+    Commits snapshots of directories in the working tree without `git add`
+    (`git fast-import`)
+
+    Each commit only sends the files that changed since the previous commit.
+    Only the files that `git status` reports (which only reads the files whose
+    stat info changed) and the ones committed since the last checkpoint are
+    hashed, and the commit carries the other files over from its parent, so a
+    series of commits costs roughly as much as the bytes that changed. Clean
+    filters and .gitignore are not applied to the files.
+
+    Commits and tags are written to the repo (and become visible to other git
+    commands) by checkpoint(). The index is updated with the files that
+    changed at the same time, so it matches the new commit.
+
+    Args:
+            repo (Repo)
+            ref (Optional[str]): Branch to commit to. Defaults to the branch
+                    HEAD points to.
+    """
+
+    def __init__(self, repo: Repo, ref: Optional[str] = None) -> None:
+        if ref is None:
+            ref = repo.git.symbolic_ref("HEAD")
+
+        parent = repo.head_commit()
+
+        # --done makes fast-import fail instead of committing what it has if
+        # this process dies in the middle of a commit
+        super().__init__(repo, repo.git.session("fast-import", quiet=True, done=True))
+
+        self._ref = ref
+        self._parent = parent
+        self._last_mark = None
+        self._snapshots = Snapshots(repo, parent)
+        self._writing = False
+        # Mark of the commit of each tag to create at the next checkpoint
+        self._tags: Dict[str, int] = {}
+
+    def _send(self, line: str) -> None:
+        self._session.request(line)
+
+    def _send_data(self, data: bytes) -> None:
+        # The terminator of the request ends the data with an (optional) LF
+        self._session.request(f"data {len(data)}\n".encode() + data)
+
+    def commit(self, message: str, *directories: str) -> int:
+        """
+        Commit the current contents of some directories
+
+        Everything outside of the directories stays as it was in the previous
+        commit. The directories must not contain each other.
+
+        Args:
+                message (str): Commit message
+                directories (str): Paths relative to the repo
+
+        Returns:
+                int: Number of files that changed
+        """
+
+        # The identity (and time) `git commit` would use
+        committer = self._repo.git.var("GIT_COMMITTER_IDENT")
+        author = self._repo.git.var("GIT_AUTHOR_IDENT")
+
+        mark = 1 if self._last_mark is None else self._last_mark + 1
+        self._writing = True
+
+        self._send(f"commit {self._ref}")
+        self._send(f"mark :{mark}")
+        self._send(f"author {author}")
+        self._send(f"committer {committer}")
+        self._send_data(message.encode())
+        if self._last_mark is None and self._parent is not None:
+            self._send(f"from {self._parent}")
+
+        changed = 0
+        for directory in directories:
+            snapshot = self._snapshots.get(directory)
+
+            # Deletions go first, so a file that was replaced by a directory
+            # is deleted before the files in the directory are added
+            modified: List[Tuple[str, str, bytes]] = []
+            for path in self._snapshots.changed_paths(directory):
+                try:
+                    mode, data = read_file(os.path.join(self._repo.path, path))
+                except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+                    if path in snapshot:
+                        self._send(f'D "{_quote(path)}"')
+                        self._snapshots.remove(directory, path)
+                        changed += 1
+
+                    continue
+
+                modified.append((path, mode, data))
+
+            for path, mode, data in modified:
+                oid = blob_oid(data)
+                if snapshot.get(path) == (mode, oid, len(data)):
+                    continue
+
+                self._send(f'M {mode} inline "{_quote(path)}"')
+                self._send_data(data)
+                self._snapshots.add(directory, path, mode, oid, len(data))
+                changed += 1
+
+        # An empty line ends the commit
+        self._send("")
+        self._writing = False
+        self._last_mark = mark
+
+        return changed
+
+    def tag(self, name: str) -> None:
+        """
+        Point a new lightweight tag at the last commit
+
+        The tag is created at the next checkpoint, which fails if a tag with
+        the same name exists.
+        """
+
+        if self._last_mark is None:
+            raise ValueError("Nothing has been committed yet")
+
+        self._tags[name] = self._last_mark
+
+    def checkpoint(self) -> None:
+        """
+        Write everything sent so far to the repo, create the tags, and update
+        the index to match
+
+        Raises:
+                GitError: If one of the tags exists (in which case no tags are
+                        created)
+        """
+
+        self._send("checkpoint")
+        self._send("")
+
+        # fast-import handles commands in order, so it prints the progress
+        # message once the checkpoint is done
+        self._session.request("progress checkpoint", response=read_line).result()
+        self._repo.git.invalidate()
+
+        self._create_tags(self._tag_commits())
+        self._snapshots.update_index()
+
+    def _tag_commits(self) -> Dict[str, str]:
+        # Commit of each tag sent since the last checkpoint
+        commits = {
+            name: self._session.request(f"get-mark :{mark}", response=read_line)
+            for name, mark in self._tags.items()
+        }
+        self._tags.clear()
+
+        return {name: future.result() for name, future in commits.items()}
+
+    def _create_tags(self, commits: Dict[str, str]) -> None:
+        # fast-import's own `reset` would move a tag that already exists
+        if not commits:
+            return
+
+        with RefTransaction(self._repo) as refs:
+            for name, commit in commits.items():
+                refs.create(f"refs/tags/{name}", commit)
+
+            refs.commit()
+
+    def close(self) -> None:
+        """
+        Write everything sent so far to the repo and stop `git fast-import`
+
+        If a commit was interrupted while it was being sent, it is discarded
+        (along with anything else sent since the last checkpoint).
+        """
+
+        if self._writing:
+            self._session.abort()
+            return
+
+        # Marks can only be looked up while fast-import is running
+        tags = self._tag_commits()
+        self._send("done")
+        super().close()
+
+        self._create_tags(tags)
+        self._snapshots.update_index()
@@ -0,0 +1,347 @@
+"""
+Advisory locks shared by the processes that work on one repo
+
+Git protects its own files with lock files that are created exclusively and
+renamed into place. A process that dies in between leaves the lock file
+behind, and every later git command that needs it fails until it is removed by
+hand. FileLock uses `fcntl.flock()` instead (`msvcrt.locking()` on Windows),
+so a lock is released by the kernel as soon as the process holding it exits,
+however it exits. Waiting for a lock can be limited with a timeout, and the
+process holding a lock can be read from its file to say who is in the way.
+
+CommitQueue runs the writes to a repo one at a time (in the order they were
+started, each on the thread that started it) while holding a FileLock, so
+processes (and threads) that write to the same repo take turns instead of
+failing on each other's `index.lock`. Git's own lock files are never removed:
+whether the process that created one is gone cannot be told from the file.
+
+Sample usage:
+        with FileLock(os.path.join(git_dir, 'shulkr', 'locks', 'src.lock')):
+                generate(version)
+
+        with CommitQueue(FileLock(write_lock_path)) as queue:
+                queue.run(repo.git.commit, message='Minecraft 1.18')
+"""
+
+from __future__ import annotations
+import ctypes
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    # Only available on Windows
+    msvcrt = None
+
+# Time between attempts to take a lock that is held by someone else
+DEFAULT_POLL_INTERVAL = 0.1
+
+# Byte of the lock file that is locked on Windows. Windows locks byte ranges,
+# and other processes cannot read a locked range, so it lies past the owner
+# that is written at the start of the file.
+WINDOWS_LOCK_OFFSET = 2**30
+
+# Windows API constants (for is_running())
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+ERROR_ACCESS_DENIED = 5
+STILL_ACTIVE = 259
+
+
+def _is_running_windows(pid: int) -> bool:
+    # os.kill() would terminate the process on Windows
+    kernel32 = ctypes.windll.kernel32
+    kernel32.OpenProcess.restype = ctypes.c_void_p
+    kernel32.GetExitCodeProcess.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+    kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        # The process exists if it is only out of reach
+        return kernel32.GetLastError() == ERROR_ACCESS_DENIED
+
+    try:
+        exit_code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+            return True
+
+        return exit_code.value == STILL_ACTIVE
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def is_running(pid: int) -> bool:
+    """
+    Returns:
+            bool: Whether a process with this id runs on this host
+    """
+
+    if os.name == "nt":
+        return _is_running_windows(pid)
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists, but belongs to another user
+        return True
+
+    return True
+
+
+def _try_lock(fd: int) -> bool:
+    # Take the lock on an open lock file without waiting
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        return True
+
+    os.lseek(fd, WINDOWS_LOCK_OFFSET, os.SEEK_SET)
+    try:
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    finally:
+        os.lseek(fd, 0, os.SEEK_SET)
+
+    return True
+
+
+def _unlock(fd: int) -> None:
+    # Closing the file releases a flock(), but Windows only promises to
+    # release locks of a closed file eventually
+    if fcntl is None:
+        os.lseek(fd, WINDOWS_LOCK_OFFSET, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class LockTimeoutError(Exception):
+    """
+    Raised when a lock could not be taken in time
+
+    Attributes:
+            path (str): Lock file
+            owner (Optional[LockOwner]): Process that held the lock (if known)
+    """
+
+    def __init__(self, path: str, owner: Optional[LockOwner]) -> None:
+        holder = "another process" if owner is None else str(owner)
+        super().__init__(f"Timed out waiting for {path} (held by {holder})")
+
+        self.path = path
+        self.owner = owner
+
+
+class LockOwner:
+    """
+    Process that took a lock
+
+    Attributes:
+            pid (int)
+            host (str)
+    """
+
+    __slots__ = ("pid", "host")
+
+    def __init__(self, pid: int, host: str) -> None:
+        self.pid = pid
+        self.host = host
+
+    def is_alive(self) -> Optional[bool]:
+        """
+        Returns:
+                Optional[bool]: Whether the process is still running, or None if
+                it runs on another host
+        """
+
+        if self.host != socket.gethostname():
+            return None
+
+        return is_running(self.pid)
+
+    def __str__(self) -> str:
+        return f"process {self.pid} on {self.host}"
+
+    def __repr__(self) -> str:
+        return f"LockOwner({self.pid!r}, {self.host!r})"
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file (`flock`, or a locked byte range on
+    Windows)
+
+    The lock file is created if it does not exist, and is never deleted (a
+    process could be waiting for it). The id and host of the process holding
+    the lock are written to it.
+
+    Locks are not reentrant. Taking a lock that the same process already holds
+    through another FileLock waits like it would for any other process.
+
+    Args:
+            path (str): Lock file (its directory is created if needed)
+            timeout (Optional[float]): Seconds to wait for the lock before
+                    giving up. None waits as long as it takes.
+            poll_interval (float): Seconds between attempts while waiting
+    """
+
+    def __init__(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def owner(self) -> Optional[LockOwner]:
+        """
+        Read the process that holds (or last held) the lock
+
+        Returns:
+                Optional[LockOwner]: None if no process took the lock yet
+        """
+
+        try:
+            with open(self.path) as f:
+                fields = f.read().split()
+        except FileNotFoundError:
+            return None
+
+        if len(fields) != 2 or not fields[0].isdigit():
+            return None
+
+        return LockOwner(int(fields[0]), fields[1])
+
+    def acquire(self) -> None:
+        """
+        Take the lock, waiting for whoever holds it
+
+        Raises:
+                LockTimeoutError: If the lock was still held after the timeout
+        """
+
+        if self._fd is not None:
+            raise RuntimeError(f"{self.path} is already locked")
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        try:
+            while not _try_lock(fd):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise LockTimeoutError(self.path, self.owner())
+
+                time.sleep(self.poll_interval)
+
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{os.getpid()} {socket.gethostname()}\n".encode())
+
+        except BaseException:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+
+    def release(self) -> None:
+        """
+        Give the lock back (if it is held)
+        """
+
+        if self._fd is None:
+            return
+
+        fd, self._fd = self._fd, None
+        try:
+            _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> FileLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+class CommitQueue:
+    """
+    Runs writes to a repo one at a time, in the order they were started
+
+    Every write runs while holding a FileLock, so writes from other processes
+    (with their own queue for the same lock file) never overlap with it. Writes
+    run on the thread that started them, which waits for its turn.
+
+    Args:
+            lock (FileLock): Write lock of the repo
+    """
+
+    def __init__(self, lock: FileLock) -> None:
+        self.lock = lock
+        self._turns = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Wait for the writes started before this one, and write
+
+        Args:
+                fn (Callable): Called with the remaining arguments while the write
+                        lock is held
+
+        Returns:
+                Any: Result of fn
+
+        Raises:
+                LockTimeoutError: If another process held the write lock for
+                        longer than its timeout
+        """
+
+        with self._turns:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._turns.wait_for(lambda: self._serving == ticket)
+
+        try:
+            with self.lock:
+                return fn(*args, **kwargs)
+        finally:
+            with self._turns:
+                self._serving += 1
+                self._turns.notify_all()
+
+    def close(self) -> None:
+        """
+        Wait for the writes that were started to finish
+        """
+
+        with self._turns:
+            self._turns.wait_for(lambda: self._serving == self._next_ticket)
+
+    def __enter__(self) -> CommitQueue:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,149 @@
+"""
+Repacking and indexing a repo on our own schedule
+
+git runs `gc --auto` (or `maintenance run --auto`) after commands that create
+objects, which can stop a long series of commits at any point for a full
+repack. Giving AUTO_GC_SETTINGS to the commands of a repo turns that off
+without changing its config (so it stays on for everyone else, even if the
+process is killed), and maintain() can be run at convenient points instead.
+
+Sample usage:
+        repo = Repo(path, config=AUTO_GC_SETTINGS)
+        for version in versions:
+                commit(version)
+
+        if needs_maintenance(repo):
+                print(maintain(repo))
+"""
+
+from __future__ import annotations
+import time
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from mint.repo import Repo
+
+
+# Consecutive versions of a decompiled file are very similar, so looking
+# further for delta bases (and allowing longer delta chains than the defaults
+# of 10 and 50) makes packs much smaller
+DEFAULT_WINDOW = 50
+DEFAULT_DEPTH = 100
+
+# Settings that keep git from maintaining the repo by itself
+AUTO_GC_SETTINGS = {"gc.auto": "0", "maintenance.auto": "false"}
+
+# Loose objects and packs above which a repo needs maintenance (the defaults of
+# git's own gc.auto and gc.autoPackLimit)
+LOOSE_OBJECT_LIMIT = 6700
+PACK_LIMIT = 50
+
+
+class MaintenanceReport:
+    """
+    What a maintenance pass did
+
+    Attributes:
+            elapsed (float): Seconds the pass took
+            size_before (int): Bytes used by objects before the pass
+            size_after (int): Bytes used by objects after the pass
+            loose_before (int): Loose objects before the pass
+            packs_after (int): Pack files after the pass
+    """
+
+    __slots__ = ("elapsed", "size_before", "size_after", "loose_before", "packs_after")
+
+    def __init__(
+        self,
+        elapsed: float,
+        size_before: int,
+        size_after: int,
+        loose_before: int,
+        packs_after: int,
+    ) -> None:
+
+        self.elapsed = elapsed
+        self.size_before = size_before
+        self.size_after = size_after
+        self.loose_before = loose_before
+        self.packs_after = packs_after
+
+    def __str__(self) -> str:
+        mb = 1024 * 1024
+        return (
+            f"{self.size_before / mb:.1f} MB -> {self.size_after / mb:.1f} MB, "
+            + f"{self.loose_before} loose objects packed, {self.packs_after} "
+            + f"packs, {self.elapsed:.1f}s"
+        )
+
+
+def count_objects(repo: Repo) -> Dict[str, int]:
+    """
+    Run `git count-objects -v`
+
+    Returns:
+            Dict[str, int]: Each field ('count', 'size', 'in-pack', 'packs',
+            'size-pack', ...), with sizes in bytes
+    """
+
+    counts = {}
+    for line in repo.git.count_objects(v=True).splitlines():
+        key, _, value = line.partition(": ")
+        if key == "alternate":
+            # Objects of the alternates are not counted
+            continue
+
+        counts[key] = int(value)
+        if key.startswith("size"):
+            # Sizes are reported in KiB
+            counts[key] *= 1024
+
+    return counts
+
+
+def needs_maintenance(repo: Repo) -> bool:
+    """
+    Check whether enough was written to the repo since it was last maintained
+    for maintain() to be worth running (by the same measure as `gc --auto`)
+
+    Returns:
+            bool: True if the repo has more than LOOSE_OBJECT_LIMIT loose objects
+            or more than PACK_LIMIT packs
+    """
+
+    counts = count_objects(repo)
+    return counts["count"] > LOOSE_OBJECT_LIMIT or counts["packs"] > PACK_LIMIT
+
+
+def maintain(
+    repo: Repo, window: int = DEFAULT_WINDOW, depth: int = DEFAULT_DEPTH
+) -> MaintenanceReport:
+    """
+    Pack loose objects and update the indexes used by history queries
+
+    Runs an incremental repack (existing packs are kept, and objects the repo
+    borrows from its alternates are not copied into it), packs the refs, then
+    writes the commit-graph (with changed-path Bloom filters, which speed up `git log --
+    <path>`) and the multi-pack-index.
+
+    Returns:
+            MaintenanceReport:
+    """
+
+    start = time.perf_counter()
+    before = count_objects(repo)
+
+    repo.git.repack(d=True, l=True, window=window, depth=depth, q=True)
+    # Tags are written to loose ref files, one each
+    repo.git.pack_refs()
+    repo.git.commit_graph("write", "--reachable", "--changed-paths", "--split")
+    repo.git.multi_pack_index("write")
+
+    after = count_objects(repo)
+    return MaintenanceReport(
+        time.perf_counter() - start,
+        before["size"] + before["size-pack"],
+        after["size"] + after["size-pack"],
+        before["count"],
+        after["packs"],
+    )
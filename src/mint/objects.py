@@ -0,0 +1,216 @@
+from __future__ import annotations
+import hashlib
+import subprocess
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+from mint.error import GitError
+
+
+def blob_oid(data: bytes) -> str:
+    """
+    Compute the object id git gives a blob, without writing it (like `git
+    hash-object`)
+    """
+
+    header = f"blob {len(data)}\0".encode()
+    return hashlib.sha1(header + data).hexdigest()
+
+
+class NoSuchObjectError(Exception):
+    def __init__(self, name: str, *args: object) -> None:
+        super().__init__(*args)
+
+        self.name = name
+
+    def __str__(self) -> str:
+        return f"No such object: {self.name}"
+
+
+class ObjectInfo:
+    __slots__ = ("oid", "type", "size")
+
+    def __init__(self, oid: str, type: str, size: int) -> None:
+        self.oid = oid
+        self.type = type
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f"ObjectInfo({self.oid!r}, {self.type!r}, {self.size})"
+
+
+class _BatchProcess:
+    """
+    One `git cat-file --batch` or `git cat-file --batch-check` process
+
+    The process is started on the first request and restarted if it exits.
+    """
+
+    def __init__(self, repo_path: str, mode: str) -> None:
+        self._repo_path = repo_path
+        self._mode = mode
+        self._proc = None
+        self._stderr = None
+        self._lock = threading.Lock()
+
+    @property
+    def command(self) -> List[str]:
+        return ["git", "cat-file", f"--{self._mode}"]
+
+    def _start(self) -> None:
+        # Stderr goes to a file, so a chatty process can never block on a full
+        # pipe that nobody reads
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(
+            self.command,
+            cwd=self._repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+        )
+
+    def _stop(self) -> str:
+        """
+        Stop the process and return everything it wrote to stderr
+        """
+
+        proc = self._proc
+        self._proc = None
+        if proc is None:
+            return ""
+
+        for stream in (proc.stdin, proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+        proc.wait()
+
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode(errors="replace")
+        self._stderr.close()
+        self._stderr = None
+
+        return stderr
+
+    def _request(self, name: str) -> Tuple[bytes, Optional[bytes]]:
+        if self._proc is None or self._proc.poll() is not None:
+            self._stop()
+            self._start()
+
+        self._proc.stdin.write(name.encode() + b"\n")
+        self._proc.stdin.flush()
+
+        header = self._proc.stdout.readline()
+        if not header:
+            raise EOFError
+
+        if header.endswith(b" missing\n") or header.endswith(b" ambiguous\n"):
+            return header, None
+
+        if self._mode == "batch-check":
+            return header, None
+
+        # Read the contents and the newline after them separately, so the
+        # contents do not have to be copied to drop the newline
+        size = int(header.split()[2])
+        body = self._proc.stdout.read(size)
+        if len(body) != size or self._proc.stdout.read(1) != b"\n":
+            raise EOFError
+
+        return header, body
+
+    def request(self, name: str) -> Tuple[bytes, Optional[bytes]]:
+        """
+        Look up one object
+
+        If the process died (or dies while answering), it is restarted and the
+        request is sent once more.
+
+        Args:
+                name (str): Any object name that `git rev-parse` understands
+
+        Returns:
+                Tuple[bytes, Optional[bytes]]: The raw header line and, in
+                `batch` mode, the contents of the object
+        """
+
+        if "\n" in name:
+            raise ValueError(f"Object names cannot contain newlines: {name!r}")
+
+        with self._lock:
+            try:
+                return self._request(name)
+            except (BrokenPipeError, EOFError):
+                self._stop()
+
+            try:
+                return self._request(name)
+            except (BrokenPipeError, EOFError):
+                stderr = self._stop()
+                raise GitError(self.command, stderr)
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
+
+
+class CatFile:
+    """
+    Long-lived object reader for a git repo
+
+    Instead of spawning a git process for every object, requests are streamed
+    to `git cat-file --batch` (for contents) and `git cat-file --batch-check`
+    (for metadata). Each process is started on first use and stays open until
+    close() is called.
+
+    Sample usage:
+            objects = CatFile(PATH_TO_REPO)
+            source = objects.read('HEAD:src/Foo.java')
+            info = objects.info('HEAD:src/Foo.java')
+            objects.close()
+    """
+
+    def __init__(self, repo_path: str) -> None:
+        self._batch = _BatchProcess(repo_path, "batch")
+        self._batch_check = _BatchProcess(repo_path, "batch-check")
+
+    @staticmethod
+    def _parse_header(name: str, header: bytes) -> ObjectInfo:
+        fields = header.decode().split()
+        if len(fields) != 3:
+            raise NoSuchObjectError(name)
+
+        oid, type_, size = fields
+        return ObjectInfo(oid, type_, int(size))
+
+    def info(self, name: str) -> ObjectInfo:
+        """
+        Get the id, type and size of an object without reading it
+
+        Raises:
+                NoSuchObjectError: If the name does not resolve to an object
+        """
+
+        header, _ = self._batch_check.request(name)
+        return CatFile._parse_header(name, header)
+
+    def read(self, name: str) -> bytes:
+        """
+        Get the contents of an object
+
+        Raises:
+                NoSuchObjectError: If the name does not resolve to an object
+        """
+
+        header, body = self._batch.request(name)
+        if body is None:
+            raise NoSuchObjectError(name)
+
+        return body
+
+    def close(self) -> None:
+        self._batch.close()
+        self._batch_check.close()
@@ -0,0 +1,590 @@
+"""
+Reading objects straight from the object database, without running git
+
+Pack files and their indexes are memory-mapped, so reading an object costs no
+process (and no copy of the pack): the index is searched for the object, and
+its data is inflated from the mapped pack. Deltas are resolved here too.
+Since the files are mapped read-only, several processes reading the same
+packs share them through the page cache.
+
+Only SHA-1 repos with version 2 pack indexes are supported (the only kind git
+has written by default since 1.5.2).
+
+Sample usage:
+        with ObjectReader(PATH_TO_REPO) as reader:
+                source = reader.read(oid)
+"""
+
+from __future__ import annotations
+import collections
+import glob
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import List, Optional, OrderedDict, Tuple
+
+from mint.objects import NoSuchObjectError
+
+# Bytes of delta bases (the objects deltas apply to) kept in memory. Versions
+# of a file are usually stored as a chain of deltas, so reading several
+# objects of one chain reuses the bases.
+DEFAULT_CACHE_SIZE = 32 * 1024 * 1024
+
+# Names of the object types, by their number in pack files
+OBJECT_TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+
+# Pack entry types that are deltas
+OFS_DELTA = 6
+REF_DELTA = 7
+
+IDX_MAGIC = b"\377tOc"
+OID_SIZE = 20
+
+# Bytes inflated at a time (an entry's compressed size is not stored)
+CHUNK_SIZE = 64 * 1024
+
+# Alternates of alternates are followed this deep (like git does)
+MAX_ALTERNATE_DEPTH = 5
+
+
+class PackError(Exception):
+    """
+    A pack, index or loose object could not be read
+    """
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    # Little-endian base-128 number (sizes in delta headers)
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    Rebuild an object from its delta base and a git delta
+
+    Raises:
+            PackError: If the delta is corrupt or does not fit the base
+    """
+
+    base_size, pos = _read_varint(delta, 0)
+    result_size, pos = _read_varint(delta, pos)
+    if base_size != len(base):
+        raise PackError("Delta base has the wrong size")
+
+    result = bytearray()
+    while pos < len(delta):
+        command = delta[pos]
+        pos += 1
+
+        if command & 0x80:
+            # Copy a range of the base (each bit says whether one byte of the
+            # offset or size follows)
+            offset = size = 0
+            for i in range(4):
+                if command & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+
+            for i in range(3):
+                if command & (1 << (4 + i)):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+
+            if size == 0:
+                size = 0x10000
+
+            result += base[offset : offset + size]
+
+        elif command:
+            # Insert the next `command` bytes
+            result += delta[pos : pos + command]
+            pos += command
+
+        else:
+            raise PackError("Invalid delta instruction")
+
+    if len(result) != result_size:
+        raise PackError("Delta produced an object of the wrong size")
+
+    return bytes(result)
+
+
+class _Pack:
+    """
+    One memory-mapped pack file and its index
+    """
+
+    def __init__(self, idx_path: str) -> None:
+        self.path = idx_path[: -len(".idx")] + ".pack"
+
+        with open(idx_path, "rb") as f:
+            self._idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            with open(self.path, "rb") as f:
+                self._pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._idx.close()
+            raise
+
+        if self._idx[:4] != IDX_MAGIC or struct.unpack(">I", self._idx[4:8])[0] != 2:
+            self.close()
+            raise PackError(f"{idx_path} is not a version 2 pack index")
+
+        self._fanout = struct.unpack(">256I", self._idx[8 : 8 + 256 * 4])
+        self.count = self._fanout[255]
+
+        self._names = 8 + 256 * 4
+        self._crcs = self._names + self.count * OID_SIZE
+        self._offsets = self._crcs + self.count * 4
+        self._large_offsets = self._offsets + self.count * 4
+
+    def _name(self, i: int) -> bytes:
+        start = self._names + i * OID_SIZE
+        return self._idx[start : start + OID_SIZE]
+
+    def find(self, oid: bytes) -> Optional[int]:
+        """
+        Find the offset of an object in the pack
+
+        Returns:
+                Optional[int]: None if the object is not in this pack
+        """
+
+        # The fanout table gives the range of names that start with the same
+        # byte, and the names are sorted within it
+        first = oid[0]
+        low = self._fanout[first - 1] if first > 0 else 0
+        high = self._fanout[first]
+
+        while low < high:
+            middle = (low + high) // 2
+            name = self._name(middle)
+            if name < oid:
+                low = middle + 1
+            elif name > oid:
+                high = middle
+            else:
+                return self._offset(middle)
+
+        return None
+
+    def _offset(self, i: int) -> int:
+        start = self._offsets + i * 4
+        (offset,) = struct.unpack(">I", self._idx[start : start + 4])
+        if not offset & 0x80000000:
+            return offset
+
+        # Offsets past 2 GiB are stored in a table of 64-bit offsets
+        start = self._large_offsets + (offset & 0x7FFFFFFF) * 8
+        return struct.unpack(">Q", self._idx[start : start + 8])[0]
+
+    def header(self, offset: int) -> Tuple[int, int, int]:
+        """
+        Read the header of the entry at an offset
+
+        Returns:
+                Tuple[int, int, int]: Type, size of the inflated data and
+                position of the data (after the delta base, for deltas)
+        """
+
+        byte = self._pack[offset]
+        pos = offset + 1
+        type_ = (byte >> 4) & 0x7
+        size = byte & 0xF
+        shift = 4
+        while byte & 0x80:
+            byte = self._pack[pos]
+            pos += 1
+            size |= (byte & 0x7F) << shift
+            shift += 7
+
+        return type_, size, pos
+
+    def ofs_delta_base(self, offset: int, pos: int) -> Tuple[int, int]:
+        """
+        Read the base of an OFS_DELTA entry
+
+        Returns:
+                Tuple[int, int]: Offset of the base and position of the data
+        """
+
+        # Big-endian base-128 distance back to the base, where each
+        # continuation adds one (so there is only one way to write a number)
+        byte = self._pack[pos]
+        pos += 1
+        distance = byte & 0x7F
+        while byte & 0x80:
+            byte = self._pack[pos]
+            pos += 1
+            distance = ((distance + 1) << 7) | (byte & 0x7F)
+
+        return offset - distance, pos
+
+    def ref_delta_base(self, pos: int) -> Tuple[bytes, int]:
+        """
+        Read the base of a REF_DELTA entry
+
+        Returns:
+                Tuple[bytes, int]: Object id of the base and position of the
+                data
+        """
+
+        return self._pack[pos : pos + OID_SIZE], pos + OID_SIZE
+
+    def inflate(self, pos: int, size: int) -> bytes:
+        inflater = zlib.decompressobj()
+        # Small objects rarely compress to more than a few bytes over their
+        # size, so they are usually inflated from one small slice
+        step = min(size + 64, CHUNK_SIZE)
+        chunks = []
+        while not inflater.eof:
+            chunk = self._pack[pos : pos + step]
+            if not chunk:
+                raise PackError(f"{self.path} is truncated")
+
+            chunks.append(inflater.decompress(chunk))
+            pos += step
+            step = CHUNK_SIZE
+
+        data = b"".join(chunks)
+        if len(data) != size:
+            raise PackError(f"Corrupt entry in {self.path}")
+
+        return data
+
+    def close(self) -> None:
+        self._idx.close()
+        self._pack.close()
+
+
+def find_objects_dir(repo_path: str) -> str:
+    """
+    Find the object directory of a repo (or linked worktree) without running
+    git
+    """
+
+    git_dir = os.path.join(repo_path, ".git")
+    if os.path.isfile(git_dir):
+        # A linked worktree has a file pointing to its own git directory,
+        # which points to the git directory of the main worktree
+        with open(git_dir) as f:
+            git_dir = os.path.join(repo_path, f.read().strip()[len("gitdir: ") :])
+
+        commondir = os.path.join(git_dir, "commondir")
+        if os.path.exists(commondir):
+            with open(commondir) as f:
+                git_dir = os.path.join(git_dir, f.read().strip())
+
+    return os.path.join(git_dir, "objects")
+
+
+def read_alternates(objects_dir: str) -> List[str]:
+    """
+    Read the other object directories that an object directory borrows
+    objects from (`objects/info/alternates`)
+
+    Returns:
+            List[str]: Absolute paths, in the order git searches them
+    """
+
+    try:
+        with open(os.path.join(objects_dir, "info", "alternates")) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+    alternates = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        # Relative paths are relative to the object directory
+        alternates.append(os.path.normpath(os.path.join(objects_dir, line)))
+
+    return alternates
+
+
+def _all_objects_dirs(objects_dir: str) -> List[str]:
+    # The object directory followed by its alternates (and theirs)
+    dirs = [objects_dir]
+    level = [objects_dir]
+    for _ in range(MAX_ALTERNATE_DEPTH):
+        level = [
+            alternate
+            for directory in level
+            for alternate in read_alternates(directory)
+            if alternate not in dirs
+        ]
+        dirs.extend(dict.fromkeys(level))
+
+    return dirs
+
+
+class ObjectReader:
+    """
+    Reads objects from packs (memory-mapped) and loose object files
+
+    Packs are listed on first use, and again whenever an object cannot be
+    found (since git may have repacked the repo in the meantime). Objects are
+    also read from the alternates of the repo. The reader can be used from
+    several threads.
+
+    Args:
+            repo_path (str): Path to the working tree of the repo
+            cache_size (int): Bytes of delta bases to keep in memory
+    """
+
+    def __init__(self, repo_path: str, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self._repo_path = repo_path
+        self._objects_dir = None
+        # The object directory and its alternates
+        self._objects_dirs: List[str] = []
+        self._cache_size = cache_size
+        self._packs: List[_Pack] = []
+        self._pack_paths = set()
+        self._lock = threading.Lock()
+
+        # Recently used delta bases (type and data), by pack and offset
+        self._cache: OrderedDict[Tuple[str, int], Tuple[int, bytes]] = (
+            collections.OrderedDict()
+        )
+        self._cached_bytes = 0
+
+    def _open(self) -> None:
+        with self._lock:
+            if self._objects_dir is None:
+                self._objects_dir = find_objects_dir(self._repo_path)
+                self._scan_packs()
+
+    def _scan_packs(self) -> None:
+        # Alternates may have been added since the last scan too
+        self._objects_dirs = _all_objects_dirs(self._objects_dir)
+
+        idx_paths = []
+        for objects_dir in self._objects_dirs:
+            pattern = os.path.join(objects_dir, "pack", "*.idx")
+            idx_paths.extend(sorted(glob.glob(pattern)))
+
+        for idx_path in idx_paths:
+            if idx_path in self._pack_paths:
+                continue
+
+            try:
+                pack = _Pack(idx_path)
+            except FileNotFoundError:
+                # The pack is still being written, or was just removed
+                continue
+
+            self._packs.append(pack)
+            self._pack_paths.add(idx_path)
+
+    def _cached(self, key: Tuple[str, int]) -> Optional[Tuple[int, bytes]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+
+            return entry
+
+    def _cache_base(self, key: Tuple[str, int], entry: Tuple[int, bytes]) -> None:
+        size = len(entry[1])
+        if size > self._cache_size:
+            return
+
+        with self._lock:
+            if key in self._cache:
+                return
+
+            self._cache[key] = entry
+            self._cached_bytes += size
+            while self._cached_bytes > self._cache_size:
+                _, (_, data) = self._cache.popitem(last=False)
+                self._cached_bytes -= len(data)
+
+    def _read_packed(self, pack: _Pack, offset: int) -> Tuple[int, bytes]:
+        # Follow the chain of deltas down to a full object (or a cached one)
+        deltas = []
+        # Where the object the deltas apply to is stored in this pack (None if
+        # it is cached already or stored elsewhere)
+        base_key = None
+        while True:
+            key = (pack.path, offset)
+            cached = self._cached(key)
+            if cached is not None:
+                type_, data = cached
+                break
+
+            type_, size, pos = pack.header(offset)
+            if type_ == OFS_DELTA:
+                base_offset, pos = pack.ofs_delta_base(offset, pos)
+                deltas.append((key, pack.inflate(pos, size)))
+                offset = base_offset
+
+            elif type_ == REF_DELTA:
+                base_oid, pos = pack.ref_delta_base(pos)
+                deltas.append((key, pack.inflate(pos, size)))
+                type_, data = self._read_binary(base_oid)
+                break
+
+            elif type_ in OBJECT_TYPES:
+                data = pack.inflate(pos, size)
+                base_key = key
+                break
+
+            else:
+                raise PackError(f"Unknown entry type {type_} in {pack.path}")
+
+        if deltas and base_key is not None:
+            self._cache_base(base_key, (type_, data))
+
+        # Apply the deltas from the base up
+        for i, (key, delta) in enumerate(reversed(deltas)):
+            data = apply_delta(data, delta)
+            if i < len(deltas) - 1:
+                # This object is itself the base of the next delta
+                self._cache_base(key, (type_, data))
+
+        return type_, data
+
+    def _loose_path(self, oid: bytes) -> Optional[str]:
+        hex_oid = oid.hex()
+        for objects_dir in self._objects_dirs:
+            path = os.path.join(objects_dir, hex_oid[:2], hex_oid[2:])
+            if os.path.exists(path):
+                return path
+
+        return None
+
+    def _read_loose(self, oid: bytes) -> Optional[Tuple[int, bytes]]:
+        hex_oid = oid.hex()
+        path = self._loose_path(oid)
+        if path is None:
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                raw = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+        # 'type size\0data'
+        header, _, data = raw.partition(b"\0")
+        type_name, size = header.decode().split(" ")
+        if int(size) != len(data):
+            raise PackError(f"Corrupt loose object {hex_oid}")
+
+        for type_, name in OBJECT_TYPES.items():
+            if name == type_name:
+                return type_, data
+
+        raise PackError(f"Unknown type {type_name!r} of loose object {hex_oid}")
+
+    def _find(self, oid: bytes) -> Optional[Tuple[_Pack, int]]:
+        for pack in self._packs:
+            offset = pack.find(oid)
+            if offset is not None:
+                return pack, offset
+
+        return None
+
+    def _read_binary(self, oid: bytes) -> Tuple[int, bytes]:
+        found = self._find(oid)
+        if found is not None:
+            return self._read_packed(*found)
+
+        loose = self._read_loose(oid)
+        if loose is not None:
+            return loose
+
+        # The object may be in a pack that was created after the packs were
+        # listed
+        with self._lock:
+            self._scan_packs()
+
+        found = self._find(oid)
+        if found is not None:
+            return self._read_packed(*found)
+
+        raise NoSuchObjectError(oid.hex())
+
+    def read_object(self, oid: str) -> Tuple[str, bytes]:
+        """
+        Read an object
+
+        Args:
+                oid (str): Full object id (names like 'HEAD:path' are not
+                        supported)
+
+        Returns:
+                Tuple[str, bytes]: Type and contents of the object
+
+        Raises:
+                NoSuchObjectError: If the object is not in the repo
+        """
+
+        try:
+            binary_oid = bytes.fromhex(oid)
+        except ValueError:
+            raise NoSuchObjectError(oid)
+
+        if len(binary_oid) != OID_SIZE:
+            raise NoSuchObjectError(oid)
+
+        self._open()
+        type_, data = self._read_binary(binary_oid)
+        return OBJECT_TYPES[type_], data
+
+    def read(self, oid: str) -> bytes:
+        """
+        Read the contents of an object
+
+        Raises:
+                NoSuchObjectError: If the object is not in the repo
+        """
+
+        return self.read_object(oid)[1]
+
+    def __contains__(self, oid: str) -> bool:
+        try:
+            binary_oid = bytes.fromhex(oid)
+        except ValueError:
+            return False
+
+        self._open()
+        if self._find(binary_oid) is not None:
+            return True
+
+        return self._loose_path(binary_oid) is not None
+
+    def close(self) -> None:
+        """
+        Unmap all packs
+        """
+
+        with self._lock:
+            for pack in self._packs:
+                pack.close()
+
+            self._packs = []
+            self._pack_paths = set()
+            self._objects_dir = None
+            self._objects_dirs = []
+            self._cache.clear()
+            self._cached_bytes = 0
+
+    def __enter__(self) -> ObjectReader:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
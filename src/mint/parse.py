@@ -0,0 +1,365 @@
+"""
+Parsers for the NUL-delimited (`-z`) output of git commands
+
+Each parser takes the records of the output one at a time (as yielded by
+`Command.stream(..., separator='\\0')`) and yields compact record objects, so
+the output of large queries is never split into lists of strings.
+"""
+
+from __future__ import annotations
+from typing import Iterable, Iterator, Optional
+
+from mint.objects import ObjectInfo
+
+
+class DiffEntry:
+    """
+    One line of `git diff --raw`
+
+    Attributes:
+            src_mode (str): Mode before the change ('000000' if created)
+            dst_mode (str): Mode after the change ('000000' if deleted)
+            src_oid (str): Object before the change
+            dst_oid (str): Object after the change (all zeros if it is only in
+                    the working tree)
+            status (str): 'A', 'C', 'D', 'M', 'R', 'T', 'U' or 'X'
+            score (Optional[int]): Similarity of renames and copies
+            src_path (str): Path before the change
+            dst_path (str): Path after the change (the same as `src_path`
+                    unless the file was renamed or copied)
+    """
+
+    __slots__ = (
+        "src_mode",
+        "dst_mode",
+        "src_oid",
+        "dst_oid",
+        "status",
+        "score",
+        "src_path",
+        "dst_path",
+    )
+
+    def __init__(
+        self,
+        src_mode: str,
+        dst_mode: str,
+        src_oid: str,
+        dst_oid: str,
+        status: str,
+        score: Optional[int],
+        src_path: str,
+        dst_path: str,
+    ) -> None:
+
+        self.src_mode = src_mode
+        self.dst_mode = dst_mode
+        self.src_oid = src_oid
+        self.dst_oid = dst_oid
+        self.status = status
+        self.score = score
+        self.src_path = src_path
+        self.dst_path = dst_path
+
+    def __repr__(self) -> str:
+        return f"DiffEntry({self.status!r}, {self.src_path!r}, {self.dst_path!r})"
+
+
+class TreeEntry:
+    """
+    One line of `git ls-tree`
+
+    Attributes:
+            mode (str)
+            type (str): 'blob', 'tree' or 'commit'
+            oid (str)
+            size (Optional[int]): Only with `long=True`, and only for blobs
+            path (str)
+    """
+
+    __slots__ = ("mode", "type", "oid", "size", "path")
+
+    def __init__(
+        self, mode: str, type: str, oid: str, size: Optional[int], path: str
+    ) -> None:
+        self.mode = mode
+        self.type = type
+        self.oid = oid
+        self.size = size
+        self.path = path
+
+    def __repr__(self) -> str:
+        return f"TreeEntry({self.type!r}, {self.oid!r}, {self.path!r})"
+
+
+class StatusEntry:
+    """
+    One entry of `git status --porcelain=v2`
+
+    Attributes:
+            kind (str): '1' (changed), '2' (renamed or copied), 'u' (unmerged),
+                    '?' (untracked) or '!' (ignored)
+            xy (Optional[str]): Staged and unstaged status ('.' if unchanged),
+                    None for untracked and ignored files
+            score (Optional[str]): Rename or copy score ('R100', for example)
+            path (str)
+            orig_path (Optional[str]): Path before the rename or copy
+    """
+
+    __slots__ = ("kind", "xy", "score", "path", "orig_path")
+
+    def __init__(
+        self,
+        kind: str,
+        xy: Optional[str],
+        score: Optional[str],
+        path: str,
+        orig_path: Optional[str],
+    ) -> None:
+
+        self.kind = kind
+        self.xy = xy
+        self.score = score
+        self.path = path
+        self.orig_path = orig_path
+
+    def __repr__(self) -> str:
+        return f"StatusEntry({self.kind!r}, {self.xy!r}, {self.path!r})"
+
+
+class RefEntry:
+    """
+    One ref listed by `git for-each-ref`
+
+    Attributes:
+            name (str): Full name of the ref ('refs/tags/1.18', for example)
+            oid (str): Object the ref points to
+            type (str): Type of that object ('tag' for annotated tags)
+            peeled_oid (Optional[str]): Object an annotated tag points to
+    """
+
+    __slots__ = ("name", "oid", "type", "peeled_oid")
+
+    def __init__(
+        self, name: str, oid: str, type: str, peeled_oid: Optional[str]
+    ) -> None:
+        self.name = name
+        self.oid = oid
+        self.type = type
+        self.peeled_oid = peeled_oid
+
+    @property
+    def short_name(self) -> str:
+        for prefix in ("refs/heads/", "refs/tags/", "refs/remotes/"):
+            if self.name.startswith(prefix):
+                return self.name[len(prefix) :]
+
+        return self.name
+
+    def __repr__(self) -> str:
+        return f"RefEntry({self.name!r}, {self.oid!r})"
+
+
+class WorktreeEntry:
+    """
+    One worktree listed by `git worktree list --porcelain`
+
+    Attributes:
+            path (str): Absolute path of the working directory
+            head (Optional[str]): Commit checked out (None for bare repos)
+            branch (Optional[str]): Full name of the branch checked out (None
+                    if HEAD is detached)
+            bare (bool)
+            locked (Optional[str]): Why the worktree is locked ('' if no
+                    reason was given), or None if it is not locked
+            prunable (Optional[str]): Why the worktree can be pruned, or None
+    """
+
+    __slots__ = ("path", "head", "branch", "bare", "locked", "prunable")
+
+    def __init__(
+        self,
+        path: str,
+        head: Optional[str] = None,
+        branch: Optional[str] = None,
+        bare: bool = False,
+        locked: Optional[str] = None,
+        prunable: Optional[str] = None,
+    ) -> None:
+
+        self.path = path
+        self.head = head
+        self.branch = branch
+        self.bare = bare
+        self.locked = locked
+        self.prunable = prunable
+
+    def __repr__(self) -> str:
+        return f"WorktreeEntry({self.path!r}, {self.head!r})"
+
+
+# Format passed to `git for-each-ref`. Ref names cannot contain newlines, so
+# each ref is on its own line, with its fields separated by NULs.
+REF_FORMAT = "%(refname)%00%(objectname)%00%(objecttype)%00%(*objectname)"
+
+
+def parse_diff_raw(records: Iterable[str]) -> Iterator[DiffEntry]:
+    """
+    Parse the output of `git diff --raw -z` (or diff-index, diff-tree and
+    diff-files with the same options)
+    """
+
+    records = iter(records)
+    for header in records:
+        if not header:
+            continue
+
+        # ':100644 100644 <oid> <oid> M'
+        src_mode, dst_mode, src_oid, dst_oid, status = header[1:].split(" ")
+        score = int(status[1:]) if len(status) > 1 else None
+        status = status[0]
+
+        src_path = next(records)
+        dst_path = next(records) if status in ("R", "C") else src_path
+
+        yield DiffEntry(
+            src_mode, dst_mode, src_oid, dst_oid, status, score, src_path, dst_path
+        )
+
+
+def parse_ls_tree(records: Iterable[str]) -> Iterator[TreeEntry]:
+    """
+    Parse the output of `git ls-tree -z` (with or without `--long`)
+    """
+
+    for record in records:
+        if not record:
+            continue
+
+        info, path = record.split("\t", 1)
+        fields = info.split()
+        if len(fields) == 4:
+            mode, type_, oid, size = fields
+            size = None if size == "-" else int(size)
+        else:
+            mode, type_, oid = fields
+            size = None
+
+        yield TreeEntry(mode, type_, oid, size, path)
+
+
+def parse_status(records: Iterable[str]) -> Iterator[StatusEntry]:
+    """
+    Parse the output of `git status --porcelain=v2 -z`
+
+    Header lines (from `--branch`) are skipped.
+    """
+
+    records = iter(records)
+    for record in records:
+        if not record or record.startswith("#"):
+            continue
+
+        kind = record[0]
+        if kind in ("?", "!"):
+            yield StatusEntry(kind, None, None, record[2:], None)
+
+        elif kind == "1":
+            # '1 XY sub mH mI mW hH hI path'
+            fields = record.split(" ", 8)
+            yield StatusEntry(kind, fields[1], None, fields[8], None)
+
+        elif kind == "2":
+            # '2 XY sub mH mI mW hH hI Xscore path', then the original path
+            fields = record.split(" ", 9)
+            yield StatusEntry(kind, fields[1], fields[8], fields[9], next(records))
+
+        elif kind == "u":
+            # 'u XY sub m1 m2 m3 mW h1 h2 h3 path'
+            fields = record.split(" ", 10)
+            yield StatusEntry(kind, fields[1], None, fields[10], None)
+
+        else:
+            raise ValueError(f"Unknown status entry: {record!r}")
+
+
+def parse_refs(records: Iterable[str]) -> Iterator[RefEntry]:
+    """
+    Parse the output of `git for-each-ref` with REF_FORMAT
+    """
+
+    for record in records:
+        if not record:
+            continue
+
+        name, oid, type_, peeled_oid = record.split("\0")
+        yield RefEntry(name, oid, type_, peeled_oid or None)
+
+
+def parse_worktrees(records: Iterable[str]) -> Iterator[WorktreeEntry]:
+    """
+    Parse the output of `git worktree list --porcelain -z`
+    """
+
+    entry = None
+    for record in records:
+        if not record:
+            # An empty record ends each worktree
+            if entry is not None:
+                yield entry
+                entry = None
+
+            continue
+
+        key, _, value = record.partition(" ")
+        if key == "worktree":
+            entry = WorktreeEntry(value)
+        elif key == "HEAD":
+            entry.head = value
+        elif key == "branch":
+            entry.branch = value
+        elif key == "bare":
+            entry.bare = True
+        elif key == "locked":
+            entry.locked = value
+        elif key == "prunable":
+            entry.prunable = value
+
+    if entry is not None:
+        yield entry
+
+
+def parse_batch_check(records: Iterable[str]) -> Iterator[Optional[ObjectInfo]]:
+    """
+    Parse the output of `git cat-file --batch-check` (with the default format)
+
+    Yields None for objects that are missing.
+    """
+
+    for record in records:
+        if not record:
+            continue
+
+        fields = record.split(" ")
+        if len(fields) != 3:
+            yield None
+            continue
+
+        oid, type_, size = fields
+        yield ObjectInfo(oid, type_, int(size))
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """
+    Yield the lines of a string one at a time, without splitting it into a
+    list first
+    """
+
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        if end == -1:
+            end = len(text)
+
+        yield text[start:end]
+        start = end + 1
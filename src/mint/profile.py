@@ -0,0 +1,105 @@
+"""
+Git settings for repos with large working trees
+
+git's defaults are tuned for small repos. Repos with tens of thousands of
+files in every commit spend most of the time of `git add`, `git commit` and
+`git status` reading and rewriting the index and scanning the working tree,
+which these settings make cheaper.
+
+Sample usage:
+        apply_profile(repo, LARGE_REPO_PROFILE)
+        if verify_profile(repo, LARGE_REPO_PROFILE):
+                print('Some settings could not be applied')
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    from mint.repo import Repo
+
+
+# Settings are written to the repo's own config (.git/config)
+LARGE_REPO_PROFILE = {
+    # Enables index version 4 (which compresses paths) and the untracked cache
+    "feature.manyFiles": "true",
+    "index.version": "4",
+    # Only write the entries that changed to the index (the rest are kept in a
+    # shared index file that is rewritten rarely)
+    "core.splitIndex": "true",
+    # Remember which directories have no new untracked files
+    "core.untrackedCache": "true",
+    # Stat the files in the index on several threads
+    "core.preloadIndex": "true",
+}
+
+
+def _normalize_key(key: str) -> str:
+    # Section and variable names are case-insensitive (subsections are not)
+    section, _, rest = key.partition(".")
+    subsection, _, name = rest.rpartition(".")
+    if subsection:
+        return f"{section.lower()}.{subsection}.{name.lower()}"
+
+    return f"{section.lower()}.{name.lower()}"
+
+
+def read_config(repo: Repo) -> Dict[str, str]:
+    """
+    Read the repo's own config (not the global or system config)
+
+    Returns:
+            Dict[str, str]: Value of each key (the last one, if it is set more
+            than once), by normalized key
+    """
+
+    config = {}
+    for record in repo.git.stream(
+        "config", local=True, list=True, z=True, separator="\0"
+    ):
+        if not record:
+            continue
+
+        # 'key\nvalue' ('key' alone for keys without a value)
+        key, _, value = record.partition("\n")
+        config[_normalize_key(key)] = value
+
+    return config
+
+
+def verify_profile(repo: Repo, profile: Dict[str, str]) -> Dict[str, str]:
+    """
+    Find the settings of a profile that the repo does not have
+
+    Returns:
+            Dict[str, str]: The current value of each such setting ('' if it is
+            not set)
+    """
+
+    config = read_config(repo)
+
+    mismatches = {}
+    for key, value in profile.items():
+        current = config.get(_normalize_key(key), "")
+        if current != value:
+            mismatches[key] = current
+
+    return mismatches
+
+
+def apply_profile(repo: Repo, profile: Dict[str, str]) -> List[str]:
+    """
+    Set every setting of a profile that the repo does not have yet
+
+    Settings that only affect how the index is written (like the index
+    version) take effect the next time the index is written.
+
+    Returns:
+            List[str]: Keys that were changed
+    """
+
+    changed = list(verify_profile(repo, profile))
+    for key in changed:
+        repo.git.config(key, profile[key])
+
+    return changed
@@ -1,10 +1,38 @@
 from __future__ import annotations
 import os
+from typing import Dict, Iterator, Optional
 
 import git
-from command import Command
+from command import AsyncCommand, Command
 
+from mint.cache import CachedCommand
 from mint.error import GitError
+from mint.objects import CatFile, ObjectInfo
+from mint.pack import ObjectReader
+from mint.parse import (
+    REF_FORMAT,
+    DiffEntry,
+    RefEntry,
+    StatusEntry,
+    TreeEntry,
+    WorktreeEntry,
+    iter_lines,
+    parse_batch_check,
+    parse_diff_raw,
+    parse_ls_tree,
+    parse_refs,
+    parse_status,
+    parse_worktrees,
+)
+
+
+# Filters for partial clones: only download the commits and trees (blobs are
+# downloaded when they are checked out), or only the commits
+BLOBLESS = "blob:none"
+TREELESS = "tree:0"
+
+# Subcommands that can safely run several batches of paths at the same time
+PARALLEL_SUBCOMMANDS = ["check-attr", "check-ignore", "hash-object", "ls-files"]
 
 
 class NoSuchRepoError(Exception):
@@ -33,18 +61,241 @@ class Repo:
 
     Using a Repo object:
             repo.git.commit('src', message='Some commit')  # or m='Some commit'
+
+            # Run git commands concurrently on an asyncio event loop
+            await asyncio.gather(repo.async_git.fetch(), other.async_git.fetch())
+
+            # Read objects through one long-lived `git cat-file` process
+            data = repo.objects.read('HEAD:src/Foo.java')
+
+            # Read objects by id without running git
+            data = repo.reader.read(oid)
+
+            # Parsed output of common queries
+            for entry in repo.diff_raw('HEAD'):
+                    print(entry.status, entry.dst_path)
+
+    Args:
+            path (str): Path to the working tree
+            check_path (bool): Make sure the path is a repo
+            index_file (Optional[str]): Absolute path of an index file to use
+                    instead of the repo's own index (`GIT_INDEX_FILE`)
+            config (Optional[Dict[str, str]]): Settings given to every command
+                    run through `git` and `async_git` (`git -c`), without
+                    writing them to the repo's config
     """
 
-    def __init__(self, path: str, check_path=True) -> None:
+    def __init__(
+        self,
+        path: str,
+        check_path=True,
+        index_file: Optional[str] = None,
+        config: Optional[Dict[str, str]] = None,
+    ) -> None:
         if check_path:
             Repo._ensure_repo_path_is_valid(path)
 
         self.path = path
-        self.git = Command("git", working_dir=path, error=GitError)
+        self.index_file = index_file
+        self.config = config
+
+        env = None if index_file is None else {"GIT_INDEX_FILE": index_file}
+        options = [
+            token
+            for key, value in (config or {}).items()
+            for token in ("-c", f"{key}={value}")
+        ]
+        # Read-only queries are cached until the repo changes
+        self.git = CachedCommand(
+            "git",
+            working_dir=path,
+            error=GitError,
+            parallel_subcommands=PARALLEL_SUBCOMMANDS,
+            env=env,
+            options=options,
+        )
+        self.async_git = AsyncCommand(
+            "git", working_dir=path, error=GitError, env=env, options=options
+        )
+        self.objects = CatFile(path)
+        self.reader = ObjectReader(path)
+
+    def head_commit(self) -> Optional[str]:
+        """
+        Get the commit HEAD points to
+
+        Returns:
+                Optional[str]: None if the current branch has no commits yet
+        """
+
+        try:
+            # Fails silently if HEAD does not point to a commit
+            return self.git.rev_parse("HEAD^{commit}", verify=True, quiet=True)
+        except GitError:
+            return None
+
+    def diff_raw(self, *args, **kwargs) -> Iterator[DiffEntry]:
+        """
+        Run `git diff --raw -z` with the given arguments and parse its output
+
+        Sample usage:
+                # Changes in the working tree since the last commit
+                changes = repo.diff_raw('HEAD', find_renames=True)
+        """
+
+        records = self.git.stream(
+            "diff", *args, raw=True, z=True, separator="\0", **kwargs
+        )
+        return parse_diff_raw(records)
+
+    def diff_index(self, tree_ish: str, *paths: str, **kwargs) -> Iterator[DiffEntry]:
+        """
+        Compare a tree with the working tree (`git diff-index --raw -z
+        --no-renames`), or with the index if `cached=True`
+
+        Files that changed in the working tree since they were added to the
+        index have an all-zero `dst_oid`, and files that were only touched may
+        be listed even though their content did not change.
+
+        Sample usage:
+                for entry in repo.diff_index('HEAD'):
+                        old = repo.objects.read(entry.src_oid)
+        """
+
+        records = self.git.stream(
+            "diff-index",
+            tree_ish,
+            *paths,
+            raw=True,
+            z=True,
+            no_renames=True,
+            separator="\0",
+            **kwargs,
+        )
+        return parse_diff_raw(records)
+
+    def diff_tree(
+        self, tree_ish1: str, tree_ish2: str, *paths: str, **kwargs
+    ) -> Iterator[DiffEntry]:
+        """
+        Compare two trees, including subdirectories (`git diff-tree -r --raw
+        -z --no-renames`)
+        """
+
+        records = self.git.stream(
+            "diff-tree",
+            tree_ish1,
+            tree_ish2,
+            *paths,
+            r=True,
+            raw=True,
+            z=True,
+            no_renames=True,
+            separator="\0",
+            **kwargs,
+        )
+        return parse_diff_raw(records)
+
+    def ls_tree(self, tree_ish: str, *paths: str, **kwargs) -> Iterator[TreeEntry]:
+        """
+        List the contents of a tree (options like `r=True` or `long=True` are
+        passed on to `git ls-tree`)
+        """
+
+        records = self.git.stream(
+            "ls-tree", tree_ish, *paths, z=True, separator="\0", **kwargs
+        )
+        return parse_ls_tree(records)
+
+    def status(self, *paths: str, **kwargs) -> Iterator[StatusEntry]:
+        """
+        List changed, untracked (and optionally ignored) files
+        """
+
+        records = self.git.stream(
+            "status", "--porcelain=v2", *paths, z=True, separator="\0", **kwargs
+        )
+        return parse_status(records)
+
+    def refs(self, *patterns: str, **kwargs) -> Iterator[RefEntry]:
+        """
+        List refs matching the patterns (options like `merged='HEAD'` are
+        passed on to `git for-each-ref`)
+
+        Unlike the other queries, the output is cached until the refs change
+        (see CachedCommand).
+
+        Sample usage:
+                tags = [ref.short_name for ref in repo.refs('refs/tags')]
+        """
+
+        output = self.git.for_each_ref(f"--format={REF_FORMAT}", *patterns, **kwargs)
+        return parse_refs(iter_lines(output))
+
+    def worktrees(self) -> Iterator[WorktreeEntry]:
+        """
+        List the main worktree and all linked worktrees of the repo
+        """
+
+        records = self.git.stream(
+            "worktree", "list", "--porcelain", "-z", separator="\0"
+        )
+        return parse_worktrees(records)
+
+    def fetch_branches(self, remote: str, *branches: str, **kwargs) -> None:
+        """
+        Fetch only some branches of a remote (into `refs/remotes/<remote>/`)
+
+        Sample usage:
+                # Only the latest commit of one branch
+                repo.fetch_branches('origin', '1.18', depth=1)
+        """
+
+        refspecs = [
+            f"+refs/heads/{branch}:refs/remotes/{remote}/{branch}"
+            for branch in branches
+        ]
+        self.git.fetch(remote, *refspecs, **kwargs)
+
+    def sparse_checkout(self, *patterns: str, cone: bool = True) -> None:
+        """
+        Only check out some directories (or, with `cone=False`, paths matching
+        gitignore-style patterns) in the working tree
+
+        Call with no patterns to check out everything again.
+        """
+
+        if not patterns:
+            self.git.sparse_checkout("disable")
+        elif cone:
+            self.git.sparse_checkout("set", "--cone", *patterns)
+        else:
+            self.git.sparse_checkout("set", "--no-cone", *patterns)
+
+    def is_shallow(self) -> bool:
+        return self.git.rev_parse(is_shallow_repository=True) == "true"
+
+    def all_objects(self) -> Iterator[ObjectInfo]:
+        """
+        List every object in the repo (including unreachable ones)
+        """
+
+        records = self.git.stream(
+            "cat-file", batch_check=True, batch_all_objects=True, unordered=True
+        )
+        return parse_batch_check(records)
 
     def to_gitpython(self) -> git.Repo:
         return git.Repo(self.path)
 
+    def close(self) -> None:
+        """
+        Stop any long-lived git processes started for this repo
+        """
+
+        self.objects.close()
+        self.reader.close()
+
     @staticmethod
     def _ensure_repo_path_is_valid(path: str):
         if not os.path.exists(path):
@@ -59,16 +310,35 @@ class Repo:
             raise NoSuchRepoError(path)
 
     @staticmethod
-    def init(path: str, **kwargs) -> Repo:
+    def init(path: str, config: Optional[Dict[str, str]] = None, **kwargs) -> Repo:
+        """
+        Create an empty repo
+
+        Options are passed on to `git init`. `config` is given to the returned
+        Repo (see Repo()).
+        """
+
         if not os.path.exists(path):
             os.mkdir(path)
 
-        repo = Repo(path, check_path=False)
+        repo = Repo(path, check_path=False, config=config)
         repo.git.init(**kwargs)
         return repo
 
     @staticmethod
     def clone(remote: str, dest: str, **kwargs) -> Repo:
+        """
+        Clone a repo
+
+        Options are passed on to `git clone`. Large repos can be cloned
+        partially (`filter=BLOBLESS` or `filter=TREELESS`), shallowly
+        (`depth=1`) or with only one branch (`single_branch=True`), in which
+        case more can be fetched later with fetch_branches().
+
+        Sample usage:
+                repo = Repo.clone(REMOTE_URL, DESTINATION, filter=BLOBLESS, depth=1)
+        """
+
         git = Command("git", error=GitError)
         git.clone(remote, dest, **kwargs)
         return Repo(dest)
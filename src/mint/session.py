@@ -0,0 +1,226 @@
+"""
+Sessions for git plumbing commands that read requests from stdin
+
+Each class keeps one git process open for any number of requests (see
+command.session). Close them (or use them as context managers) when done.
+
+Sample usage:
+        with ObjectWriter(repo) as objects, IndexUpdater(repo) as index:
+                for path in paths:
+                        index.add('100644', objects.write(path).result(), path)
+"""
+
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+
+from command.session import Session, read_fields, read_line
+
+if TYPE_CHECKING:
+    from mint.repo import Repo
+
+# Object id git uses for "no object"
+NULL_OID = "0" * 40
+
+
+class _RepoSession:
+    def __init__(self, repo: Repo, session: Session) -> None:
+        self._repo = repo
+        self._session = session
+
+    def flush(self) -> None:
+        self._session.flush()
+
+    def close(self) -> None:
+        # CachedCommand forgets what it knew about the repo once the process
+        # exited
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class ObjectWriter(_RepoSession):
+    """
+    Writes files to the object database (`git hash-object -w --stdin-paths`)
+    """
+
+    def __init__(self, repo: Repo, write: bool = True) -> None:
+        super().__init__(
+            repo,
+            repo.git.session(
+                "hash-object", w=write, stdin_paths=True, response=read_line
+            ),
+        )
+
+    def write(self, path: str) -> Future:
+        """
+        Hash a file (relative to the repo) and write it to the object database
+
+        Returns:
+                Future: The object id of the blob
+        """
+
+        if "\n" in path:
+            raise ValueError(f"Paths cannot contain newlines: {path!r}")
+
+        return self._session.request(path)
+
+
+class IndexUpdater(_RepoSession):
+    """
+    Changes index entries without touching the working tree (`git update-index
+    -z --index-info`)
+    """
+
+    def __init__(self, repo: Repo) -> None:
+        super().__init__(
+            repo,
+            repo.git.session("update-index", z=True, index_info=True, terminator="\0"),
+        )
+
+    def add(self, mode: str, oid: str, path: str) -> None:
+        """
+        Add or replace the entry for a path
+        """
+
+        self._session.request(f"{mode} {oid}\t{path}")
+
+    def remove(self, path: str) -> None:
+        self._session.request(f"0 {NULL_OID}\t{path}")
+
+
+class RefTransaction(_RepoSession):
+    """
+    Changes several refs at once (`git update-ref --stdin`)
+
+    Updates are queued until commit() is called, and either all of them are
+    applied or none are. After committing, the same object can be used for
+    another transaction.
+
+    Sample usage:
+            with RefTransaction(repo) as refs:
+                    refs.create('refs/tags/1.18', oid)
+                    refs.create('refs/tags/1.19', other_oid)
+                    refs.commit()
+    """
+
+    def __init__(self, repo: Repo) -> None:
+        super().__init__(repo, repo.git.session("update-ref", stdin=True))
+        self._started = False
+
+    def _start(self) -> None:
+        if not self._started:
+            self._session.request("start", response=read_line)
+            self._started = True
+
+    def update(self, ref: str, new_oid: str, old_oid: Optional[str] = None) -> None:
+        """
+        Point a ref at an object (if `old_oid` is given, only if the ref still
+        points to it)
+        """
+
+        self._start()
+        args = [ref, new_oid] if old_oid is None else [ref, new_oid, old_oid]
+        self._session.request(" ".join(["update", *args]))
+
+    def create(self, ref: str, new_oid: str) -> None:
+        """
+        Create a ref that must not exist yet (the transaction fails if it does)
+        """
+
+        self._start()
+        self._session.request(f"create {ref} {new_oid}")
+
+    def delete(self, ref: str, old_oid: Optional[str] = None) -> None:
+        self._start()
+        args = [ref] if old_oid is None else [ref, old_oid]
+        self._session.request(" ".join(["delete", *args]))
+
+    def commit(self) -> None:
+        """
+        Apply all queued updates
+
+        Raises:
+                GitError: If any update failed (in which case none are applied)
+        """
+
+        if not self._started:
+            return
+
+        response = self._session.request("commit", response=read_line)
+        self._session.flush()
+        self._started = False
+        response.result()
+
+        self._repo.git.invalidate()
+
+
+class AttributeChecker(_RepoSession):
+    """
+    Looks up git attributes of paths (`git check-attr -z --stdin`)
+    """
+
+    def __init__(self, repo: Repo, attributes: Iterable[str]) -> None:
+        attributes = list(attributes)
+
+        # Each attribute is reported as 'path\0attribute\0value\0'
+        read_attributes = read_fields(3 * len(attributes))
+
+        def read(stdout: IO[bytes]) -> Dict[str, str]:
+            fields = read_attributes(stdout)
+            return {fields[i + 1]: fields[i + 2] for i in range(0, len(fields), 3)}
+
+        super().__init__(
+            repo,
+            repo.git.session(
+                "check-attr",
+                *attributes,
+                z=True,
+                stdin=True,
+                response=read,
+                terminator="\0",
+            ),
+        )
+
+    def check(self, path: str) -> Future:
+        """
+        Returns:
+                Future: Dict mapping each attribute to its value ('set',
+                'unset', 'unspecified' or the value)
+        """
+
+        return self._session.request(path)
+
+
+class TreeBuilder(_RepoSession):
+    """
+    Writes tree objects from lists of entries (`git mktree --batch`)
+    """
+
+    def __init__(self, repo: Repo) -> None:
+        super().__init__(
+            repo, repo.git.session("mktree", batch=True, response=read_line)
+        )
+
+    def write(self, entries: Iterable[Tuple[str, str, str, str]]) -> Future:
+        """
+        Write one tree
+
+        Args:
+                entries (Iterable[Tuple[str, str, str, str]]): Mode, type, object
+                        id and name of each entry
+
+        Returns:
+                Future: The object id of the tree
+        """
+
+        lines = [f"{mode} {type_} {oid}\t{name}" for mode, type_, oid, name in entries]
+        for line in lines:
+            self._session.request(line, response=None)
+
+        # An empty line ends the tree
+        return self._session.request("")
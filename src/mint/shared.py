@@ -0,0 +1,372 @@
+"""
+Object stores shared by several repos (`objects/info/alternates`)
+
+Repos that hold similar content (like the same sources decompiled with
+different mappings) have many identical objects. A shared store is a bare repo
+that these repos list as an alternate, so every object in it is read through
+it instead of being stored by each repo. git does not write an object that an
+alternate already has, so only the first repo to create an object pays for
+writing it.
+
+Objects that a repo created itself are moved to the store by share(): its
+packs are linked (or copied) into the store and then removed from the repo, so
+they are not written again. The refs of each repo are recorded in the store
+(under `refs/members/<member>/`), and so are the commits that only its HEAD or
+reflogs reach and a tree of its index (under `refs/member-state/<member>/`),
+which is what keeps their objects from being collected there.
+
+The store is only ever repacked by maintain(), which follows these rules to
+never delete an object that a repo could need:
+
+- Every repo records its refs (and HEAD, reflogs and index) in the store when
+  its objects are moved there. Repos that were deleted keep their refs (and
+  objects) until their refs are deleted by hand.
+- Objects that no ref reaches are kept for PRUNE_EXPIRE after they were moved
+  to the store before they are deleted, since a repo may have moved them there
+  before recording the ref that reaches them. Moved packs are touched, so the
+  objects that are loosened from them do not count as old.
+- git never collects the store by itself (`gc.auto=0`), and repos repack
+  with `-l`, so they never copy the store's objects back.
+
+Sample usage:
+        store = SharedObjectStore(os.path.expanduser('~/.cache/objects'))
+        store.add(repo)
+        ...  # commits
+        store.share(repo)
+        print(store.maintain())
+"""
+
+from __future__ import annotations
+import glob
+import hashlib
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+
+from mint.lock import FileLock
+from mint.maintenance import (
+    DEFAULT_DEPTH,
+    DEFAULT_WINDOW,
+    MaintenanceReport,
+    count_objects,
+)
+from mint.objects import NoSuchObjectError
+from mint.pack import find_objects_dir, read_alternates
+from mint.parse import RefEntry
+from mint.repo import Repo
+from mint.session import IndexUpdater, RefTransaction
+
+# Settings of the store's own repo
+STORE_SETTINGS = {"gc.auto": "0", "maintenance.auto": "false"}
+
+# Where the refs of each repo are recorded in the store
+MEMBER_REFS = "refs/members"
+
+# Where the objects that each repo reaches without a ref (through HEAD, its
+# reflogs and its index) are recorded in the store
+STATE_REFS = "refs/member-state"
+
+# Temporary index the tree of a repo's index is built in (in the store)
+STATE_INDEX = "mint-state.index"
+
+# Number of packs in the store above which maintain() repacks everything into
+# one pack (git's own limit for `gc --auto`)
+PACK_LIMIT = 50
+
+# Unreachable objects in the store are deleted once they are this old (git's
+# own grace period for `gc`)
+PRUNE_EXPIRE = "2.weeks.ago"
+
+# Extensions of the files that make up a pack, in the order they are moved
+# (git only looks for packs by their index, so it comes after the pack)
+PACK_FILES = [".pack", ".rev", ".idx"]
+
+
+def _link_or_copy(src: str, dest: str) -> None:
+    try:
+        os.link(src, dest)
+    except FileExistsError:
+        pass
+    except OSError:
+        # On another file system
+        tmp = dest + ".tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+
+
+def _kept_commits(repo: Repo) -> List[str]:
+    # Commits that only HEAD or a reflog reaches (like a detached HEAD or a
+    # commit that was amended)
+    if repo.head_commit() is None:
+        return []
+
+    unreachable = set(
+        repo.git.rev_list("--reflog", "HEAD", "--not", "--glob=refs/*").split()
+    )
+    if not unreachable:
+        return []
+
+    tips = repo.git.rev_list("--no-walk", "--reflog", "HEAD").split()
+    return sorted(set(tips) & unreachable)
+
+
+def _index_entries(repo: Repo) -> List[Tuple[str, str, str]]:
+    # Mode, object id and path of each entry of the index. Every stage of a
+    # path gets a path of its own, so the entries fit in one tree.
+    if repo.git.rev_parse(is_bare_repository=True) == "true":
+        return []
+
+    entries = []
+    for record in repo.git.stream("ls-files", stage=True, z=True, separator="\0"):
+        info, path = record.split("\t", 1)
+        mode, oid, stage = info.split()
+        if mode == "160000":
+            # The commits of submodules are in their own repos
+            continue
+
+        entries.append((mode, oid, f"{stage}/{path}"))
+
+    return entries
+
+
+class SharedObjectStore:
+    """
+    Bare repo whose objects are shared with other repos through their
+    alternates
+
+    The store is created if it does not exist. Changes to it are made while
+    holding a lock in it, so repos can be shared from several processes.
+
+    Args:
+            path (str): Directory of the store
+            lock_timeout (Optional[float]): Seconds to wait for another process
+                    using the store (None waits as long as it takes)
+    """
+
+    def __init__(self, path: str, lock_timeout: Optional[float] = None) -> None:
+        self.path = os.path.abspath(path)
+        self.objects_dir = os.path.join(self.path, "objects")
+        self._lock = FileLock(
+            os.path.join(self.path, "mint-shared.lock"), timeout=lock_timeout
+        )
+
+        with self._lock:
+            if not os.path.exists(os.path.join(self.path, "HEAD")):
+                os.makedirs(self.path, exist_ok=True)
+                Repo.init(self.path, bare=True, q=True)
+
+            self.repo = Repo(self.path, check_path=False)
+            for key, value in STORE_SETTINGS.items():
+                self.repo.git.config(key, value)
+
+    @staticmethod
+    def member_name(repo: Repo) -> str:
+        """
+        Returns:
+                str: Name the refs of a repo are recorded under in the store
+        """
+
+        git_dir = repo.git.rev_parse(absolute_git_dir=True)
+        return hashlib.sha1(git_dir.encode()).hexdigest()[:16]
+
+    def add(self, repo: Repo) -> bool:
+        """
+        Make a repo read objects from the store (by adding the store to its
+        alternates)
+
+        Returns:
+                bool: True if the store was added, False if the repo already had
+                it
+        """
+
+        objects_dir = find_objects_dir(repo.path)
+        if self.objects_dir in read_alternates(objects_dir):
+            return False
+
+        path = os.path.join(objects_dir, "info", "alternates")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(self.objects_dir + "\n")
+
+        return True
+
+    def _movable_packs(self, objects_dir: str) -> List[str]:
+        # Packs of the repo without their extension, except for the ones that
+        # are kept on purpose or still being written (fast-import, for
+        # example, keeps its packs until it exits)
+        packs = []
+        for idx_path in sorted(glob.glob(os.path.join(objects_dir, "pack", "*.idx"))):
+            base = idx_path[: -len(".idx")]
+            if os.path.exists(base + ".keep") or os.path.exists(base + ".promisor"):
+                continue
+
+            packs.append(base)
+
+        return packs
+
+    def share(self, repo: Repo) -> int:
+        """
+        Move the packed objects of a repo to the store, and record its refs
+        there
+
+        The commits that only the repo's HEAD or reflogs reach, and the objects
+        in its index, are recorded too. Loose objects stay in the repo, so
+        pack them first (see mint.maintenance.maintain()). Refs that point to
+        objects the store does not have keep the value recorded before. The
+        repo must already use the store (see add()), and nothing else may write
+        to it in the meantime.
+
+        Returns:
+                int: Number of packs moved
+        """
+
+        objects_dir = find_objects_dir(repo.path)
+        name = SharedObjectStore.member_name(repo)
+        refs = list(repo.refs())
+        kept = _kept_commits(repo)
+        staged = _index_entries(repo)
+
+        with self._lock:
+            packs = self._movable_packs(objects_dir)
+            moved = []
+            for base in packs:
+                dest_base = os.path.join(
+                    self.objects_dir, "pack", os.path.basename(base)
+                )
+                for ext in PACK_FILES:
+                    if os.path.exists(base + ext):
+                        _link_or_copy(base + ext, dest_base + ext)
+                        # A link keeps the time the repo wrote the pack, which
+                        # would make its unreachable objects old enough to
+                        # prune as soon as they are loosened
+                        os.utime(dest_base + ext)
+
+                moved.append(base)
+
+            state = {f"{STATE_REFS}/{name}/kept/{commit}": commit for commit in kept}
+            tree = self._index_tree(staged)
+            if tree is not None:
+                state[f"{STATE_REFS}/{name}/index"] = tree
+
+            self._record_refs(name, refs, state)
+
+        if moved:
+            # The multi-pack-index and bitmaps of the repo describe the packs
+            # that are about to be removed
+            for path in glob.glob(os.path.join(objects_dir, "pack", "multi-pack-*")):
+                os.remove(path)
+
+            # Every object is in the store now, so the repo can let go of them
+            for base in moved:
+                for ext in reversed(PACK_FILES + [".bitmap"]):
+                    try:
+                        os.remove(base + ext)
+                    except FileNotFoundError:
+                        pass
+
+        return len(moved)
+
+    def _has_object(self, oid: str) -> bool:
+        try:
+            self.repo.objects.info(oid)
+        except NoSuchObjectError:
+            return False
+
+        return True
+
+    def _index_tree(self, entries: List[Tuple[str, str, str]]) -> Optional[str]:
+        # Tree of the index entries whose objects the store has (built in an
+        # index of its own). Objects the store does not have are still in the
+        # repo.
+        entries = [entry for entry in entries if self._has_object(entry[1])]
+        if not entries:
+            return None
+
+        index_file = os.path.join(self.path, STATE_INDEX)
+        if os.path.exists(index_file):
+            # Left behind by a process that died while holding the lock
+            os.remove(index_file)
+
+        repo = Repo(self.path, check_path=False, index_file=index_file)
+        try:
+            with IndexUpdater(repo) as index:
+                for mode, oid, path in entries:
+                    index.add(mode, oid, path)
+
+            return repo.git.write_tree()
+        finally:
+            repo.close()
+            os.remove(index_file)
+
+    def _record_refs(
+        self, name: str, refs: List[RefEntry], state: Dict[str, str]
+    ) -> None:
+        # Refs that point to objects the store does not have yet (because they
+        # are in packs that were not moved) keep their previous value
+        prefix = f"{MEMBER_REFS}/{name}/"
+        state_prefix = f"{STATE_REFS}/{name}/"
+        recorded = {ref.name: ref.oid for ref in self.repo.refs(prefix, state_prefix)}
+        current = {prefix + ref.name[len("refs/") :]: ref.oid for ref in refs}
+        current.update(state)
+
+        changed = {
+            ref: oid
+            for ref, oid in current.items()
+            if recorded.get(ref) != oid and self._has_object(oid)
+        }
+        removed = [ref for ref in recorded if ref not in current]
+        if not changed and not removed:
+            return
+
+        with RefTransaction(self.repo) as transaction:
+            for ref, oid in changed.items():
+                transaction.update(ref, oid)
+
+            for ref in removed:
+                transaction.delete(ref)
+
+            transaction.commit()
+
+    def maintain(
+        self, window: int = DEFAULT_WINDOW, depth: int = DEFAULT_DEPTH
+    ) -> MaintenanceReport:
+        """
+        Pack the store's loose objects and index its packs
+
+        Once the store has more than PACK_LIMIT packs, everything is repacked
+        into one pack instead, which drops the objects that several repos
+        moved there. Objects that no ref reaches are kept for PRUNE_EXPIRE
+        after they were moved to the store.
+
+        Returns:
+                MaintenanceReport:
+        """
+
+        with self._lock:
+            start = time.perf_counter()
+            before = count_objects(self.repo)
+
+            if before["packs"] > PACK_LIMIT:
+                # Unreachable objects are loosened instead of deleted, and only
+                # pruned once they are old enough
+                self.repo.git.repack(
+                    a=True, d=True, A=True, window=window, depth=depth, q=True
+                )
+                self.repo.git.prune(expire=PRUNE_EXPIRE)
+            else:
+                self.repo.git.repack(d=True, window=window, depth=depth, q=True)
+
+            self.repo.git.multi_pack_index("write")
+
+            after = count_objects(self.repo)
+            return MaintenanceReport(
+                time.perf_counter() - start,
+                before["size"] + before["size-pack"],
+                after["size"] + after["size-pack"],
+                before["count"],
+                after["packs"],
+            )
+
+    def close(self) -> None:
+        self.repo.close()
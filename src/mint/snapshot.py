@@ -0,0 +1,166 @@
+"""
+Snapshots of the directories that the commit backends commit
+
+FastImport and CommitBuilder both commit the current contents of some
+directories on top of the tip of a branch, without `git add`. Snapshots keeps
+track of the files the branch holds in each directory, finds the files that
+may have changed since, and collects the changes to apply to the repo's index
+once the commits are written.
+"""
+
+from __future__ import annotations
+import os
+import stat
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set, Tuple
+
+from mint.session import IndexUpdater
+
+if TYPE_CHECKING:
+    from mint.repo import Repo
+
+
+# Mode, object id and size of each file, by path
+Snapshot = Dict[str, Tuple[str, str, int]]
+
+
+def file_mode(info: os.stat_result) -> str:
+    """
+    Returns:
+            str: Mode git stores a file with
+    """
+
+    if stat.S_ISLNK(info.st_mode):
+        return "120000"
+
+    return "100755" if info.st_mode & stat.S_IXUSR else "100644"
+
+
+def read_file(path: str) -> Tuple[str, bytes]:
+    """
+    Read a file the way git stores it
+
+    Returns:
+            Tuple[str, bytes]: Mode and content
+    """
+
+    info = os.lstat(path)
+    if stat.S_ISLNK(info.st_mode):
+        return file_mode(info), os.fsencode(os.readlink(path))
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    return file_mode(info), data
+
+
+def walk(repo_path: str, directory: str) -> Iterator[str]:
+    """
+    Yields:
+            str: Path of each file in a directory, relative to the repo (with
+            '/' separators)
+    """
+
+    root = os.path.join(repo_path, directory)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        relative = os.path.relpath(dirpath, repo_path).replace(os.sep, "/")
+        for name in sorted(filenames):
+            yield f"{relative}/{name}"
+
+
+class Snapshots:
+    """
+    Files of some directories at the tip of a branch, as commits are made on
+    top of it
+
+    The repo's index matches the commit the tip started at, and is only
+    updated with the files that changed since by update_index() (once the
+    commits are written to the repo).
+
+    Args:
+            repo (Repo)
+            commit (Optional[str]): Tip of the branch (None if it has no
+                    commits)
+    """
+
+    def __init__(self, repo: Repo, commit: Optional[str]) -> None:
+        self._repo = repo
+        self._commit = commit
+        self._snapshots: Dict[str, Snapshot] = {}
+        # Index entries to update (None removes a path)
+        self._index_changes: Dict[str, Optional[Tuple[str, str]]] = {}
+
+    def get(self, directory: str) -> Snapshot:
+        """
+        Returns:
+                Snapshot: Files in a directory at the tip of the branch
+        """
+
+        if directory not in self._snapshots:
+            snapshot = {}
+            if self._commit is not None:
+                entries = self._repo.ls_tree(self._commit, directory, r=True, long=True)
+                for entry in entries:
+                    if entry.type == "blob":
+                        snapshot[entry.path] = (entry.mode, entry.oid, entry.size)
+
+            self._snapshots[directory] = snapshot
+
+        return self._snapshots[directory]
+
+    def changed_paths(self, directory: str) -> List[str]:
+        """
+        Files in a directory that may differ from the tip of the branch
+
+        These are the files that `git status` reports (including untracked and
+        ignored ones), and the ones committed since the index was updated.
+        """
+
+        paths: Set[str] = set()
+        entries = self._repo.status(
+            "--untracked-files=all", "--ignored=matching", directory, no_renames=True
+        )
+        for entry in entries:
+            if entry.path.endswith("/"):
+                # An ignored directory
+                paths.update(walk(self._repo.path, entry.path.rstrip("/")))
+            else:
+                paths.add(entry.path)
+
+        prefix = directory.rstrip("/") + "/"
+        paths.update(path for path in self._index_changes if path.startswith(prefix))
+
+        return sorted(paths)
+
+    def add(self, directory: str, path: str, mode: str, oid: str, size: int) -> None:
+        """
+        Record a file that was committed
+        """
+
+        self.get(directory)[path] = (mode, oid, size)
+        self._index_changes[path] = (mode, oid)
+
+    def remove(self, directory: str, path: str) -> None:
+        """
+        Record a file that was deleted
+        """
+
+        del self.get(directory)[path]
+        self._index_changes[path] = None
+
+    def update_index(self) -> None:
+        """
+        Apply the files that were committed or deleted to the repo's index
+        """
+
+        if not self._index_changes:
+            return
+
+        with IndexUpdater(self._repo) as index:
+            for path, entry in self._index_changes.items():
+                if entry is None:
+                    index.remove(path)
+                else:
+                    index.add(*entry, path)
+
+        self._index_changes.clear()
@@ -0,0 +1,191 @@
+"""
+Pools of linked worktrees (`git worktree`)
+
+A pool hands out working directories that share the object store of one repo,
+so several commits can be checked out (and built) at the same time without
+cloning the repo again. Worktrees are locked while they are in use, and are
+reused (instead of created again) once they are given back.
+
+Sample usage:
+        pool = WorktreePool(repo, os.path.join(repo.path, '.git', 'pool'))
+        with pool.checkout('origin/1.18') as worktree:
+                Project(worktree.path).gradle.decompileCFR()
+"""
+
+from __future__ import annotations
+import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, List, Optional, Set
+
+from mint.lock import is_running
+
+if TYPE_CHECKING:
+    from mint.repo import Repo
+
+# Number of idle worktrees kept by prune()
+DEFAULT_MAX_IDLE = 4
+
+# Reason given when locking a worktree (followed by the id of the process)
+LOCK_REASON = "in use by process"
+
+
+def _lock_owner(reason: Optional[str]) -> Optional[int]:
+    # The process that locked a worktree, if a pool locked it
+    if reason is None or not reason.startswith(LOCK_REASON + " "):
+        return None
+
+    try:
+        return int(reason[len(LOCK_REASON) + 1 :])
+    except ValueError:
+        return None
+
+
+class WorktreePool:
+    """
+    Linked worktrees of a repo, created under one directory and reused
+
+    Worktrees left in the directory by an earlier pool (including ones locked
+    by a process that no longer runs) are reused too.
+
+    Args:
+            repo (Repo): Repo the worktrees belong to
+            directory (str): Directory to create the worktrees in (one
+                    subdirectory each)
+            max_idle (int): Number of idle worktrees kept by prune()
+    """
+
+    def __init__(
+        self, repo: Repo, directory: str, max_idle: int = DEFAULT_MAX_IDLE
+    ) -> None:
+        self._repo = repo
+        self._directory = os.path.realpath(directory)
+        self._max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle: List[str] = []
+        self._busy: Set[str] = set()
+
+        # Forget worktrees whose directories were deleted
+        repo.git.worktree("prune")
+
+        for entry in repo.worktrees():
+            path = os.path.realpath(entry.path)
+            if os.path.dirname(path) != self._directory:
+                continue
+
+            if entry.locked is not None:
+                owner = _lock_owner(entry.locked)
+                if owner is None or is_running(owner):
+                    # Someone else is using it
+                    continue
+
+                repo.git.worktree("unlock", path)
+
+            self._idle.append(path)
+
+    def _new_path(self) -> str:
+        taken = set(self._idle) | self._busy
+        i = 0
+        while True:
+            path = os.path.join(self._directory, str(i))
+            if path not in taken and not os.path.exists(path):
+                return path
+
+            i += 1
+
+    def acquire(self, commit: str) -> Repo:
+        """
+        Check out a commit in a worktree that nobody else is using
+
+        The worktree is locked until it is released. Any changes left in it
+        (including untracked files that are not ignored) are discarded.
+
+        Args:
+                commit (str): Commit to check out (HEAD is detached)
+
+        Returns:
+                Repo: The worktree
+        """
+
+        # Repo imports this module
+        from mint.repo import Repo
+
+        with self._lock:
+            reused = len(self._idle) > 0
+            path = self._idle.pop() if reused else self._new_path()
+            self._busy.add(path)
+
+        try:
+            if reused:
+                self._lock_worktree(path)
+                worktree = Repo(path, check_path=False)
+                worktree.git.checkout(commit, detach=True, force=True)
+                worktree.git.clean(force=True, d=True)
+            else:
+                os.makedirs(self._directory, exist_ok=True)
+                self._repo.git.worktree("add", "--detach", path, commit)
+                self._lock_worktree(path)
+                worktree = Repo(path, check_path=False)
+
+        except BaseException:
+            # Leave the worktree to prune() (it may be broken)
+            with self._lock:
+                self._busy.discard(path)
+
+            raise
+
+        return worktree
+
+    def _lock_worktree(self, path: str) -> None:
+        self._repo.git.worktree(
+            "lock", "--reason", f"{LOCK_REASON} {os.getpid()}", path
+        )
+
+    def release(self, worktree: Repo) -> None:
+        """
+        Give back a worktree returned by acquire(), so it can be reused
+        """
+
+        path = worktree.path
+        worktree.close()
+        self._repo.git.worktree("unlock", path)
+
+        with self._lock:
+            self._busy.discard(path)
+            self._idle.append(path)
+
+    @contextmanager
+    def checkout(self, commit: str) -> Iterator[Repo]:
+        """
+        Acquire a worktree for the duration of a with block
+        """
+
+        worktree = self.acquire(commit)
+        try:
+            yield worktree
+        finally:
+            self.release(worktree)
+
+    def prune(self) -> None:
+        """
+        Remove idle worktrees beyond `max_idle` (the ones idle the longest
+        first), and forget worktrees whose directories were deleted
+        """
+
+        with self._lock:
+            count = max(len(self._idle) - self._max_idle, 0)
+            removed = self._idle[:count]
+            self._idle = self._idle[count:]
+
+        for path in removed:
+            self._repo.git.worktree("remove", "--force", path)
+
+        self._repo.git.worktree("prune")
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def busy(self) -> int:
+        return len(self._busy)
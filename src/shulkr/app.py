@@ -1,15 +1,39 @@
 import os
 import sys
-from typing import List
+from typing import List, Optional
 
 import click
-from minecraft.version import NoSuchVersionError, Version, load_manifest
+from command.replay import Recorder, Replayer, get_interceptor, set_interceptor
+from command.spawn import close_spawner, init_spawner
+from minecraft.version import NoSuchVersionError, Version, fetch_manifest, load_manifest
+from mint.maintenance import maintain, needs_maintenance
 
 from shulkr.compatibility import is_compatible
 from shulkr.config import init_config
 from shulkr.gitignore import ensure_gitignore_exists
-from shulkr.repo import init_repo
+from shulkr.locks import close_locks, init_locks, queue_write, worktree_lock
+from shulkr.repo import (
+    close_committer,
+    close_shared_objects,
+    get_repo,
+    get_shared_objects,
+    init_committer,
+    init_repo,
+    init_shared_objects,
+)
+from shulkr.trace import init_tracer, save_trace, span
 from shulkr.version import create_version, get_latest_generated_version
+from shulkr.version_index import init_version_index
+
+
+# Directories (inside the repo) that the decompilers run in. When recording or
+# replaying a run, the commands run in them and their effects are recorded or
+# replayed.
+DECOMPILER_DIRS = ["yarn", "DecompilerMC"]
+
+# Versions generated between maintenance passes (there is one at the end of a
+# run too, if enough was written)
+MAINTENANCE_INTERVAL = 25
 
 
 def run(
@@ -19,13 +43,113 @@ def run(
     message_template: str,
     tags: bool,
     undo_renamed_vars: bool,
+    trace_path: str = None,
+    record_path: str = None,
+    replay_path: str = None,
+    replay_latency: Optional[float] = None,
+    commit_backend: str = "git",
+    lock_timeout: Optional[float] = None,
+    shared_objects: Optional[str] = None,
+) -> None:
+
+    if record_path is not None and replay_path is not None:
+        raise ValueError("A run cannot be recorded and replayed at the same time")
+
+    roots = [os.path.join(os.getcwd(), repo_path, name) for name in DECOMPILER_DIRS]
+    if record_path is not None:
+        set_interceptor(Recorder(record_path, roots))
+    elif replay_path is not None:
+        set_interceptor(Replayer(replay_path, roots, latency=replay_latency))
+
+    if trace_path is not None:
+        init_tracer()
+
+    # Start processes through a helper that stays small, since this process
+    # grows while undoing renamed variables
+    init_spawner()
+
+    try:
+        _run(
+            versions,
+            mappings,
+            repo_path,
+            message_template,
+            tags,
+            undo_renamed_vars,
+            commit_backend,
+            lock_timeout,
+            shared_objects,
+        )
+
+    finally:
+        close_committer()
+        close_locks()
+        close_shared_objects()
+
+        if trace_path is not None:
+            save_trace(trace_path)
+
+        interceptor = get_interceptor()
+        if isinstance(interceptor, Recorder):
+            interceptor.save()
+
+        set_interceptor(None)
+        close_spawner()
+
+
+def _load_manifest() -> None:
+    # The manifest is downloaded without running a command, so it is saved
+    # with the recording separately
+    interceptor = get_interceptor()
+    if isinstance(interceptor, Replayer):
+        load_manifest(interceptor.get_data("manifest"))
+
+    elif isinstance(interceptor, Recorder):
+        raw = fetch_manifest()
+        interceptor.set_data("manifest", raw)
+        load_manifest(raw)
+
+    else:
+        load_manifest()
+
+
+def _maintain() -> None:
+    click.echo("Maintaining the repo")
+    with span("maintenance"):
+        report = queue_write(maintain, get_repo())
+
+    click.echo(f"+ {report}")
+
+    store = get_shared_objects()
+    if store is not None:
+        click.echo("Moving objects to the shared object store")
+        with span("share objects"):
+            queue_write(store.share, get_repo())
+            report = store.maintain()
+
+        click.echo(f"+ {report}")
+
+
+def _run(
+    versions: List[str],
+    mappings: str,
+    repo_path: str,
+    message_template: str,
+    tags: bool,
+    undo_renamed_vars: bool,
+    commit_backend: str,
+    lock_timeout: Optional[float],
+    shared_objects: Optional[str],
 ) -> None:
 
-    load_manifest()
+    _load_manifest()
 
     full_repo_path = os.path.join(os.getcwd(), repo_path)
 
     init_output = not init_repo(full_repo_path)
+    init_locks(lock_timeout)
+    if shared_objects is not None:
+        init_shared_objects(shared_objects, lock_timeout)
 
     if not is_compatible():
         click.secho(
@@ -36,22 +160,26 @@ def run(
         )
         sys.exit(4)
 
-    init_output = (
-        not init_config(
-            full_repo_path, mappings, message_template, tags, undo_renamed_vars
+    # Another run on the repo could be committing its config or .gitignore too
+    with worktree_lock():
+        init_output = (
+            not init_config(
+                full_repo_path, mappings, message_template, tags, undo_renamed_vars
+            )
+            or init_output
         )
-        or init_output
-    )
-    init_output = not ensure_gitignore_exists() or init_output
+        init_output = not ensure_gitignore_exists() or init_output
 
     # If we printed anything in the initialization step, print a newline
     if init_output:
         click.echo()
 
+    # Find the versions in the repo (after anything above committed to it)
+    init_version_index()
+    latest_in_repo = get_latest_generated_version()
+
     try:
-        resolved_versions = Version.patterns(
-            versions, latest_in_repo=get_latest_generated_version()
-        )
+        resolved_versions = Version.patterns(versions, latest_in_repo=latest_in_repo)
 
     except NoSuchVersionError as e:
         click.secho(e, err=True, fg="red")
@@ -61,10 +189,10 @@ def run(
         click.secho("No versions selected", color="yellow")
         sys.exit(0)
 
-    if resolved_versions[0] < get_latest_generated_version():
+    if resolved_versions[0] < latest_in_repo:
         click.secho(
             "The latest version in the repo is "
-            + get_latest_generated_version().id
+            + latest_in_repo.id
             + ", but you selected "
             + resolved_versions[0].id
             + ". Please select a version that is newer than the latest "
@@ -74,9 +202,21 @@ def run(
         )
         sys.exit(3)
 
+    init_committer(commit_backend)
+
     for i, version in enumerate(resolved_versions):
-        create_version(version)
+        with span("version", version=version.id):
+            create_version(version)
 
         # Print line between the output of generating each version
         if i < len(resolved_versions) - 1:
             click.echo()
+
+            if (i + 1) % MAINTENANCE_INTERVAL == 0:
+                _maintain()
+                click.echo()
+
+    # Short runs leave too little behind to be worth a pass of their own
+    if needs_maintenance(get_repo()):
+        click.echo()
+        _maintain()
@@ -2,8 +2,10 @@ import sys
 from typing import List
 
 import click
+from mint.lock import LockTimeoutError
 
 from shulkr.app import run
+from shulkr.repo import COMMIT_BACKENDS
 
 
 @click.command(
@@ -41,6 +43,67 @@ from shulkr.app import run
         "original names (experimental)"
     ),
 )
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help=(
+        "Write a Chrome trace of the run (stages and the processes they ran) "
+        "to this file"
+    ),
+)
+@click.option(
+    "--record",
+    type=click.Path(file_okay=False),
+    default=None,
+    help=(
+        "Record the commands run by the decompilers (and the files they "
+        "create) to this directory, so the run can be replayed offline"
+    ),
+)
+@click.option(
+    "--replay",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Replay the decompilers from a directory created with --record",
+)
+@click.option(
+    "--replay-latency",
+    type=float,
+    default=None,
+    help=(
+        "Seconds each replayed command takes (defaults to as long as it took "
+        "when it was recorded)"
+    ),
+)
+@click.option(
+    "--commit-backend",
+    type=click.Choice(COMMIT_BACKENDS),
+    default="git",
+    help=(
+        "How versions are committed: git add and git commit, one "
+        "long-running git fast-import process, or a private index that only "
+        "gets the files that changed (defaults to 'git', experimental)"
+    ),
+)
+@click.option(
+    "--lock-timeout",
+    type=float,
+    default=None,
+    help=(
+        "Seconds to wait for other runs on the same repo before giving up "
+        "(defaults to waiting as long as it takes)"
+    ),
+)
+@click.option(
+    "--shared-objects",
+    type=click.Path(file_okay=False),
+    default=None,
+    help=(
+        "Share objects with other repos through a store in this directory "
+        "(created if needed), so identical files are stored once"
+    ),
+)
 @click.argument("versions", nargs=-1, type=click.STRING)
 def cli(
     versions: List[str],
@@ -49,11 +112,36 @@ def cli(
     message: str,
     no_tags: bool,
     undo_renamed_vars: bool,
+    trace: str,
+    record: str,
+    replay: str,
+    replay_latency: float,
+    commit_backend: str,
+    lock_timeout: float,
+    shared_objects: str,
 ) -> None:
 
     tags = not no_tags
     try:
-        run(versions, mappings, repo, message, tags, undo_renamed_vars)
+        run(
+            versions,
+            mappings,
+            repo,
+            message,
+            tags,
+            undo_renamed_vars,
+            trace,
+            record,
+            replay,
+            replay_latency,
+            commit_backend,
+            lock_timeout,
+            shared_objects,
+        )
+
+    except LockTimeoutError as e:
+        click.secho(e, err=True, fg="red")
+        sys.exit(5)
 
     except ValueError as e:
         click.secho(e, err=True, fg="red")
@@ -0,0 +1,121 @@
+"""
+Locks that let several shulkr runs share one repo
+
+Runs on the same repo (for example, one started by hand while another is still
+going) take turns through two locks in `.git/shulkr/locks`:
+
+- The worktree lock is held from generating the sources of a version (in src/
+  and the decompiler checkouts) until they are committed.
+- The write lock is held by the commit queue for each write to the repo
+  (committing and tagging a version, or maintaining the repo).
+
+The worktree lock is always taken before the write lock, never after, so runs
+cannot wait for each other in a circle.
+
+Git's own lock files are left alone. One that exists when a run starts is
+reported, since it may have been left behind by a git process that crashed
+(only the user can tell whether one is still running).
+"""
+
+import os
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Optional
+
+import click
+from mint.lock import CommitQueue, FileLock
+
+from shulkr.repo import get_repo
+
+# Directory of the lock files (in the git directory)
+LOCK_DIR = os.path.join("shulkr", "locks")
+
+# Git lock files that make writes fail while they exist
+GIT_LOCK_FILES = ["index.lock", "packed-refs.lock"]
+
+
+def _report_git_locks(git_dir: str) -> None:
+    for name in GIT_LOCK_FILES:
+        path = os.path.join(git_dir, name)
+        if os.path.exists(path):
+            click.secho(
+                f"{path} exists. If no git process is using the repo, it was "
+                + "left behind by one that crashed and has to be removed.",
+                err=True,
+                fg="yellow",
+            )
+
+
+def init_locks(timeout: Optional[float] = None) -> CommitQueue:
+    """
+    Create the locks of the current repo and its commit queue
+
+    Must be called after init_repo()
+
+    Args:
+            timeout (Optional[float]): Seconds to wait for another run to give
+                    up a lock before failing. None waits as long as it takes.
+    """
+
+    global lock_dir, lock_timeout, commit_queue
+
+    git_dir = get_repo().git.rev_parse(absolute_git_dir=True)
+    lock_dir = os.path.join(git_dir, LOCK_DIR)
+    lock_timeout = timeout
+
+    write_lock = FileLock(os.path.join(lock_dir, "write.lock"), timeout=timeout)
+    commit_queue = CommitQueue(write_lock)
+    _report_git_locks(git_dir)
+
+    return commit_queue
+
+
+def worktree_lock() -> ContextManager:
+    """
+    Returns:
+            ContextManager: Holds the worktree lock (does nothing if
+            init_locks() was not called)
+
+    Raises:
+            LockTimeoutError: On entering, if another run held the lock for
+                    longer than the timeout
+    """
+
+    if lock_dir is None:
+        return nullcontext()
+
+    return FileLock(os.path.join(lock_dir, "worktree.lock"), timeout=lock_timeout)
+
+
+def queue_write(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a write on the current thread once it is its turn in the commit queue
+
+    If init_locks() was not called, fn is called directly.
+
+    Returns:
+            Any: Result of fn
+    """
+
+    if commit_queue is None:
+        return fn(*args, **kwargs)
+
+    return commit_queue.run(fn, *args, **kwargs)
+
+
+def get_commit_queue() -> Optional[CommitQueue]:
+    return commit_queue
+
+
+def close_locks() -> None:
+    global lock_dir, commit_queue
+
+    if commit_queue is not None:
+        commit_queue.close()
+        commit_queue = None
+
+    lock_dir = None
+
+
+lock_dir = None
+lock_timeout = None
+commit_queue = None
@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+from typing import Optional, Union
+
 import click
 
+from mint.commit_builder import CommitBuilder
+from mint.fast_import import FastImport
+from mint.maintenance import AUTO_GC_SETTINGS
+from mint.profile import LARGE_REPO_PROFILE, apply_profile, verify_profile
 from mint.repo import NoSuchRepoError, Repo
+from mint.shared import SharedObjectStore
+
+
+# Commits versions without `git add` (both have commit(), tag(), checkpoint()
+# and close())
+Committer = Union[FastImport, CommitBuilder]
 
 
 def init_repo(repo_path: str) -> bool:
@@ -21,30 +33,161 @@ def init_repo(repo_path: str) -> bool:
 
     global repo
 
+    # Auto gc could start a full repack in the middle of a run, so the repo is
+    # maintained between versions instead (see shulkr.app)
     try:
-        repo = Repo(repo_path)
-
-        # The repo already exists
-        return True
+        repo = Repo(repo_path, config=AUTO_GC_SETTINGS)
 
     except FileNotFoundError:
         click.echo("Initializing git")
-        repo = Repo.init(repo_path)
+        repo = Repo.init(repo_path, config=AUTO_GC_SETTINGS)
 
     except NotADirectoryError:
         click.echo("Initializing git")
-        repo = Repo.init(repo_path)
+        repo = Repo.init(repo_path, config=AUTO_GC_SETTINGS)
 
     except NoSuchRepoError:
         click.echo("Initializing git")
-        repo = Repo.init(repo_path)
+        repo = Repo.init(repo_path, config=AUTO_GC_SETTINGS)
+
+    else:
+        # The repo already exists
+        _apply_profile()
+        return True
 
     # We created the repo
+    _apply_profile()
     return False
 
 
+def _apply_profile() -> None:
+    # Every commit holds the full decompiled source tree
+    apply_profile(repo, LARGE_REPO_PROFILE)
+
+    mismatches = verify_profile(repo, LARGE_REPO_PROFILE)
+    for key, value in mismatches.items():
+        click.secho(
+            f"Could not set {key} to {LARGE_REPO_PROFILE[key]} (it is "
+            + f"{value or 'unset'}), git may be slow",
+            err=True,
+            fg="yellow",
+        )
+
+
 def get_repo() -> Repo:
     return repo
 
 
+# Ways of committing versions: `git add` and `git commit`, one long-running
+# `git fast-import` process, or a private index that only gets the files that
+# changed
+COMMIT_BACKENDS = ["git", "fast-import", "index"]
+
+
+def init_committer(backend: str) -> Optional[Committer]:
+    """
+    Choose how versions are committed
+
+    Must be called after init_repo()
+
+    Args:
+            backend (str): One of COMMIT_BACKENDS
+
+    Returns:
+            Optional[Committer]: None for the 'git' backend
+    """
+
+    global committer, committer_backend
+
+    if backend == "fast-import":
+        committer = FastImport(repo)
+    elif backend == "index":
+        committer = CommitBuilder(repo)
+    elif backend == "git":
+        committer = None
+    else:
+        raise ValueError(f"Unknown commit backend: {backend}")
+
+    committer_backend = backend
+    return committer
+
+
+def get_committer() -> Optional[Committer]:
+    """
+    Returns:
+            Optional[Committer]: None unless init_committer() was called with a
+            backend other than 'git'
+    """
+
+    return committer
+
+
+def reset_committer() -> Optional[Committer]:
+    """
+    Start the committer over from the current HEAD
+
+    Committers remember the commit they are building on, so this must be
+    called when something else (like another run) commits to the branch.
+    """
+
+    if committer is None:
+        return None
+
+    close_committer()
+    return init_committer(committer_backend)
+
+
+def close_committer() -> None:
+    global committer
+
+    if committer is not None:
+        committer.close()
+        committer = None
+
+
+def init_shared_objects(
+    path: str, lock_timeout: Optional[float] = None
+) -> SharedObjectStore:
+    """
+    Share objects with other repos through a shared object store (which is
+    created if needed)
+
+    Must be called after init_repo()
+
+    Args:
+            path (str): Directory of the store
+            lock_timeout (Optional[float]): Seconds to wait for other processes
+                    using the store
+    """
+
+    global shared_objects
+
+    shared_objects = SharedObjectStore(path, lock_timeout)
+    if shared_objects.add(repo):
+        click.echo(f"Sharing objects through {shared_objects.path}")
+
+    return shared_objects
+
+
+def get_shared_objects() -> Optional[SharedObjectStore]:
+    """
+    Returns:
+            Optional[SharedObjectStore]: None unless init_shared_objects() was
+            called
+    """
+
+    return shared_objects
+
+
+def close_shared_objects() -> None:
+    global shared_objects
+
+    if shared_objects is not None:
+        shared_objects.close()
+        shared_objects = None
+
+
 repo = None
+committer = None
+committer_backend = None
+shared_objects = None
@@ -0,0 +1,143 @@
+"""
+Trace of where a shulkr run spends its time
+
+When tracing is enabled, every process run through Command is recorded along
+with the stages of the run. The trace is written in the Chrome trace event
+format, which can be opened with chrome://tracing or https://ui.perfetto.dev.
+"""
+
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from command import trace as command_trace
+from command.trace import CommandRecord
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self._pid = os.getpid()
+        self._events: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _microseconds(seconds: float) -> float:
+        return round(seconds * 1_000_000, 3)
+
+    def _add_event(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        duration: float,
+        args: Dict,
+        thread: int,
+    ) -> None:
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": Tracer._microseconds(start),
+            "dur": Tracer._microseconds(duration),
+            "pid": self._pid,
+            "tid": thread,
+            "args": args,
+        }
+
+        with self._lock:
+            self._events.append(event)
+
+    def record_command(self, record: CommandRecord) -> None:
+        """
+        Command hook that adds a process to the trace
+        """
+
+        executable = os.path.basename(record.command[0])
+        args = record.command[1:]
+        if executable == "git":
+            # Skip git's own options (like `-c name=value`) to get to the
+            # subcommand
+            while args[:1] == ["-c"]:
+                args = args[2:]
+
+        name = " ".join([executable, *args[:1]])
+        args = {
+            "argv": record.command,
+            "cwd": record.cwd,
+            "queue_wait": record.queue_wait,
+            "cpu_time": record.cpu_time,
+            "exit_code": record.exit_code,
+            "output_size": record.output_size,
+        }
+        self._add_event(
+            name, "command", record.start, record.wall_time, args, record.thread
+        )
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self._add_event(name, "stage", start, duration, args, threading.get_ident())
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            # Sort by start time so viewers nest the events correctly
+            events = sorted(self._events, key=lambda event: event["ts"])
+
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+
+def init_tracer() -> None:
+    """
+    Start recording stages and processes
+    """
+
+    global tracer
+
+    tracer = Tracer()
+    command_trace.add_hook(tracer.record_command)
+
+
+def save_trace(path: str) -> None:
+    """
+    Stop recording and write the trace to `path`
+    """
+
+    global tracer
+
+    command_trace.remove_hook(tracer.record_command)
+    tracer.save(path)
+    tracer = None
+
+
+@contextmanager
+def span(name: str, **args) -> Iterator[None]:
+    """
+    Record the code inside the block as a stage (if tracing is enabled)
+
+    Args:
+            name (str): Name of the stage
+            args: Extra information to show for the stage
+    """
+
+    if tracer is None:
+        yield
+        return
+
+    with tracer.span(name, **args):
+        yield
+
+
+def get_tracer() -> Tracer:
+    return tracer
+
+
+tracer = None
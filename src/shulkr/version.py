@@ -9,10 +9,12 @@ import click
 from java import undo_renames
 from minecraft.source import generate_sources
 from minecraft.version import Version
-from mint.error import GitError
 
 from shulkr.config import get_config
-from shulkr.repo import get_repo
+from shulkr.locks import queue_write, worktree_lock
+from shulkr.repo import get_committer, get_repo, reset_committer
+from shulkr.trace import span
+from shulkr.version_index import get_version_index, init_version_index
 
 
 def _commit_version(version: Version) -> None:
@@ -23,17 +25,82 @@ def _commit_version(version: Version) -> None:
     if get_config().undo_renamed_vars and head_has_versions():
         commit_msg += "\n\nRenamed variables reverted"
 
+    committer = get_committer()
+    if committer is not None:
+        committer.commit(commit_msg, "src")
+        return
+
     repo.git.add("src")
 
     repo.git.commit(message=commit_msg)
 
 
 def _tag_version(version: Version) -> None:
+    committer = get_committer()
+    if committer is not None:
+        committer.tag(str(version))
+        return
+
     repo = get_repo()
 
     repo.git.tag(version)
 
 
+def _index_version(version: Version) -> None:
+    repo = get_repo()
+
+    commit = repo.head_commit()
+    if not get_config().tag:
+        # Untagged versions cannot be found, but HEAD still moved
+        get_version_index().advance(commit)
+        return
+
+    tree = repo.objects.info(f"{commit}^{{tree}}").oid
+    get_version_index().add(version, commit, tree)
+
+
+def _catch_up(version: Version) -> bool:
+    # Another run may have committed to the repo while this one was waiting
+    # for the worktree lock
+    if get_version_index().is_current(get_repo()):
+        return True
+
+    index = init_version_index()
+    reset_committer()
+
+    latest = index.latest()
+    if latest is not None and version.index <= latest.index:
+        click.secho(
+            f"Minecraft {version} was generated by another run, skipping",
+            fg="yellow",
+        )
+        return False
+
+    return True
+
+
+def _write_version(version: Version) -> None:
+    # 3. Commit the new version to git
+    click.echo("Committing to git")
+    with span("commit"):
+        _commit_version(version)
+
+    # 4. Tag
+    if get_config().tag:
+        with span("tag"):
+            _tag_version(version)
+
+    # 5. Write the commit and tag to the repo (and update the index), so the
+    # next version can see them
+    committer = get_committer()
+    if committer is not None:
+        with span("checkpoint"):
+            committer.checkpoint()
+
+    # 6. Record the version, so it can be found without reading the tags
+    _index_version(version)
+
+
 def create_version(version: Version) -> None:
     """
     Generate the sources for a Minecraft version and commit to the repo
@@ -45,8 +112,18 @@ def create_version(version: Version) -> None:
             message_template (str): Template for commit messages ('{}'s will be
                     replaced with the version name)
             tag (bool): If set, the commit will be tagged
+
+    If other runs are using the repo, this waits for them to finish their
+    version first, and skips the version if one of them generated it (or a
+    newer one).
     """
 
+    with worktree_lock():
+        if _catch_up(version):
+            _create_version(version)
+
+
+def _create_version(version: Version) -> None:
     # 1. Generate source code for the current version
     click.secho(f"Generating sources for Minecraft {version}", bold=True)
 
@@ -55,7 +132,8 @@ def create_version(version: Version) -> None:
     repo_path = repo.path
 
     try:
-        generate_sources(version, mappings, repo_path)
+        with span("generate sources", mappings=mappings):
+            generate_sources(version, mappings, repo_path)
     except BaseException as e:
         # Undo src/ deletions
         if head_has_versions():
@@ -70,42 +148,22 @@ def create_version(version: Version) -> None:
     # 2. If there are any previous versions, undo the renamed variables
     if get_config().undo_renamed_vars and head_has_versions():
         click.echo("Undoing renamed variables")
-        undo_renames(get_repo().to_gitpython())
+        with span("undo renames"):
+            undo_renames(get_repo())
 
-    # 3. Commit the new version to git
-    click.echo("Committing to git")
-    _commit_version(version)
-
-    # 4. Tag
-    if get_config().tag:
-        _tag_version(version)
+    # Steps 3 to 6 write to the repo, which other runs take turns doing
+    queue_write(_write_version, version)
 
 
 def head_has_versions() -> bool:
     """
     Check if any versions have been generated on the current branch
 
-    Raises:
-            e:
-
     Returns:
             bool: True if at least one version was found on the current branch
     """
 
-    repo = get_repo()
-
-    try:
-        # List tags reachable by HEAD
-        repo.git.describe(tags=True)
-
-        # If we made it here, there is at least one tag.
-        return True
-
-    except GitError as e:
-        if "fatal: No names found, cannot describe anything." in e.stderr:
-            return False
-
-        raise e
+    return get_version_index().latest() is not None
 
 
 def get_latest_generated_version() -> Version:
@@ -113,15 +171,11 @@ def get_latest_generated_version() -> Version:
     Get the most recent version commit on the current branch
 
     Returns:
-            Version:
+            Version: None if no versions were generated on the current branch
     """
 
-    if not head_has_versions():
+    entry = get_version_index().latest()
+    if entry is None:
         return None
 
-    repo = get_repo()
-
-    # Get most recent tag reachable by HEAD
-    tag_name = repo.git.describe(tags=True)
-
-    return Version.of(tag_name)
+    return Version.of(entry.id)
@@ -0,0 +1,252 @@
+"""
+Index of the versions generated in a shulkr repo
+
+Tags only say which commit holds a version. Finding the newest version (or
+whether a version was generated at all) from them means listing and parsing
+every tag. The index keeps the manifest index, id, commit and tree of each
+generated version in one small file inside the git directory, so these
+questions are answered with a dictionary lookup.
+
+The index describes the tags reachable by one commit (the HEAD it was written
+for). If HEAD moved in any other way, or the file is missing, it is rebuilt
+from the tags.
+"""
+
+from __future__ import annotations
+import os
+from typing import Dict, Iterable, Optional
+
+from minecraft.version import NoSuchVersionError, Version
+from mint.lock import FileLock
+from mint.repo import Repo
+
+from shulkr.repo import get_repo
+
+# Location of the index (in the git directory)
+INDEX_FILE = os.path.join("shulkr", "versions")
+
+# First line of the file, which changes when the format does
+HEADER = "shulkr version index 1"
+
+
+class VersionEntry:
+    """
+    One generated version
+
+    Attributes:
+            index (int): Position of the version in the manifest
+            id (str)
+            commit (str): Commit that holds the version
+            tree (str): Tree of that commit
+    """
+
+    __slots__ = ("index", "id", "commit", "tree")
+
+    def __init__(self, index: int, id: str, commit: str, tree: str) -> None:
+        self.index = index
+        self.id = id
+        self.commit = commit
+        self.tree = tree
+
+    def __repr__(self) -> str:
+        return f"VersionEntry({self.id!r}, {self.commit!r})"
+
+
+class VersionIndex:
+    """
+    Generated versions of a repo, by manifest index
+
+    Args:
+            path (str): File the index is saved to
+            head (Optional[str]): Commit the index describes (None if the
+                    branch has no commits)
+            entries (Iterable[VersionEntry])
+    """
+
+    def __init__(
+        self, path: str, head: Optional[str], entries: Iterable[VersionEntry] = ()
+    ) -> None:
+        self.path = path
+        self.head = head
+        self._entries: Dict[int, VersionEntry] = {}
+        self._latest: Optional[VersionEntry] = None
+
+        for entry in entries:
+            self._add(entry)
+
+    def _add(self, entry: VersionEntry) -> None:
+        self._entries[entry.index] = entry
+        if self._latest is None or entry.index > self._latest.index:
+            self._latest = entry
+
+    def get(self, version: Version) -> Optional[VersionEntry]:
+        """
+        Returns:
+                Optional[VersionEntry]: None if the version was not generated
+        """
+
+        return self._entries.get(version.index)
+
+    def latest(self) -> Optional[VersionEntry]:
+        """
+        Returns:
+                Optional[VersionEntry]: The newest generated version, or None if
+                no versions were generated
+        """
+
+        return self._latest
+
+    def __contains__(self, version: Version) -> bool:
+        return version.index in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, version: Version, commit: str, tree: str) -> None:
+        """
+        Record a version that was just committed (and tagged), and save the
+        index
+
+        `commit` becomes the commit the index describes.
+        """
+
+        self._add(VersionEntry(version.index, version.id, commit, tree))
+        self.head = commit
+        self.save()
+
+    def advance(self, commit: str) -> None:
+        """
+        Record that HEAD moved to a commit that adds no version that can be
+        found (like an untagged version), and save the index
+        """
+
+        self.head = commit
+        self.save()
+
+    def is_current(self, repo: Repo) -> bool:
+        """
+        Returns:
+                bool: True if the index describes the current HEAD of the repo
+        """
+
+        return self.head == repo.head_commit()
+
+    def save(self) -> None:
+        """
+        Write the index to its file
+
+        The file is replaced in one step, so it is never seen half-written.
+        Writers take turns through a FileLock, so a writer that died does not
+        keep others from saving.
+        """
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with FileLock(self.path + ".lock"):
+            # Nobody else can be writing the temporary file while the lock is
+            # held, so one that exists was left behind and is overwritten
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(HEADER + "\n")
+                f.write(f"{self.head or ''}\n")
+                for index in sorted(self._entries):
+                    entry = self._entries[index]
+                    f.write(
+                        f"{entry.index}\t{entry.commit}\t{entry.tree}\t{entry.id}\n"
+                    )
+
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def load(path: str) -> Optional[VersionIndex]:
+        """
+        Read an index from a file
+
+        Returns:
+                Optional[VersionIndex]: None if the file does not exist or is
+                not an index of the current format
+        """
+
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return None
+
+        if len(lines) < 2 or lines[0] != HEADER:
+            return None
+
+        entries = []
+        for line in lines[2:]:
+            fields = line.split("\t", 3)
+            if len(fields) != 4:
+                return None
+
+            index, commit, tree, id = fields
+            entries.append(VersionEntry(int(index), id, commit, tree))
+
+        return VersionIndex(path, lines[1] or None, entries)
+
+    @staticmethod
+    def rebuild(repo: Repo, path: str) -> VersionIndex:
+        """
+        Create an index from the tags reachable by HEAD (and save it)
+
+        Tags that are not Minecraft versions are ignored. The manifest must be
+        loaded.
+        """
+
+        head = repo.head_commit()
+        index = VersionIndex(path, head)
+        if head is not None:
+            for ref in list(repo.refs("refs/tags", merged="HEAD")):
+                try:
+                    version = Version.of(ref.short_name)
+                except NoSuchVersionError:
+                    continue
+
+                commit = ref.peeled_oid or ref.oid
+                tree = repo.objects.info(f"{commit}^{{tree}}").oid
+                index._add(VersionEntry(version.index, version.id, commit, tree))
+
+        index.save()
+        return index
+
+    @staticmethod
+    def open(repo: Repo) -> VersionIndex:
+        """
+        Load the index of a repo, rebuilding it if it is missing or does not
+        describe the current HEAD
+        """
+
+        git_dir = repo.git.rev_parse(absolute_git_dir=True)
+        path = os.path.join(git_dir, INDEX_FILE)
+
+        index = VersionIndex.load(path)
+        if index is None or not index.is_current(repo):
+            index = VersionIndex.rebuild(repo, path)
+
+        return index
+
+
+def init_version_index() -> VersionIndex:
+    """
+    Load (or rebuild) the version index of the current repo
+
+    Must be called after init_repo() and after the manifest is loaded
+    """
+
+    global version_index
+
+    version_index = VersionIndex.open(get_repo())
+    return version_index
+
+
+def get_version_index() -> VersionIndex:
+    return version_index
+
+
+version_index = None
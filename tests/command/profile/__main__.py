@@ -0,0 +1,7 @@
+import sys
+
+from .profile_spawn import profile_spawn
+
+
+if __name__ == "__main__":
+    profile_spawn([int(size) for size in sys.argv[1:]] or None)
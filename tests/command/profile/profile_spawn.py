@@ -0,0 +1,60 @@
+"""
+Per-call latency of a git command, started directly and through the spawn
+helper, as this process grows
+
+Run with `python -m tests.command.profile [SIZE_IN_MB...]` (with `src` on the
+Python path).
+"""
+
+from tempfile import TemporaryDirectory
+from timeit import timeit
+from typing import List, Optional
+
+from mint.repo import Repo
+
+from command import Command
+from command.spawn import close_spawner, init_spawner
+
+PAGE_SIZE = 4096
+
+CALLS = 50
+
+
+def grow(ballast: List[bytearray], size: int) -> None:
+    """
+    Allocate `size` bytes and touch every page, so they count towards the RSS
+    """
+
+    block = bytearray(size)
+    block[::PAGE_SIZE] = b"\x01" * len(range(0, size, PAGE_SIZE))
+    ballast.append(block)
+
+
+def profile_spawn(sizes: Optional[List[int]] = None) -> None:
+    if sizes is None:
+        sizes = [0, 256, 1024, 2048]
+
+    with TemporaryDirectory() as tempdir:
+        Repo.init(tempdir)
+        git = Command("git", working_dir=tempdir)
+
+        ballast = []
+        allocated = 0
+        print(f"{'RSS growth':>12}{'direct':>12}{'spawn helper':>16}")
+        for size in sizes:
+            grow(ballast, (size - allocated) * 1024 * 1024)
+            allocated = size
+
+            direct = timeit(lambda: git.rev_parse("--git-dir"), number=CALLS)
+
+            # The helper is a new interpreter, so it is small no matter how
+            # large this process is
+            init_spawner()
+            spawned = timeit(lambda: git.rev_parse("--git-dir"), number=CALLS)
+            close_spawner()
+
+            print(
+                f"{size:>9} MB"
+                f"{direct / CALLS * 1000:>9.2f} ms"
+                f"{spawned / CALLS * 1000:>13.2f} ms"
+            )
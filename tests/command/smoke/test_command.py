@@ -1,3 +1,17 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from command import AsyncCommand, Command, CommandError
+from command.scheduler import Scheduler, get_scheduler, set_scheduler
+
+
+class CustomError(CommandError):
+    pass
+
+
 class TestCommand:
     def test_getattr_returns_git_output(self, git, repo):
         # Make one commit so git knows which branch is checked out
@@ -13,3 +27,94 @@ class TestCommand:
         git.commit(message="dummy commit", allow_empty=True)
 
         assert git.log("--format=%B") == "dummy commit"
+
+
+class TestAsyncCommand:
+    def test_getattr_returns_git_output(self, repo):
+        git = AsyncCommand("git", working_dir=repo.path)
+
+        async def run():
+            await git.commit(message="dummy commit", allow_empty=True)
+            return await asyncio.gather(git.log("--format=%B"), git.status())
+
+        log, status = asyncio.run(run())
+
+        assert log == "dummy commit"
+        assert status.endswith("nothing to commit, working tree clean")
+
+
+class TestStream:
+    def test_stream_yields_output_lines(self, git, repo):
+        git.commit(message="first", allow_empty=True)
+        git.commit(message="second", allow_empty=True)
+
+        assert list(git.stream("log", "--format=%s")) == ["second", "first"]
+
+    def test_stream_with_nul_separator_yields_records(self, git, repo):
+        for name in ("a b.txt", "c\nd.txt"):
+            with open(os.path.join(repo.path, name), "w") as f:
+                f.write(name)
+
+        git.add(".")
+
+        records = list(git.stream("ls_files", z=True, separator="\0"))
+
+        assert records == ["a b.txt", "c\nd.txt"]
+
+    def test_stream_raises_configured_error_after_output_when_process_fails(self):
+        python = Command(sys.executable, error=CustomError)
+        code = "import sys; print('partial'); sys.exit('some error message')"
+
+        records = python.stream("-c", code)
+
+        assert next(records) == "partial"
+        with pytest.raises(CustomError, match="some error message"):
+            next(records)
+
+    def test_stream_keeps_only_the_end_of_stderr(self, mocker):
+        mocker.patch("command.STREAM_STDERR_LIMIT", 16)
+        python = Command(sys.executable, error=CustomError)
+        code = "import sys; sys.stderr.write('x' * 100000 + 'the end'); sys.exit(1)"
+
+        with pytest.raises(CustomError) as e:
+            list(python.stream("-c", code))
+
+        assert e.value.stderr.endswith("the end")
+        assert len(e.value.stderr) < 100
+
+    def test_stream_stops_process_when_closed_early(self):
+        python = Command(sys.executable)
+        code = "import itertools; [print(i) for i in itertools.count()]"
+
+        records = python.stream("-c", code)
+        assert next(records) == "0"
+
+        # Closing the generator must not hang or raise
+        records.close()
+
+    def test_stream_consumer_can_run_commands_with_one_slot(self, git, repo):
+        git.commit(message="first", allow_empty=True)
+        set_scheduler(Scheduler(cpus=1))
+        try:
+            for subject in git.stream("log", "--format=%s"):
+                assert git.log("--format=%s") == subject
+
+            assert get_scheduler().jobs == 2
+        finally:
+            set_scheduler(None)
+
+    def test_env_is_added_to_the_environment(self, monkeypatch):
+        monkeypatch.setenv("INHERITED", "inherited")
+        python = Command(sys.executable, env={"ADDED": "added"})
+        code = "import os; print(os.environ['INHERITED'], os.environ['ADDED'])"
+
+        assert python.binary("-c", code).tobytes() == b"inherited added\n"
+        assert list(python.stream("-c", code)) == ["inherited added"]
+
+
+class TestBinary:
+    def test_binary_returns_output_bytes(self):
+        python = Command(sys.executable)
+        code = "import sys; sys.stdout.buffer.write(bytes(range(256)))"
+
+        assert python.binary("-c", code).tobytes() == bytes(range(256))
@@ -0,0 +1,110 @@
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+from command import Command, CommandError
+from command.replay import Recorder, ReplayError, set_interceptor
+
+
+class CustomError(CommandError):
+    pass
+
+
+@pytest.fixture
+def files(repo):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = os.path.join(repo.path, name)
+        with open(path, "w") as f:
+            f.write(name)
+
+        paths.append(name)
+
+    return paths
+
+
+class TestPipeline:
+    def test_output_of_each_stage_is_passed_to_next_stage(self, git, files):
+        git.add(*files)
+
+        pipeline = git.stage("ls_files") | git.stage("hash_object", stdin_paths=True)
+
+        assert pipeline.run().split("\n") == [git.hash_object(path) for path in files]
+
+    def test_stages_of_different_commands_can_be_combined(self, git, repo, files):
+        git.add(*files)
+        python = Command(sys.executable, working_dir=repo.path)
+        count = python.stage("-c", "import sys; print(len(sys.stdin.read().split()))")
+
+        assert (git.stage("ls_files") | count).run() == "3"
+
+    def test_failing_stage_raises_its_own_error_type(self, repo):
+        git = Command("git", working_dir=repo.path, error=CustomError)
+        python = Command(sys.executable, working_dir=repo.path)
+
+        pipeline = git.stage("rev_parse", "no-such-rev") | python.stage(
+            "-c", "import sys; sys.stdin.read()"
+        )
+        with pytest.raises(CustomError) as e:
+            pipeline.run()
+
+        assert e.value.command[:2] == ["git", "rev-parse"]
+        assert "no-such-rev" in e.value.stderr
+
+    def test_first_failing_stage_is_reported(self, repo):
+        python = Command(sys.executable, working_dir=repo.path)
+
+        pipeline = python.stage("-c", "import sys; sys.exit('first')") | python.stage(
+            "-c", "import sys; sys.exit('second')"
+        )
+        with pytest.raises(CommandError, match="first"):
+            pipeline.run()
+
+    def test_stage_that_stops_reading_early_is_not_an_error(self, repo):
+        python = Command(sys.executable, working_dir=repo.path)
+        producer = python.stage(
+            "-c",
+            # Die from SIGPIPE like most programs (Python ignores it)
+            "import signal, sys\n"
+            "signal.signal(signal.SIGPIPE, signal.SIG_DFL)\n"
+            "while True: sys.stdout.write('y' * 65536)",
+        )
+        consumer = python.stage("-c", "import sys; print(len(sys.stdin.read(10)))")
+
+        assert (producer | consumer).run() == "10"
+
+    def test_started_stages_are_stopped_if_a_later_stage_cannot_start(
+        self, repo, tmp_path, mocker
+    ):
+        procs = []
+        popen = subprocess.Popen
+
+        def start(*args, **kwargs):
+            procs.append(popen(*args, **kwargs))
+            return procs[-1]
+
+        mocker.patch("command.pipe.subprocess.Popen", side_effect=start)
+        python = Command(sys.executable, working_dir=repo.path)
+        missing = Command(sys.executable, working_dir=str(tmp_path / "missing"))
+        sleep = python.stage("-c", "import time; time.sleep(60)")
+
+        with pytest.raises(FileNotFoundError):
+            (sleep | missing.stage("-c", "pass")).run()
+
+        [proc] = procs
+        assert proc.returncode == -signal.SIGKILL
+
+    def test_pipeline_in_recorded_directory_raises_replay_error(
+        self, git, repo, tmp_path
+    ):
+        set_interceptor(Recorder(str(tmp_path / "store"), [repo.path]))
+        try:
+            with pytest.raises(ReplayError):
+                (
+                    git.stage("ls_files") | git.stage("hash_object", stdin_paths=True)
+                ).run()
+        finally:
+            set_interceptor(None)
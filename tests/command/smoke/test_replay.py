@@ -0,0 +1,176 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+from command import Command, CommandError
+from command.replay import Recorder, Replayer, ReplayError, set_interceptor
+
+
+@pytest.fixture(autouse=True)
+def reset_interceptor():
+    yield
+    set_interceptor(None)
+
+
+@pytest.fixture
+def root(tempdir):
+    path = os.path.join(tempdir, "root")
+    os.mkdir(path)
+    return path
+
+
+@pytest.fixture
+def store(tempdir):
+    return os.path.join(tempdir, "store")
+
+
+@pytest.fixture
+def python(root):
+    return Command(sys.executable, working_dir=root)
+
+
+def write_file(name, contents):
+    return f"open({name!r}, 'w').write({contents!r}); print('wrote {name}')"
+
+
+def run_script(python, script, *args):
+    # Equivalent to `python -c SCRIPT ARGS...`
+    return getattr(python, "-c")(script, *args)
+
+
+def record(store, root, callback):
+    recorder = Recorder(store, [root])
+    set_interceptor(recorder)
+    try:
+        return callback()
+    finally:
+        recorder.save()
+        set_interceptor(None)
+
+
+class TestReplay:
+    def test_replay_returns_recorded_output(self, python, root, store):
+        recorded = record(
+            store, root, lambda: run_script(python, write_file("a.txt", "a"))
+        )
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        assert run_script(python, write_file("a.txt", "a")) == recorded == "wrote a.txt"
+
+    def test_replay_recreates_created_files(self, python, root, store):
+        def callback():
+            run_script(
+                python, "import os; os.makedirs('out/sub'); open('out/sub/a', 'w')"
+            )
+            run_script(python, write_file("out/sub/a", "contents"))
+
+        record(store, root, callback)
+        shutil.rmtree(root)
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        python = Command(sys.executable, working_dir=root)
+        run_script(python, "import os; os.makedirs('out/sub'); open('out/sub/a', 'w')")
+        assert open(os.path.join(root, "out", "sub", "a")).read() == ""
+
+        run_script(python, write_file("out/sub/a", "contents"))
+        assert open(os.path.join(root, "out", "sub", "a")).read() == "contents"
+
+    def test_replay_starts_from_recorded_initial_state(self, python, root, store):
+        with open(os.path.join(root, "cached"), "w") as f:
+            f.write("cached")
+        os.makedirs(os.path.join(root, ".git", "objects"))
+
+        record(store, root, lambda: run_script(python, "print()"))
+        shutil.rmtree(root)
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        assert open(os.path.join(root, "cached")).read() == "cached"
+        # Excluded directories are recreated, but not their contents
+        assert os.listdir(os.path.join(root, ".git")) == []
+
+    def test_replay_deletes_deleted_files(self, python, root, store):
+        open(os.path.join(root, "old"), "w").close()
+        record(store, root, lambda: run_script(python, "import os; os.remove('old')"))
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        open(os.path.join(root, "old"), "w").close()
+        run_script(python, "import os; os.remove('old')")
+        assert not os.path.exists(os.path.join(root, "old"))
+
+    def test_replay_repeats_occurrences_in_order(self, python, root, store):
+        script = "import os; print(len(os.listdir()))"
+
+        def callback():
+            run_script(python, script)
+            run_script(python, write_file("a", ""))
+            run_script(python, script)
+
+        record(store, root, callback)
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        assert run_script(python, script) == "0"
+        assert run_script(python, script) == "1"
+        assert run_script(python, script) == "1"
+
+    def test_replay_raises_recorded_error(self, python, root, store):
+        with pytest.raises(CommandError):
+            record(
+                store,
+                root,
+                lambda: run_script(python, "import sys; sys.exit('failed')"),
+            )
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        with pytest.raises(CommandError, match="failed"):
+            run_script(python, "import sys; sys.exit('failed')")
+
+    def test_replay_of_failing_command_without_output_raises_error(self, root, store):
+        python = Command(sys.executable, working_dir=root, capture_output=False)
+        with pytest.raises(CommandError):
+            record(store, root, lambda: run_script(python, "import sys; sys.exit(1)"))
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        with pytest.raises(CommandError):
+            run_script(python, "import sys; sys.exit(1)")
+
+    def test_replay_of_unrecorded_command_raises_replay_error(
+        self, python, root, store
+    ):
+        record(store, root, lambda: run_script(python, "print()"))
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        with pytest.raises(ReplayError):
+            run_script(python, "print('something else')")
+
+    def test_commands_outside_roots_run_normally(self, tempdir, root, store):
+        record(store, root, lambda: None)
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        python = Command(sys.executable, working_dir=tempdir)
+        assert run_script(python, "print('not recorded')") == "not recorded"
+
+    def test_paths_in_arguments_are_relative_to_roots(self, tempdir, store):
+        def run(root):
+            python = Command(sys.executable, working_dir=tempdir)
+            script = (
+                "import os, sys; open(os.path.join(sys.argv[1], 'a'), 'w').write('a')"
+            )
+            return run_script(python, script, root)
+
+        recorded_root = os.path.join(tempdir, "recorded")
+        os.mkdir(recorded_root)
+        record(store, recorded_root, lambda: run(recorded_root))
+
+        replayed_root = os.path.join(tempdir, "replayed")
+        set_interceptor(Replayer(store, [replayed_root], latency=0))
+        run(replayed_root)
+        assert open(os.path.join(replayed_root, "a")).read() == "a"
+
+    def test_binary_output_is_replayed(self, python, root, store):
+        script = "import sys; sys.stdout.buffer.write(bytes(range(256)))"
+        record(store, root, lambda: python.binary("-c", script))
+
+        set_interceptor(Replayer(store, [root], latency=0))
+        assert python.binary("-c", script) == bytes(range(256))
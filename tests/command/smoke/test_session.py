@@ -0,0 +1,85 @@
+import sys
+
+import pytest
+
+from command import Command, CommandError
+from command.scheduler import Scheduler, get_scheduler, set_scheduler
+from command.session import read_fields, read_line
+
+# Answers every line with the line in upper case
+ECHO = "import sys\nfor line in sys.stdin: print(line.upper(), end='', flush=True)"
+
+
+@pytest.fixture
+def python(tempdir):
+    return Command(sys.executable, working_dir=tempdir)
+
+
+class TestSession:
+    def test_responses_match_requests(self, python):
+        with python.session("-c", ECHO, response=read_line) as session:
+            futures = [session.request(f"line {i}") for i in range(100)]
+            session.flush()
+
+            assert [future.result() for future in futures] == [
+                f"LINE {i}" for i in range(100)
+            ]
+
+    def test_session_takes_a_slot_only_while_starting(self, python):
+        set_scheduler(Scheduler(cpus=1))
+        try:
+            with python.session("-c", ECHO, response=read_line) as session:
+                assert get_scheduler().jobs == 1
+                assert getattr(python, "-c")("print('other')") == "other"
+                assert session.request("a").result() == "A"
+        finally:
+            set_scheduler(None)
+
+    def test_more_requests_than_in_flight_limit(self, python):
+        with python.session("-c", ECHO, response=read_line, max_in_flight=2) as session:
+            futures = [session.request(str(i)) for i in range(50)]
+
+        assert [future.result() for future in futures] == [str(i) for i in range(50)]
+
+    def test_requests_without_responses(self, python):
+        script = "import sys; print(len(sys.stdin.read().split('\\0')) - 1)"
+        with python.session("-c", script, terminator="\0") as session:
+            for i in range(10):
+                assert session.request(str(i)) is None
+
+    def test_custom_response_reader(self, python):
+        script = (
+            "import sys\n"
+            "for line in sys.stdin:\n"
+            "    sys.stdout.write(line.strip() + '\\0' + str(len(line)) + '\\0')\n"
+            "    sys.stdout.flush()"
+        )
+        with python.session("-c", script, response=read_fields(2)) as session:
+            future = session.request("abc")
+            session.flush()
+
+            assert future.result() == ["abc", "4"]
+
+    def test_process_exiting_early_raises_error(self, python):
+        script = "import sys; sys.stdin.readline(); sys.exit('failed')"
+        session = python.session("-c", script, response=read_line)
+        future = session.request("one")
+
+        with pytest.raises(CommandError, match="failed"):
+            session.flush()
+
+        with pytest.raises(EOFError):
+            future.result()
+
+        with pytest.raises(CommandError):
+            session.close()
+
+    def test_hash_object_session(self, git, repo):
+        with open(f"{repo.path}/a", "w") as f:
+            f.write("a")
+
+        with git.session("hash_object", stdin_paths=True, response=read_line) as s:
+            oid = s.request("a")
+            s.flush()
+
+            assert oid.result() == git.hash_object("a")
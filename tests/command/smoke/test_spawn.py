@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+from command import Command, CommandError
+from command.spawn import close_spawner, get_spawner, init_spawner
+from command.trace import add_hook, remove_hook
+
+
+@pytest.fixture(autouse=True)
+def spawner():
+    spawner = init_spawner()
+    yield spawner
+    close_spawner()
+
+
+@pytest.fixture
+def python(tempdir):
+    return Command(sys.executable, working_dir=tempdir)
+
+
+def run_script(python, script, *args):
+    # Equivalent to `python -c SCRIPT ARGS...`
+    return getattr(python, "-c")(script, *args)
+
+
+class TestSpawner:
+    def test_commands_are_started_by_the_helper(self, python):
+        pid = run_script(python, "import os; print(os.getppid())")
+
+        assert int(pid) != os.getpid()
+
+    def test_output_and_working_directory(self, python, tempdir):
+        assert run_script(python, "import os; print(os.getcwd())") == os.path.realpath(
+            tempdir
+        )
+
+    def test_large_output_is_read_completely(self, python):
+        script = "import sys; sys.stdout.write('x' * 1000000); sys.stderr.write('y' * 1000000)"
+
+        assert len(run_script(python, script)) == 1000000
+
+    def test_failing_command_raises_error_with_stderr(self, python):
+        with pytest.raises(CommandError, match="failed"):
+            run_script(python, "import sys; sys.exit('failed')")
+
+    def test_failing_command_without_output_raises_error(self, tempdir):
+        python = Command(sys.executable, working_dir=tempdir, capture_output=False)
+
+        with pytest.raises(CommandError):
+            run_script(python, "import sys; sys.exit(1)")
+
+    def test_cpu_time_of_commands_is_traced(self, python):
+        records = []
+        add_hook(records.append)
+        try:
+            run_script(python, "sum(range(3000000))")
+        finally:
+            remove_hook(records.append)
+
+        [record] = records
+        assert record.cpu_time > 0
+
+    def test_environment_is_passed_to_helper(self, tempdir):
+        python = Command(sys.executable, working_dir=tempdir, env={"SHULKR_X": "y"})
+
+        script = "import os; print(os.getppid(), os.environ['SHULKR_X'])"
+        ppid, value = run_script(python, script).split()
+        assert int(ppid) != os.getpid()
+        assert value == "y"
+
+    def test_missing_working_directory_raises_file_not_found_error(self, tempdir):
+        python = Command(sys.executable, working_dir=os.path.join(tempdir, "missing"))
+
+        with pytest.raises(FileNotFoundError):
+            run_script(python, "print()")
+
+    def test_helper_is_restarted_after_exiting(self, python, spawner):
+        spawner._proc.kill()
+        spawner._proc.wait()
+
+        assert run_script(python, "print('ok')") == "ok"
+
+    def test_close_spawner_runs_commands_directly(self, python):
+        close_spawner()
+
+        assert get_spawner() is None
+        assert int(run_script(python, "import os; print(os.getppid())")) == os.getpid()
@@ -0,0 +1,132 @@
+from subprocess import CalledProcessError, CompletedProcess
+from unittest.mock import ANY
+
+import pytest
+
+import command
+from command import Command, CommandError
+from command.batch import arg_size, command_size, split_args
+
+
+class GitError(CommandError):
+    pass
+
+
+# Room for 'git add' and about two short paths
+LIMIT = command_size(["git", "add"]) + 2 * arg_size("path0")
+
+
+@pytest.fixture(autouse=True)
+def processes(mocker) -> None:
+    run = mocker.patch("command.subprocess.run")
+    run.return_value.stdout = ""
+    mocker.patch("command.shutil.which", return_value=True)
+    mocker.patch("command.batch.arg_max", return_value=LIMIT)
+
+
+@pytest.fixture
+def git() -> Command:
+    return Command("git", working_dir="/foo/bar", error=GitError)
+
+
+@pytest.fixture
+def parallel_git(mocker) -> Command:
+    limit = command_size(["git", "hash-object"]) + 2 * arg_size("path0")
+    mocker.patch("command.batch.arg_max", return_value=limit)
+
+    return Command(
+        "git",
+        working_dir="/foo/bar",
+        error=GitError,
+        parallel_subcommands=["hash-object"],
+    )
+
+
+def called_commands():
+    return [call.args[0] for call in command.subprocess.run.call_args_list]
+
+
+class TestSplitArgs:
+    def test_short_argument_list_returns_one_batch(self):
+        assert split_args(["git", "add"], ["a"], LIMIT) == [["git", "add", "a"]]
+
+    def test_no_arguments_returns_one_batch(self):
+        assert split_args(["git", "add"], [], LIMIT) == [["git", "add"]]
+
+    def test_long_argument_list_returns_batches_within_limit(self):
+        paths = [f"path{i}" for i in range(5)]
+
+        batches = split_args(["git", "add"], paths, LIMIT)
+
+        assert len(batches) == 3
+        assert all(command_size(batch) <= LIMIT for batch in batches)
+        assert [arg for batch in batches for arg in batch[2:]] == paths
+
+    def test_arguments_before_separator_are_repeated_in_every_batch(self):
+        paths = [f"path{i}" for i in range(5)]
+        limit = LIMIT + arg_size("HEAD") + arg_size("--")
+
+        batches = split_args(["git", "checkout"], ["HEAD", "--", *paths], limit)
+
+        assert all(batch[:4] == ["git", "checkout", "HEAD", "--"] for batch in batches)
+        assert [arg for batch in batches for arg in batch[4:]] == paths
+
+
+class TestCommandBatching:
+    def test_short_argument_list_runs_once(self, git):
+        git.add("path0")
+
+        command.subprocess.run.assert_called_once_with(
+            ["git", "add", "path0"], cwd=ANY, check=ANY, capture_output=ANY, text=ANY
+        )
+
+    def test_long_argument_list_runs_each_batch(self, git):
+        paths = [f"path{i}" for i in range(5)]
+
+        git.add(*paths)
+
+        assert called_commands() == [
+            ["git", "add", "path0", "path1"],
+            ["git", "add", "path2", "path3"],
+            ["git", "add", "path4"],
+        ]
+
+    def test_long_argument_list_joins_outputs(self, git):
+        command.subprocess.run.return_value.stdout = "output\n"
+
+        assert git.add(*[f"path{i}" for i in range(3)]) == "output\noutput"
+
+    def test_failing_batch_raises_error_with_its_command(self, git):
+        def run(command, **kwargs):
+            if "path2" in command:
+                raise CalledProcessError(1, command, stderr="some error message")
+
+            return CompletedProcess(command, 0, stdout="")
+
+        command.subprocess.run.side_effect = run
+
+        with pytest.raises(GitError) as e:
+            git.add(*[f"path{i}" for i in range(5)])
+
+        assert e.value.command == ["git", "add", "path2", "path3"]
+
+    def test_parallel_subcommand_runs_each_batch(self, parallel_git):
+        paths = [f"path{i}" for i in range(5)]
+
+        parallel_git.hash_object(*paths)
+
+        assert sorted(called_commands()) == [
+            ["git", "hash-object", "path0", "path1"],
+            ["git", "hash-object", "path2", "path3"],
+            ["git", "hash-object", "path4"],
+        ]
+
+    def test_parallel_subcommand_joins_outputs_in_order(self, parallel_git):
+        def run(command, **kwargs):
+            return CompletedProcess(command, 0, stdout=" ".join(command[2:]))
+
+        command.subprocess.run.side_effect = run
+
+        output = parallel_git.hash_object(*[f"path{i}" for i in range(5)])
+
+        assert output == "path0 path1\npath2 path3\npath4"
@@ -1,10 +1,11 @@
+import asyncio
 from subprocess import CalledProcessError
-from unittest.mock import ANY
+from unittest.mock import ANY, AsyncMock, MagicMock
 
 import pytest
 
 import command
-from command import Command, CommandError
+from command import AsyncCommand, Command, CommandError
 
 
 SUBPROCESS_ANY_ARGS = {
@@ -30,6 +31,15 @@ def git() -> Command:
     return Command("git", working_dir="/foo/bar", error=GitError)
 
 
+@pytest.fixture
+def async_git(mocker) -> AsyncCommand:
+    proc = MagicMock(returncode=0)
+    proc.communicate = AsyncMock(return_value=(b" output\n", b""))
+    mocker.patch("command.asyncio.create_subprocess_exec", AsyncMock(return_value=proc))
+
+    return AsyncCommand("git", working_dir="/foo/bar", error=GitError)
+
+
 @pytest.fixture
 def silent_git() -> Command:
     return Command("git", working_dir="/foo/bar", capture_output=False, error=GitError)
@@ -105,6 +115,15 @@ class TestGitCommand:
             ["git", "log", "--oneline", "HEAD"], **SUBPROCESS_ANY_ARGS
         )
 
+    def test_getattr_places_options_of_command_before_subcommand(self):
+        git = Command("git", working_dir="/foo/bar", options=["-c", "gc.auto=0"])
+
+        git.commit(m="foo")
+
+        command.subprocess.run.assert_called_once_with(
+            ["git", "-c", "gc.auto=0", "commit", "-m", "foo"], **SUBPROCESS_ANY_ARGS
+        )
+
     def test_getattr_raises_correct_error_when_subprocess_raises_an_error(self, git):
         command.subprocess.run.side_effect = CalledProcessError(
             1, "git", "some error message"
@@ -121,3 +140,69 @@ class TestGitCommand:
         subprocess_args = {**SUBPROCESS_ANY_ARGS, "capture_output": False}
 
         command.subprocess.run.assert_called_once_with(ANY, **subprocess_args)
+
+
+class TestAsyncCommand:
+    def test_getattr_returns_a_coroutine(self, async_git):
+        coroutine = async_git.status()
+
+        assert asyncio.iscoroutine(coroutine)
+        asyncio.run(coroutine)
+
+    def test_getattr_calls_subprocess_with_formatted_arguments_and_cwd(self, async_git):
+        asyncio.run(async_git.log("HEAD", n=3, oneline=True))
+
+        command.asyncio.create_subprocess_exec.assert_called_once_with(
+            "git",
+            "log",
+            "-n",
+            "3",
+            "--oneline",
+            "HEAD",
+            cwd="/foo/bar",
+            stdout=ANY,
+            stderr=ANY,
+        )
+
+    def test_getattr_returns_stripped_output(self, async_git):
+        assert asyncio.run(async_git.status()) == "output"
+
+    def test_getattr_raises_correct_error_when_process_fails(self, async_git):
+        proc = command.asyncio.create_subprocess_exec.return_value
+        proc.returncode = 1
+        proc.communicate.return_value = (b"", b"some error message")
+
+        with pytest.raises(GitError, match="some error message"):
+            asyncio.run(async_git.status())
+
+
+class TestBinary:
+    def test_binary_returns_memoryview_of_unstripped_output(self, git):
+        command.subprocess.run.return_value.stdout = b" \x00\xff\n"
+        command.subprocess.run.return_value.returncode = 0
+
+        output = git.binary("cat_file", "blob", "HEAD:foo")
+
+        assert isinstance(output, memoryview)
+        assert output.tobytes() == b" \x00\xff\n"
+
+    def test_binary_does_not_decode_output(self, git):
+        command.subprocess.run.return_value.stdout = b""
+        command.subprocess.run.return_value.returncode = 0
+
+        git.binary("cat_file", "blob", "HEAD:foo")
+
+        command.subprocess.run.assert_called_once_with(
+            ["git", "cat-file", "blob", "HEAD:foo"],
+            cwd="/foo/bar",
+            check=True,
+            capture_output=True,
+        )
+
+    def test_binary_raises_correct_error_with_decoded_stderr(self, git):
+        command.subprocess.run.side_effect = CalledProcessError(
+            1, "git", stderr=b"some error message"
+        )
+
+        with pytest.raises(GitError, match="some error message"):
+            git.binary("cat_file", "blob", "HEAD:foo")
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from command import scheduler as scheduler_module
+from command.scheduler import (
+    GiB,
+    HEAVY,
+    LIGHT,
+    Cost,
+    Scheduler,
+    available_cpus,
+    available_memory,
+    memory_pressure,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_pressure(mocker):
+    mocker.patch("command.scheduler.memory_pressure", return_value=0.0)
+    mocker.patch("command.scheduler.available_memory", return_value=64 * GiB)
+
+
+def acquire_in_thread(scheduler: Scheduler, cost: Cost) -> threading.Thread:
+    thread = threading.Thread(target=scheduler.acquire, args=(cost,), daemon=True)
+    thread.start()
+    thread.join(0.2)
+    return thread
+
+
+class TestScheduler:
+    def test_idle_scheduler_admits_job_larger_than_capacity(self):
+        scheduler = Scheduler(cpus=1, memory=GiB)
+
+        with scheduler.slot(HEAVY) as wait:
+            assert wait < 1
+
+    def test_light_jobs_run_concurrently_up_to_capacity(self):
+        scheduler = Scheduler(cpus=2, memory=64 * GiB)
+        scheduler.acquire(LIGHT)
+
+        assert not acquire_in_thread(scheduler, LIGHT).is_alive()
+        assert acquire_in_thread(scheduler, LIGHT).is_alive()
+
+    def test_waiting_job_is_admitted_when_slot_is_released(self):
+        scheduler = Scheduler(cpus=1, memory=64 * GiB)
+        scheduler.acquire(LIGHT)
+        thread = acquire_in_thread(scheduler, LIGHT)
+
+        scheduler.release(LIGHT)
+        thread.join(1)
+
+        assert not thread.is_alive()
+
+    def test_heavy_job_waits_for_memory_budget(self):
+        scheduler = Scheduler(cpus=64, memory=3 * GiB, memory_reserve=0)
+        scheduler.acquire(HEAVY)
+
+        assert acquire_in_thread(scheduler, HEAVY).is_alive()
+
+    def test_job_waits_while_host_is_under_memory_pressure(self, mocker):
+        scheduler_module.memory_pressure.return_value = 50.0
+        scheduler = Scheduler(cpus=64, memory=64 * GiB)
+        scheduler.acquire(LIGHT)
+
+        assert acquire_in_thread(scheduler, LIGHT).is_alive()
+
+    def test_job_waits_while_available_memory_is_below_reserve(self, mocker):
+        scheduler_module.available_memory.return_value = 0
+        scheduler = Scheduler(cpus=64, memory=64 * GiB)
+        scheduler.acquire(LIGHT)
+
+        assert acquire_in_thread(scheduler, LIGHT).is_alive()
+
+    def test_memory_pressure_is_read_once_per_poll_interval(self):
+        scheduler = Scheduler(cpus=64, memory=64 * GiB)
+        scheduler.acquire(LIGHT)
+        for _ in range(5):
+            scheduler.acquire(LIGHT)
+
+        assert scheduler_module.memory_pressure.call_count == 1
+
+    def test_wait_time_is_reported(self):
+        scheduler = Scheduler(cpus=1, memory=64 * GiB)
+        scheduler.acquire(LIGHT)
+
+        def release_later():
+            time.sleep(0.1)
+            scheduler.release(LIGHT)
+
+        threading.Thread(target=release_later).start()
+        wait = scheduler.acquire(LIGHT)
+
+        assert wait >= 0.1
+        assert scheduler.total_wait >= 0.1
+        assert scheduler.max_wait == wait
+        assert scheduler.jobs == 2
+
+
+class TestSystemLimits:
+    def test_available_cpus_respects_cgroup_v2_quota(self, tmp_path, mocker):
+        mocker.patch("command.scheduler.os.cpu_count", return_value=8)
+        mocker.patch(
+            "command.scheduler.os.sched_getaffinity", return_value=set(range(8))
+        )
+        (tmp_path / "cpu.max").write_text("200000 100000\n")
+
+        assert available_cpus(str(tmp_path)) == 2
+
+    def test_available_cpus_without_quota_uses_affinity(self, tmp_path, mocker):
+        mocker.patch(
+            "command.scheduler.os.sched_getaffinity", return_value=set(range(3))
+        )
+        (tmp_path / "cpu.max").write_text("max 100000\n")
+
+        assert available_cpus(str(tmp_path)) == 3
+
+    def test_available_memory_respects_cgroup_v2_limit(self, tmp_path, mocker):
+        mocker.stopall()
+        (tmp_path / "memory.max").write_text(str(2 * GiB))
+        (tmp_path / "memory.current").write_text(str(GiB // 2))
+
+        assert available_memory(str(tmp_path)) <= GiB + GiB // 2
+
+    def test_memory_pressure_reads_avg10_of_some_line(self, tmp_path, mocker):
+        mocker.stopall()
+        (tmp_path / "memory.pressure").write_text(
+            "some avg10=12.50 avg60=3.00 avg300=1.00 total=100\n"
+            "full avg10=2.00 avg60=0.00 avg300=0.00 total=10\n"
+        )
+
+        assert memory_pressure(str(tmp_path)) == 12.5
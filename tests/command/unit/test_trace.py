@@ -0,0 +1,68 @@
+from subprocess import CalledProcessError
+
+import pytest
+
+import command
+from command import Command, CommandError
+from command.trace import add_hook, remove_hook
+
+
+@pytest.fixture(autouse=True)
+def processes(mocker) -> None:
+    mocker.patch("command.subprocess.run")
+    mocker.patch("command.shutil.which", return_value=True)
+
+
+@pytest.fixture
+def records():
+    records = []
+    add_hook(records.append)
+
+    yield records
+
+    remove_hook(records.append)
+
+
+@pytest.fixture
+def git() -> Command:
+    return Command("git", working_dir="/foo/bar")
+
+
+class TestTrace:
+    def test_hook_is_called_with_command_and_cwd(self, git, records):
+        git.log(n=1)
+
+        assert len(records) == 1
+        assert records[0].command == ["git", "log", "-n", "1"]
+        assert records[0].cwd == "/foo/bar"
+
+    def test_hook_is_called_with_exit_code_and_output_size(self, git, records):
+        command.subprocess.run.return_value.returncode = 0
+        command.subprocess.run.return_value.stdout = "abc\n"
+
+        git.status()
+
+        assert records[0].exit_code == 0
+        assert records[0].output_size == 4
+
+    def test_hook_is_called_with_wall_time(self, git, records):
+        git.status()
+
+        assert records[0].wall_time >= 0
+
+    def test_hook_is_called_when_command_fails(self, git, records):
+        command.subprocess.run.side_effect = CalledProcessError(128, "git", "error")
+
+        with pytest.raises(CommandError):
+            git.status()
+
+        assert records[0].exit_code == 128
+
+    def test_removed_hook_is_not_called(self, git):
+        records = []
+        add_hook(records.append)
+        remove_hook(records.append)
+
+        git.status()
+
+        assert records == []
@@ -1,5 +1,7 @@
 import os
-from gradle.command import Gradle
+import asyncio
+
+from gradle.command import AsyncGradle, Gradle
 
 
 class TestGradle:
@@ -37,3 +39,27 @@ class TestGradle:
             working_dir=".",
             capture_output=True,
         )
+
+    def test_stage_runs_task_quietly(self, mocker):
+        mocker.patch("gradle.command.os.path.exists", return_value=False)
+        mocker.patch("command.shutil.which", return_value=True)
+
+        stage = Gradle(".").stage("dependencies")
+
+        assert stage.command == ["gradle", "dependencies", "--quiet"]
+        assert not stage.capture_output
+
+
+class TestAsyncGradle:
+    def test_getattr_returns_a_coroutine(self, mocker):
+        mocker.patch("gradle.command.os.path.exists", return_value=False)
+        mocker.patch("command.shutil.which", return_value=True)
+        run_command = mocker.patch(
+            "command.AsyncCommand._run_command", new_callable=mocker.AsyncMock
+        )
+
+        coroutine = AsyncGradle(".").decompileCFR()
+
+        assert asyncio.iscoroutine(coroutine)
+        asyncio.run(coroutine)
+        run_command.assert_awaited_once()
@@ -1,9 +1,13 @@
+import os
+
 from javalang.tree import CompilationUnit, ClassDeclaration, Literal, MethodDeclaration
+from mint.repo import Repo
 
 from java import (
     ast_nodes_equal,
     filter_ast_node,
     get_renamed_variables,
+    undo_renames,
     undo_variable_renames,
 )
 
@@ -222,3 +226,45 @@ def test_undo_variable_renames_with_one_renamed_declaration_set_to_string_with_s
     renamed_variables = [(None, [("x", "y")])]
 
     assert undo_variable_renames('int y = "y";', renamed_variables) == 'int x = "y";'
+
+
+def test_undo_renames_reverts_renamed_variables_in_modified_files(tmp_path):
+    repo = Repo.init(str(tmp_path))
+    for name in ("Foo.java", "Bar.java"):
+        with open(os.path.join(repo.path, name), "w") as f:
+            f.write(wrap_in_class("int x = 0;"))
+
+    repo.git.add("Foo.java", "Bar.java")
+    repo.git.commit(message="first")
+
+    # Foo.java is modified, and Bar.java is rewritten with the same content
+    for name, code in (("Foo.java", "int y = 0;"), ("Bar.java", "int x = 0;")):
+        with open(os.path.join(repo.path, name), "w") as f:
+            f.write(wrap_in_class(code))
+
+    undo_renames(repo)
+
+    with open(os.path.join(repo.path, "Foo.java")) as f:
+        assert f.read() == wrap_in_class("int x = 0;")
+
+    repo.close()
+
+
+def test_undo_renames_translates_newlines_of_rewritten_files(tmp_path):
+    repo = Repo.init(str(tmp_path))
+    path = os.path.join(repo.path, "Foo.java")
+    with open(path, "w") as f:
+        f.write(wrap_in_class("int x = 0;"))
+
+    repo.git.add("Foo.java")
+    repo.git.commit(message="first")
+
+    with open(path, "w", newline="\r\n") as f:
+        f.write(wrap_in_class("int y = 0;"))
+
+    undo_renames(repo)
+
+    with open(path, "rb") as f:
+        assert f.read() == wrap_in_class("int x = 0;").encode()
+
+    repo.close()
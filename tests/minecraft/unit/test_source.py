@@ -5,7 +5,8 @@ from gradle.project import Project
 from mint.repo import Repo
 import pytest
 
-from minecraft.source import generate_sources
+import minecraft.source
+from minecraft.source import DecompilerMC, generate_sources
 
 
 class GitTree:
@@ -61,6 +62,7 @@ def decompiler_mc_repo(mocker):
     repo = create_repo(repo_path, mocker)
     mocker.patch("minecraft.source.Repo", return_value=repo)
     mocker.patch("minecraft.source.Repo.clone", return_value=repo)
+    mocker.patch("minecraft.source.DecompilerMC")
     yield repo
 
 
@@ -96,6 +98,57 @@ def test_generate_sources_with_yarn_removes_old_decompiler_dir_if_exists(
     rmtree.assert_any_call(old_decompiler_dir)
 
 
+def test_generate_sources_with_yarn_clones_only_latest_commits_without_blobs(
+    mocker, versions, yarn_project
+):
+    root_path = "foo"
+
+    mocker.patch("minecraft.source.click")
+    mocker.patch("shutil.rmtree")
+    mocker.patch("shutil.move")
+    mocker.patch("os.makedirs")
+
+    generate_sources(versions.snapshot, "yarn", root_path)
+
+    minecraft.source.Repo.clone.assert_called_once_with(
+        minecraft.source.YARN_REMOTE_URL,
+        os.path.join(root_path, "yarn"),
+        filter="blob:none",
+        depth=1,
+    )
+
+
+def test_generate_sources_with_yarn_fetches_only_the_version_branch(
+    mocker, versions, yarn_project
+):
+    mocker.patch("minecraft.source.click")
+    mocker.patch("shutil.rmtree")
+    mocker.patch("shutil.move")
+    mocker.patch("os.makedirs")
+
+    generate_sources(versions.snapshot, "yarn", "foo")
+
+    repo = minecraft.source.Repo.clone.return_value
+    repo.fetch_branches.assert_called_once_with(
+        "origin", str(versions.snapshot), depth=1
+    )
+
+
+def test_generate_sources_with_yarn_keeps_history_of_full_clone(
+    mocker, versions, yarn_project
+):
+    mocker.patch("minecraft.source.click")
+    mocker.patch("shutil.rmtree")
+    mocker.patch("shutil.move")
+    mocker.patch("os.makedirs")
+    repo = minecraft.source.Repo.clone.return_value
+    repo.is_shallow.return_value = False
+
+    generate_sources(versions.snapshot, "yarn", "foo")
+
+    repo.fetch_branches.assert_called_once_with("origin", str(versions.snapshot))
+
+
 def test_generate_sources_with_1_20_4_and_yarn_moves_sources_to_repo(
     mocker, versions, yarn_project
 ):
@@ -142,7 +195,6 @@ def test_generate_sources_with_mojang_runs_decompiler(
     root_path = "foo"
     decompiler_dir = os.path.join(root_path, "DecompilerMC")
 
-    subprocess_run = mocker.patch("subprocess.run", return_value=SubprocessMock())
     mocker.patch("minecraft.source.click")
     mocker.patch("shutil.rmtree")
     mocker.patch("shutil.move")
@@ -150,20 +202,10 @@ def test_generate_sources_with_mojang_runs_decompiler(
 
     generate_sources(versions.snapshot, "mojang", root_path)
 
-    subprocess_run.assert_called_once_with(
-        [
-            "python3",
-            "main.py",
-            "--mcv",
-            str(versions.snapshot),
-            "-s",
-            "client",
-            "-c",
-            "-f",
-            "-q",
-        ],
-        stderr=subprocess.PIPE,
-        cwd=decompiler_dir,
+    DecompilerMC = minecraft.source.DecompilerMC
+    DecompilerMC.assert_called_once_with(decompiler_dir)
+    DecompilerMC.return_value.run.assert_called_once_with(
+        mcv=versions.snapshot, s="client", c=True, f=True, q=True
     )
 
 
@@ -204,3 +246,14 @@ def test_generate_sources_with_mojang_moves_sources_to_repo(
         os.path.join(decompiler_dir, "src", str(versions.snapshot), "client"),
         os.path.join(root_path, "src"),
     )
+
+
+def test_decompiler_mc_run_calls_main_py_with_formatted_options(mocker):
+    mocker.patch("command.shutil.which", return_value="/path/to/python3")
+    run_command = mocker.patch("minecraft.source.DecompilerMC._run_command")
+
+    DecompilerMC("foo").run(mcv="1.18", s="client", c=True, f=True, q=True)
+
+    run_command.assert_called_once_with(
+        ["python3", "main.py", "--mcv", "1.18", "-s", "client", "-c", "-f", "-q"]
+    )
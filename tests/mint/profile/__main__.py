@@ -0,0 +1,7 @@
+import sys
+
+from .profile_large_repo import profile_large_repo
+
+
+if __name__ == "__main__":
+    profile_large_repo([int(size) for size in sys.argv[1:]] or None)
@@ -0,0 +1,85 @@
+"""
+Latency of `git add`, `git commit` and `git status` as the tree grows, with
+git's default settings and with the large repo profile
+
+Each round rewrites every file (like generating a new version does) but only
+changes the contents of a few of them.
+
+Run with `python -m tests.mint.profile [FILE_COUNT...]` (with `src` on the
+Python path).
+"""
+
+import os
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from mint.profile import LARGE_REPO_PROFILE, apply_profile
+from mint.repo import Repo
+
+# Files per directory
+FANOUT = 100
+
+# Versions committed per measurement
+ROUNDS = 3
+
+# Files whose contents change in each round
+CHANGED = 50
+
+
+def write_tree(path: str, count: int, round_: int) -> None:
+    for i in range(count):
+        directory = os.path.join(path, "src", str(i // FANOUT))
+        os.makedirs(directory, exist_ok=True)
+
+        version = round_ if i < CHANGED else 0
+        with open(os.path.join(directory, f"Class{i}.java"), "w") as f:
+            f.write(f"class Class{i} {{ int version = {version}; }}\n" * 20)
+
+
+def measure(count: int, profile: Optional[Dict[str, str]]) -> List[float]:
+    """
+    Returns:
+            List[float]: Average seconds taken by add, commit and status
+    """
+
+    totals = [0.0, 0.0, 0.0]
+    with TemporaryDirectory() as tempdir:
+        repo = Repo.init(tempdir)
+        if profile is not None:
+            apply_profile(repo, profile)
+
+        for round_ in range(ROUNDS + 1):
+            write_tree(tempdir, count, round_)
+
+            timings = []
+            for command in (
+                lambda: repo.git.add("src"),
+                lambda: repo.git.commit(message=str(round_)),
+                lambda: repo.git.status(porcelain=True),
+            ):
+                start = perf_counter()
+                command()
+                timings.append(perf_counter() - start)
+
+            # The first commit adds every file, which is not what is measured
+            if round_ > 0:
+                totals = [total + timing for total, timing in zip(totals, timings)]
+
+    return [total / ROUNDS for total in totals]
+
+
+def profile_large_repo(counts: Optional[List[int]] = None) -> None:
+    if counts is None:
+        counts = [1000, 5000, 10000]
+
+    print(f"{'files':>8}{'settings':>10}{'add':>12}{'commit':>12}{'status':>12}")
+    for count in counts:
+        for name, profile in (("default", None), ("large", LARGE_REPO_PROFILE)):
+            add, commit, status = measure(count, profile)
+            print(
+                f"{count:>8}{name:>10}"
+                f"{add * 1000:>9.1f} ms"
+                f"{commit * 1000:>9.1f} ms"
+                f"{status * 1000:>9.1f} ms"
+            )
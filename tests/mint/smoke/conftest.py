@@ -1,3 +1,4 @@
+import os
 from tempfile import TemporaryDirectory
 import pytest
 
@@ -15,6 +16,29 @@ def repo(tempdir):
     yield Repo.init(tempdir)
 
 
+@pytest.fixture
+def write():
+    # Writes a file in a repo, creating its directory if needed
+    def write(repo, path, content):
+        full_path = os.path.join(repo.path, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+
+    return write
+
+
+@pytest.fixture
+def committed_repo(repo, write):
+    write(repo, "foo.txt", "hello\n")
+    repo.git.add("foo.txt")
+    repo.git.commit(message="add foo")
+
+    yield repo
+
+    repo.close()
+
+
 @pytest.fixture
 def shallow_cloned_repo(tempdir):
     yield Repo.clone("https://github.com/clabe45/shulkr.git", tempdir, depth=1)
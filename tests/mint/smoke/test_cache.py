@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+from command import Command
+from command.trace import add_hook, remove_hook
+from mint.error import GitError
+from mint.repo import Repo
+
+
+@pytest.fixture
+def records():
+    records = []
+    add_hook(records.append)
+
+    yield records
+
+    remove_hook(records.append)
+
+
+def queries(records):
+    # Leave out the lookup of the git directory (once per CachedCommand)
+    return [record for record in records if "--git-common-dir" not in record.command]
+
+
+@pytest.fixture
+def tagged_repo(repo):
+    repo.git.commit(message="first", allow_empty=True)
+    repo.git.tag("v1")
+
+    return repo
+
+
+class TestCachedCommand:
+    def test_repeated_query_runs_git_once(self, tagged_repo, records):
+        first = tagged_repo.git.describe(tags=True)
+        second = tagged_repo.git.describe(tags=True)
+
+        assert first == second == "v1"
+        assert len(queries(records)) == 1
+
+    def test_failed_query_is_cached(self, repo, records):
+        for _ in range(2):
+            with pytest.raises(GitError):
+                repo.git.rev_parse("HEAD")
+
+        assert len(queries(records)) == 1
+
+    def test_commit_through_repo_invalidates_queries(self, tagged_repo):
+        before = tagged_repo.git.rev_parse("HEAD")
+
+        tagged_repo.git.commit(message="second", allow_empty=True)
+
+        assert tagged_repo.git.rev_parse("HEAD") != before
+
+    def test_tag_through_repo_invalidates_queries(self, tagged_repo):
+        tagged_repo.git.describe(tags=True)
+
+        tagged_repo.git.commit(message="second", allow_empty=True)
+        tagged_repo.git.tag("v2")
+
+        assert tagged_repo.git.describe(tags=True) == "v2"
+
+    def test_listing_tags_is_cached(self, tagged_repo, records):
+        tagged_repo.git.tag()
+        tagged_repo.git.tag()
+
+        assert len(queries(records)) == 1
+
+    def test_commit_outside_of_repo_invalidates_queries(self, tagged_repo):
+        before = tagged_repo.git.rev_parse("HEAD")
+
+        other_git = Command("git", working_dir=tagged_repo.path)
+        other_git.commit(message="second", allow_empty=True)
+
+        assert tagged_repo.git.rev_parse("HEAD") != before
+
+    def test_new_branch_outside_of_repo_invalidates_queries(self, tagged_repo):
+        tagged_repo.git.for_each_ref("--format=%(refname)")
+
+        other_git = Command("git", working_dir=tagged_repo.path)
+        other_git.branch("other")
+
+        refs = tagged_repo.git.for_each_ref("--format=%(refname)").split("\n")
+        assert "refs/heads/other" in refs
+
+    def test_commit_through_other_repo_object_invalidates_queries(self, tagged_repo):
+        before = tagged_repo.git.rev_parse("HEAD")
+
+        Repo(tagged_repo.path).git.commit(message="second", allow_empty=True)
+
+        assert tagged_repo.git.rev_parse("HEAD") != before
+
+    def test_queries_in_linked_worktree_are_cached(
+        self, tagged_repo, tmp_path, records
+    ):
+        path = str(tmp_path / "worktree")
+        tagged_repo.git.worktree("add", "--detach", path)
+        worktree = Repo(path, check_path=False)
+
+        worktree.git.describe(tags=True)
+        worktree.git.describe(tags=True)
+        describes = [record for record in records if "describe" in record.command]
+        assert len(describes) == 1
+
+        other_git = Command("git", working_dir=path)
+        other_git.commit(message="second", allow_empty=True)
+        other_git.tag("v2")
+
+        assert worktree.git.describe(tags=True) == "v2"
+
+    def test_read_only_subcommands_keep_queries(self, tagged_repo, records):
+        tagged_repo.git.describe(tags=True)
+
+        tagged_repo.git.var("GIT_COMMITTER_IDENT")
+        tagged_repo.git.cat_file("-t", "HEAD")
+        list(tagged_repo.ls_tree("HEAD"))
+        tagged_repo.git.describe(tags=True)
+
+        describes = [record for record in records if "describe" in record.command]
+        assert len(describes) == 1
+
+    def test_session_invalidates_queries_once_it_exits(self, tagged_repo, mocker):
+        invalidate = mocker.spy(tagged_repo.git, "invalidate")
+
+        session = tagged_repo.git.session("update-ref", stdin=True)
+        assert invalidate.call_count == 1
+
+        session.request("create refs/tags/v2 HEAD")
+        session.close()
+        assert invalidate.call_count == 2
+
+    def test_stream_invalidates_queries_once_it_is_consumed(self, tagged_repo, mocker):
+        invalidate = mocker.spy(tagged_repo.git, "invalidate")
+
+        records = tagged_repo.git.stream("tag", "v2")
+        assert invalidate.call_count == 1
+
+        list(records)
+        assert invalidate.call_count == 2
+        assert tagged_repo.git.tag().split("\n") == ["v1", "v2"]
+
+    def test_binary_invalidates_queries(self, tagged_repo, mocker):
+        invalidate = mocker.spy(tagged_repo.git, "invalidate")
+
+        tagged_repo.git.binary("tag", "v2")
+
+        assert invalidate.call_count == 2
@@ -0,0 +1,67 @@
+import os
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from mint.repo import BLOBLESS, Repo
+
+
+@pytest.fixture
+def remote(repo):
+    # Partial clones must be allowed by the server
+    repo.git.config("uploadpack.allowFilter", "true")
+
+    for branch, name in (("main", "a"), ("1.18", "b")):
+        repo.git.checkout(B=branch)
+        os.makedirs(os.path.join(repo.path, name))
+        with open(os.path.join(repo.path, name, "file"), "w") as f:
+            f.write(name)
+
+        repo.git.add(name)
+        repo.git.commit(message=name)
+
+    repo.git.checkout("main")
+
+    return repo
+
+
+@pytest.fixture
+def clone(remote):
+    with TemporaryDirectory() as tempdir:
+        dest = os.path.join(tempdir, "clone")
+        clone = Repo.clone(f"file://{remote.path}", dest, filter=BLOBLESS, depth=1)
+
+        yield clone
+
+        clone.close()
+
+
+class TestPartialClone:
+    def test_clone_is_shallow_and_has_one_branch(self, clone):
+        assert clone.is_shallow()
+        assert [ref.short_name for ref in clone.refs("refs/remotes")] == [
+            "origin/HEAD",
+            "origin/main",
+        ]
+
+    def test_fetch_branches_only_fetches_given_branches(self, clone):
+        clone.fetch_branches("origin", "1.18", depth=1)
+        clone.git.checkout("origin/1.18")
+
+        with open(os.path.join(clone.path, "b", "file")) as f:
+            assert f.read() == "b"
+
+        assert clone.is_shallow()
+
+    def test_sparse_checkout_only_checks_out_directories(self, clone):
+        clone.fetch_branches("origin", "1.18", depth=1)
+        clone.git.checkout("origin/1.18")
+
+        clone.sparse_checkout("b")
+
+        assert not os.path.exists(os.path.join(clone.path, "a"))
+        assert os.path.exists(os.path.join(clone.path, "b", "file"))
+
+        clone.sparse_checkout()
+
+        assert os.path.exists(os.path.join(clone.path, "a", "file"))
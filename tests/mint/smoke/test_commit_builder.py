@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from mint.commit_builder import CommitBuilder
+from mint.error import GitError
+from mint.objects import blob_oid
+
+
+class TestCommitBuilder:
+    def test_commit_compares_files_of_same_size_by_content(self, committed_repo, write):
+        write(committed_repo, "src/a.java", "a")
+        write(committed_repo, "src/b/b.java", "b")
+
+        with CommitBuilder(committed_repo) as builder:
+            assert builder.commit("first", "src") == 2
+
+            # Same size, different content
+            write(committed_repo, "src/a.java", "c")
+            # Rewritten with the same content
+            write(committed_repo, "src/b/b.java", "b")
+            assert builder.commit("second", "src") == 1
+
+            os.remove(os.path.join(committed_repo.path, "src/b/b.java"))
+            assert builder.commit("third", "src") == 1
+
+        assert committed_repo.git.show("HEAD~1:src/a.java") == "c"
+        assert committed_repo.git.ls_tree("HEAD", "src", name_only=True, r=True) == (
+            "src/a.java"
+        )
+
+    def test_files_with_a_different_size_are_not_hashed(
+        self, committed_repo, write, mocker
+    ):
+        write(committed_repo, "src/a.java", "a")
+        with CommitBuilder(committed_repo) as builder:
+            builder.commit("first", "src")
+
+            write(committed_repo, "src/a.java", "changed")
+            spy = mocker.patch("mint.commit_builder.blob_oid", side_effect=blob_oid)
+            builder.commit("second", "src")
+
+        spy.assert_not_called()
+
+    def test_checkpoint_moves_branch_and_writes_tags(self, committed_repo, write):
+        write(committed_repo, "src/a.java", "a")
+        head = committed_repo.head_commit()
+
+        with CommitBuilder(committed_repo) as builder:
+            builder.commit("1.18", "src")
+            builder.tag("1.18")
+            assert committed_repo.head_commit() == head
+
+            builder.checkpoint()
+
+            assert committed_repo.git.describe(tags=True) == "1.18"
+
+    def test_close_deletes_private_index(self, committed_repo, write):
+        write(committed_repo, "src/a.java", "a")
+
+        with CommitBuilder(committed_repo) as builder:
+            builder.commit("first", "src")
+            index_file = builder._index.index_file
+            assert os.path.exists(index_file)
+
+        assert not os.path.exists(index_file)
+
+    def test_checkpoint_fails_if_branch_moved(self, committed_repo, write):
+        write(committed_repo, "src/a.java", "a")
+
+        builder = CommitBuilder(committed_repo)
+        builder.commit("first", "src")
+        builder.tag("first")
+        committed_repo.git.commit(allow_empty=True, message="someone else")
+        with pytest.raises(GitError):
+            builder.checkpoint()
+
+        assert committed_repo.git.log("--format=%s", n=1) == "someone else"
+        assert list(committed_repo.refs("refs/tags")) == []
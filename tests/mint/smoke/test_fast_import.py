@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+import mint.fast_import
+from mint.fast_import import FastImport
+
+
+class TestFastImport:
+    def test_commit_only_reads_files_git_reports(self, committed_repo, write, mocker):
+        write(committed_repo, "src/a.java", "a")
+        write(committed_repo, "src/b.java", "b")
+
+        with FastImport(committed_repo) as fast_import:
+            fast_import.commit("first", "src")
+            fast_import.checkpoint()
+
+            read_file = mocker.spy(mint.fast_import, "read_file")
+            write(committed_repo, "src/a.java", "changed")
+            assert fast_import.commit("second", "src") == 1
+
+        assert [call.args[0] for call in read_file.call_args_list] == [
+            os.path.join(committed_repo.path, "src/a.java")
+        ]
+        assert committed_repo.git.show("HEAD:src/b.java") == "b"
+
+    def test_interrupted_commit_is_discarded(self, committed_repo, write, mocker):
+        write(committed_repo, "src/a.java", "a")
+        head = committed_repo.head_commit()
+
+        fast_import = FastImport(committed_repo)
+        mocker.patch("mint.fast_import.read_file", side_effect=OSError)
+        with pytest.raises(OSError):
+            fast_import.commit("first", "src")
+
+        fast_import.close()
+
+        assert committed_repo.head_commit() == head
@@ -0,0 +1,162 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from mint.lock import CommitQueue, FileLock, LockTimeoutError, is_running
+
+HOLD_LOCK = """
+import sys, time
+from mint.lock import FileLock
+lock = FileLock(sys.argv[1])
+lock.acquire()
+print('locked', flush=True)
+time.sleep(60)
+"""
+
+
+@pytest.fixture
+def holder():
+    # Another process that holds a lock until it is killed
+    procs = []
+
+    def hold(path):
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        proc = subprocess.Popen(
+            [sys.executable, "-c", HOLD_LOCK, path],
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        procs.append(proc)
+        assert proc.stdout.readline() == b"locked\n"
+        return proc
+
+    yield hold
+
+    for proc in procs:
+        proc.kill()
+        proc.wait()
+        proc.stdout.close()
+
+
+class TestFileLock:
+    def test_acquire_creates_lock_file_and_records_owner(self, tmp_path):
+        path = str(tmp_path / "locks" / "a.lock")
+
+        with FileLock(path) as lock:
+            owner = lock.owner()
+            assert owner.pid == os.getpid()
+            assert owner.is_alive()
+
+    def test_acquire_times_out_while_another_process_holds_lock(self, tmp_path, holder):
+        path = str(tmp_path / "a.lock")
+        proc = holder(path)
+
+        with pytest.raises(LockTimeoutError) as info:
+            FileLock(path, timeout=0.2).acquire()
+
+        assert info.value.owner.pid == proc.pid
+
+    def test_lock_is_released_when_holder_dies(self, tmp_path, holder):
+        path = str(tmp_path / "a.lock")
+        proc = holder(path)
+        proc.kill()
+        proc.wait()
+
+        lock = FileLock(path, timeout=5)
+        lock.acquire()
+        assert lock.owner().pid == os.getpid()
+        lock.release()
+
+    def test_acquire_waits_for_release(self, tmp_path):
+        path = str(tmp_path / "a.lock")
+        first = FileLock(path)
+        first.acquire()
+        threading.Timer(0.2, first.release).start()
+
+        with FileLock(path, timeout=5) as second:
+            assert second.locked
+
+        assert not first.locked
+
+
+class TestIsRunning:
+    def test_current_process_is_running(self):
+        assert is_running(os.getpid())
+
+    def test_process_that_exited_is_not_running(self):
+        proc = subprocess.Popen([sys.executable, "-c", ""])
+        proc.wait()
+
+        assert not is_running(proc.pid)
+
+
+class TestCommitQueue:
+    def test_writes_run_on_calling_thread_while_holding_lock(self, tmp_path):
+        path = str(tmp_path / "write.lock")
+
+        def write(i):
+            with pytest.raises(LockTimeoutError):
+                FileLock(path, timeout=0).acquire()
+            return i, threading.get_ident()
+
+        with CommitQueue(FileLock(path)) as queue:
+            assert queue.run(write, 1) == (1, threading.get_ident())
+
+    def test_writes_from_threads_take_turns(self, tmp_path):
+        running = []
+        overlapped = []
+
+        def write():
+            running.append(None)
+            if len(running) > 1:
+                overlapped.append(None)
+            time.sleep(0.01)
+            running.pop()
+
+        with CommitQueue(FileLock(str(tmp_path / "write.lock"))) as queue:
+            threads = [
+                threading.Thread(target=queue.run, args=(write,)) for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert not overlapped
+
+    def test_failed_write_gives_turn_to_next_write(self, tmp_path):
+        def fail():
+            raise ValueError()
+
+        with CommitQueue(FileLock(str(tmp_path / "write.lock"))) as queue:
+            with pytest.raises(ValueError):
+                queue.run(fail)
+
+            assert queue.run(lambda: 42) == 42
+
+
+class TestPlatform:
+    def test_shulkr_imports_without_fcntl(self):
+        # Like on Windows
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        script = "import sys; sys.modules['fcntl'] = None; import shulkr.app"
+
+        subprocess.run([sys.executable, "-c", script], env=env, check=True)
+
+    def test_lock_works_without_fcntl(self, tmp_path, mocker):
+        # Windows locks a byte range of the file instead
+        msvcrt = mocker.Mock(LK_NBLCK=2, LK_UNLCK=0)
+        mocker.patch("mint.lock.fcntl", None)
+        mocker.patch("mint.lock.msvcrt", msvcrt)
+
+        with FileLock(str(tmp_path / "a.lock")) as lock:
+            assert lock.owner().pid == os.getpid()
+
+        assert [call.args[1:] for call in msvcrt.locking.call_args_list] == [
+            (msvcrt.LK_NBLCK, 1),
+            (msvcrt.LK_UNLCK, 1),
+        ]
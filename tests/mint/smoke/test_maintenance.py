@@ -0,0 +1,68 @@
+import os
+
+import mint.maintenance
+from mint.maintenance import (
+    AUTO_GC_SETTINGS,
+    count_objects,
+    maintain,
+    needs_maintenance,
+)
+from mint.profile import read_config
+from mint.repo import Repo
+
+
+def commit_files(repo, count):
+    for i in range(count):
+        with open(os.path.join(repo.path, f"{i}.java"), "w") as f:
+            f.write(f"class Foo{{int x = {i};}}\n" * 10)
+
+    repo.git.add(".")
+    repo.git.commit(message=str(count))
+
+
+class TestMaintenance:
+    def test_maintain_packs_loose_objects_and_writes_indexes(self, repo):
+        commit_files(repo, 10)
+        commit_files(repo, 20)
+        repo.git.tag("1.18")
+
+        report = maintain(repo)
+
+        assert report.loose_before > 0
+        assert count_objects(repo)["count"] == 0
+        assert report.packs_after == 1
+        assert report.size_after > 0
+
+        assert not os.listdir(os.path.join(repo.path, ".git", "refs", "tags"))
+
+        objects = os.path.join(repo.path, ".git", "objects")
+        assert os.path.exists(os.path.join(objects, "info", "commit-graphs"))
+        assert os.path.exists(os.path.join(objects, "pack", "multi-pack-index"))
+
+    def test_second_pass_keeps_existing_pack(self, repo):
+        commit_files(repo, 10)
+        maintain(repo)
+        commit_files(repo, 20)
+
+        assert maintain(repo).packs_after == 2
+
+    def test_auto_gc_settings_apply_without_changing_config(self, repo):
+        repo.git.config("gc.auto", "100")
+
+        quiet = Repo(repo.path, config=AUTO_GC_SETTINGS)
+        assert quiet.git.config("gc.auto") == "0"
+        assert quiet.git.config("maintenance.auto") == "false"
+
+        config = read_config(repo)
+        assert config["gc.auto"] == "100"
+        assert "maintenance.auto" not in config
+
+    def test_needs_maintenance_once_loose_objects_pass_limit(self, repo, monkeypatch):
+        commit_files(repo, 10)
+        assert not needs_maintenance(repo)
+
+        monkeypatch.setattr(mint.maintenance, "LOOSE_OBJECT_LIMIT", 5)
+        assert needs_maintenance(repo)
+
+        maintain(repo)
+        assert not needs_maintenance(repo)
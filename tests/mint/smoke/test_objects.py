@@ -0,0 +1,47 @@
+import pytest
+
+from mint.objects import NoSuchObjectError, blob_oid
+
+
+def test_blob_oid_matches_git(committed_repo):
+    assert blob_oid(b"hello\n") == committed_repo.git.rev_parse("HEAD:foo.txt")
+
+
+class TestCatFile:
+    def test_read_returns_blob_contents(self, committed_repo):
+        assert committed_repo.objects.read("HEAD:foo.txt") == b"hello\n"
+
+    def test_read_by_object_id_returns_blob_contents(self, committed_repo):
+        oid = committed_repo.git.rev_parse("HEAD:foo.txt")
+        assert committed_repo.objects.read(oid) == b"hello\n"
+
+    def test_info_returns_type_and_size(self, committed_repo):
+        info = committed_repo.objects.info("HEAD:foo.txt")
+
+        assert info.type == "blob"
+        assert info.size == len(b"hello\n")
+
+    def test_read_missing_object_raises_no_such_object_error(self, committed_repo):
+        with pytest.raises(NoSuchObjectError):
+            committed_repo.objects.read("HEAD:bar.txt")
+
+    def test_info_missing_object_raises_no_such_object_error(self, committed_repo):
+        with pytest.raises(NoSuchObjectError):
+            committed_repo.objects.info("HEAD:bar.txt")
+
+    def test_read_reuses_the_same_process(self, committed_repo):
+        committed_repo.objects.read("HEAD:foo.txt")
+        proc = committed_repo.objects._batch._proc
+
+        committed_repo.objects.read("HEAD:foo.txt")
+
+        assert committed_repo.objects._batch._proc is proc
+
+    def test_read_restarts_process_after_it_dies(self, committed_repo):
+        committed_repo.objects.read("HEAD:foo.txt")
+        proc = committed_repo.objects._batch._proc
+        proc.kill()
+        proc.wait()
+
+        assert committed_repo.objects.read("HEAD:foo.txt") == b"hello\n"
+        assert committed_repo.objects._batch._proc is not proc
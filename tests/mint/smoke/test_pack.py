@@ -0,0 +1,132 @@
+import os
+import subprocess
+
+import pytest
+
+from mint.objects import NoSuchObjectError
+from mint.pack import ObjectReader, apply_delta
+from mint.repo import Repo
+
+
+def commit_versions(repo, count):
+    # Similar versions of one file, so packing them creates delta chains
+    lines = [f"line {i}\n" for i in range(200)]
+    oids = []
+    for version in range(count):
+        lines[version * 7] = f"changed in version {version}\n"
+        with open(os.path.join(repo.path, "Foo.java"), "w") as f:
+            f.write("".join(lines))
+
+        repo.git.add("Foo.java")
+        repo.git.commit(message=f"version {version}")
+        oids.append(repo.git.rev_parse("HEAD:Foo.java"))
+
+    return oids
+
+
+def cat_file(repo, oid):
+    return subprocess.run(
+        ["git", "cat-file", "-p", oid], cwd=repo.path, capture_output=True, check=True
+    ).stdout
+
+
+@pytest.fixture(autouse=True)
+def close_repo(repo):
+    yield
+
+    repo.close()
+
+
+class TestObjectReader:
+    def test_reads_loose_objects(self, repo):
+        [oid] = commit_versions(repo, 1)
+
+        with ObjectReader(repo.path) as reader:
+            assert reader.read_object(oid) == ("blob", cat_file(repo, oid))
+
+    def test_reads_objects_stored_as_offset_deltas(self, repo):
+        oids = commit_versions(repo, 10)
+        repo.git.repack(a=True, d=True, q=True)
+
+        with ObjectReader(repo.path, cache_size=1024) as reader:
+            for oid in oids:
+                assert reader.read(oid) == cat_file(repo, oid)
+
+            commit = repo.head_commit()
+            assert reader.read_object(commit) == ("commit", cat_file(repo, commit))
+
+    def test_reads_objects_stored_as_ref_deltas(self, repo):
+        oids = commit_versions(repo, 10)
+
+        # Without --delta-base-offset, deltas name their base by object id
+        objects = subprocess.run(
+            ["git", "rev-list", "--objects", "--all"],
+            cwd=repo.path,
+            capture_output=True,
+            check=True,
+        ).stdout
+        subprocess.run(
+            ["git", "pack-objects", "-q", ".git/objects/pack/pack"],
+            cwd=repo.path,
+            input=objects,
+            capture_output=True,
+            check=True,
+        )
+        subprocess.run(["git", "prune-packed"], cwd=repo.path, check=True)
+
+        with ObjectReader(repo.path) as reader:
+            for oid in reversed(oids):
+                assert reader.read(oid) == cat_file(repo, oid)
+
+    def test_finds_objects_in_packs_created_after_it(self, repo):
+        with ObjectReader(repo.path) as reader:
+            oids = commit_versions(repo, 3)
+            repo.git.repack(a=True, d=True, q=True)
+
+            assert reader.read(oids[0]) == cat_file(repo, oids[0])
+            assert oids[0] in reader
+
+    def test_missing_object_raises_no_such_object_error(self, repo):
+        commit_versions(repo, 1)
+
+        with ObjectReader(repo.path) as reader:
+            with pytest.raises(NoSuchObjectError):
+                reader.read("0" * 40)
+
+            with pytest.raises(NoSuchObjectError):
+                reader.read("HEAD")
+
+            assert "0" * 40 not in reader
+
+    def test_reads_objects_of_linked_worktree(self, repo, tmp_path):
+        [oid] = commit_versions(repo, 1)
+        worktree = str(tmp_path / "worktree")
+        repo.git.worktree("add", "--detach", worktree, "HEAD")
+
+        with ObjectReader(worktree) as reader:
+            assert reader.read(oid) == cat_file(repo, oid)
+
+    def test_repo_reader_reads_objects(self, repo):
+        [oid] = commit_versions(repo, 1)
+
+        assert repo.reader.read(oid) == cat_file(repo, oid)
+
+
+def test_apply_delta_copies_and_inserts():
+    base = b"hello world"
+    # Base size 11, result size 11: copy 6 bytes at offset 0, insert 'there'
+    delta = bytes([11, 11, 0x90, 6, 5]) + b"there"
+
+    assert apply_delta(base, delta) == b"hello there"
+
+    def test_reads_objects_from_alternates(self, repo, tmp_path):
+        shared = Repo.init(str(tmp_path / "shared"))
+        oids = commit_versions(shared, 3)
+        shared.git.repack(a=True, d=True, q=True)
+        alternates = os.path.join(repo.path, ".git", "objects", "info", "alternates")
+        with open(alternates, "w") as f:
+            f.write(os.path.join(shared.path, ".git", "objects") + "\n")
+
+        with ObjectReader(repo.path) as reader:
+            assert reader.read(oids[-1]) == cat_file(shared, oids[-1])
+            assert oids[0] in reader
@@ -0,0 +1,37 @@
+import os
+
+from mint.profile import LARGE_REPO_PROFILE, apply_profile, read_config, verify_profile
+
+
+class TestProfile:
+    def test_new_repo_does_not_match_profile(self, repo):
+        assert set(verify_profile(repo, LARGE_REPO_PROFILE)) == set(LARGE_REPO_PROFILE)
+
+    def test_apply_profile_sets_missing_settings_once(self, repo):
+        assert set(apply_profile(repo, LARGE_REPO_PROFILE)) == set(LARGE_REPO_PROFILE)
+
+        assert verify_profile(repo, LARGE_REPO_PROFILE) == {}
+        assert apply_profile(repo, LARGE_REPO_PROFILE) == []
+
+    def test_apply_profile_replaces_different_values(self, repo):
+        repo.git.config("core.splitIndex", "false")
+
+        assert verify_profile(repo, LARGE_REPO_PROFILE)["core.splitIndex"] == "false"
+        apply_profile(repo, LARGE_REPO_PROFILE)
+        assert read_config(repo)["core.splitindex"] == "true"
+
+    def test_repo_with_profile_can_be_committed_to(self, repo):
+        apply_profile(repo, LARGE_REPO_PROFILE)
+
+        with open(os.path.join(repo.path, "a"), "w") as f:
+            f.write("a")
+
+        repo.git.add("a")
+        repo.git.commit(message="first")
+
+        assert repo.git.status(porcelain=True) == ""
+        # The index was split
+        assert any(
+            name.startswith("sharedindex.")
+            for name in os.listdir(os.path.join(repo.path, ".git"))
+        )
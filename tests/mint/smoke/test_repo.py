@@ -9,3 +9,59 @@ class TestRepo:
     def test_clone_creates_git_directory(self, shallow_cloned_repo):
         git_dir = os.path.join(shallow_cloned_repo.path, ".git")
         assert os.path.exists(git_dir)
+
+    def test_head_commit_of_new_repo_is_none(self, repo):
+        assert repo.head_commit() is None
+
+    def test_head_commit_returns_commit_id(self, repo):
+        repo.git.commit(message="first", allow_empty=True)
+
+        assert repo.head_commit() == repo.git.rev_parse("HEAD")
+
+    def test_structured_queries(self, repo):
+        with open(os.path.join(repo.path, "a file"), "w") as f:
+            f.write("a")
+
+        repo.git.add("a file")
+        repo.git.commit(message="first")
+        repo.git.tag("1.18")
+        repo.git.mv("a file", "renamed file")
+        with open(os.path.join(repo.path, "untracked"), "w") as f:
+            f.write("b")
+
+        (tree_entry,) = repo.ls_tree("HEAD")
+        assert (tree_entry.type, tree_entry.path) == ("blob", "a file")
+
+        (diff_entry,) = repo.diff_raw("HEAD", cached=True, find_renames=True)
+        assert (diff_entry.status, diff_entry.dst_path) == ("R", "renamed file")
+
+        statuses = {entry.path: entry for entry in repo.status()}
+        assert statuses["renamed file"].orig_path == "a file"
+        assert statuses["untracked"].kind == "?"
+
+        (ref,) = repo.refs("refs/tags", merged="HEAD")
+        assert (ref.short_name, ref.oid) == ("1.18", repo.head_commit())
+
+        infos = {info.oid: info for info in repo.all_objects()}
+        assert infos[tree_entry.oid].type == "blob"
+
+    def test_diff_index_and_diff_tree_list_modified_blobs(self, repo):
+        path = os.path.join(repo.path, "a")
+        with open(path, "w") as f:
+            f.write("a")
+
+        repo.git.add("a")
+        repo.git.commit(message="first")
+        first = repo.head_commit()
+
+        with open(path, "w") as f:
+            f.write("changed")
+
+        (entry,) = repo.diff_index("HEAD")
+        assert (entry.status, entry.src_path) == ("M", "a")
+        assert repo.objects.read(entry.src_oid) == b"a"
+
+        repo.git.commit("a", message="second")
+
+        (entry,) = repo.diff_tree(first, "HEAD")
+        assert repo.objects.read(entry.dst_oid) == b"changed"
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from mint.error import GitError
+from mint.session import (
+    AttributeChecker,
+    IndexUpdater,
+    ObjectWriter,
+    RefTransaction,
+    TreeBuilder,
+)
+
+
+@pytest.fixture
+def files(repo):
+    for name in ("a", "b"):
+        with open(os.path.join(repo.path, name), "w") as f:
+            f.write(name)
+
+    return ["a", "b"]
+
+
+class TestSessions:
+    def test_objects_written_and_added_to_index(self, repo, files):
+        with ObjectWriter(repo) as objects, IndexUpdater(repo) as index:
+            for path in files:
+                index.add("100644", objects.write(path).result(), path)
+
+        assert repo.git.ls_files().split("\n") == files
+        assert repo.git.status(porcelain=True) == "A  a\nA  b"
+
+    def test_index_updater_removes_entries(self, repo, files):
+        repo.git.add(*files)
+
+        with IndexUpdater(repo) as index:
+            index.remove("a")
+
+        assert repo.git.ls_files() == "b"
+
+    def test_tree_builder_writes_trees(self, repo, files):
+        with ObjectWriter(repo) as objects:
+            oids = [objects.write(path).result() for path in files]
+
+        with TreeBuilder(repo) as trees:
+            first = trees.write([("100644", "blob", oids[0], "a")])
+            second = trees.write(
+                [("100644", "blob", oid, name) for oid, name in zip(oids, files)]
+            )
+            trees.flush()
+
+        assert repo.git.ls_tree(first.result(), name_only=True) == "a"
+        assert repo.git.ls_tree(second.result(), name_only=True) == "a\nb"
+
+    def test_ref_transaction_applies_all_updates(self, repo):
+        repo.git.commit(message="first", allow_empty=True)
+        head = repo.head_commit()
+
+        with RefTransaction(repo) as refs:
+            refs.create("refs/tags/1.18", head)
+            refs.create("refs/tags/1.19", head)
+            refs.commit()
+
+        assert repo.git.tag() == "1.18\n1.19"
+
+    def test_failed_ref_transaction_applies_nothing(self, repo):
+        repo.git.commit(message="first", allow_empty=True)
+        head = repo.head_commit()
+        repo.git.tag("1.19")
+
+        refs = RefTransaction(repo)
+        refs.create("refs/tags/1.18", head)
+        refs.create("refs/tags/1.19", head)
+        with pytest.raises(GitError):
+            refs.commit()
+
+        with pytest.raises(GitError):
+            refs.close()
+
+        assert repo.git.tag() == "1.19"
+
+    def test_attribute_checker(self, repo, files):
+        with open(os.path.join(repo.path, ".gitattributes"), "w") as f:
+            f.write("a text eol=lf\n")
+
+        with AttributeChecker(repo, ["text", "eol"]) as attributes:
+            a = attributes.check("a")
+            b = attributes.check("b")
+            attributes.flush()
+
+        assert a.result() == {"text": "set", "eol": "lf"}
+        assert b.result() == {"text": "unspecified", "eol": "unspecified"}
@@ -0,0 +1,192 @@
+import glob
+import os
+import time
+
+import pytest
+
+from mint.maintenance import maintain
+from mint.pack import read_alternates
+from mint.repo import Repo
+from mint.shared import MEMBER_REFS, SharedObjectStore
+
+
+def commit(repo, name, content):
+    with open(os.path.join(repo.path, name), "w") as f:
+        f.write(content)
+
+    repo.git.add(name)
+    repo.git.commit(message=name)
+    return repo.head_commit()
+
+
+def packs(repo_path):
+    return glob.glob(os.path.join(repo_path, "objects", "pack", "*.pack"))
+
+
+def backdate_packs(repo):
+    # As if the repo wrote its packs a month ago
+    month_ago = time.time() - 30 * 24 * 60 * 60
+    for path in glob.glob(os.path.join(repo.path, ".git", "objects", "pack", "*")):
+        os.utime(path, (month_ago, month_ago))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SharedObjectStore(str(tmp_path / "store"))
+    yield store
+
+    store.close()
+
+
+@pytest.fixture
+def member(tmp_path):
+    repo = Repo.init(str(tmp_path / "member"))
+    yield repo
+
+    repo.close()
+
+
+class TestSharedObjectStore:
+    def test_creates_bare_repo(self, store):
+        assert os.path.isdir(store.objects_dir)
+        assert store.repo.git.rev_parse(is_bare_repository=True) == "true"
+
+    def test_add_registers_store_once(self, store, member):
+        assert store.add(member)
+        assert not store.add(member)
+
+        objects_dir = os.path.join(member.path, ".git", "objects")
+        assert read_alternates(objects_dir) == [store.objects_dir]
+
+    def test_share_moves_packs_and_records_refs(self, store, member):
+        store.add(member)
+        head = commit(member, "a.java", "a")
+        maintain(member)
+
+        assert store.share(member) == 1
+
+        assert packs(os.path.join(member.path, ".git")) == []
+        assert len(packs(store.path)) == 1
+        name = SharedObjectStore.member_name(member)
+        [ref] = store.repo.refs(MEMBER_REFS)
+        assert (ref.name, ref.oid) == (f"{MEMBER_REFS}/{name}/heads/master", head)
+
+        # The repo reads its objects from the store
+        assert member.git.show("HEAD:a.java") == "a"
+        assert member.reader.read(member.git.rev_parse("HEAD:a.java")) == b"a"
+        member.git.fsck()
+
+    def test_objects_in_store_are_not_written_again(self, store, member, tmp_path):
+        other = Repo.init(str(tmp_path / "other"))
+        store.add(other)
+        commit(other, "a.java", "shared content")
+        maintain(other)
+        store.share(other)
+        other.close()
+
+        store.add(member)
+        with open(os.path.join(member.path, "a.java"), "w") as f:
+            f.write("shared content")
+        member.git.add("a.java")
+
+        oid = member.git.rev_parse(":a.java")
+        loose = os.path.join(member.path, ".git", "objects", oid[:2], oid[2:])
+        assert not os.path.exists(loose)
+
+    def test_share_keeps_packs_that_are_kept(self, store, member):
+        store.add(member)
+        commit(member, "a.java", "a")
+        maintain(member)
+        [pack] = packs(os.path.join(member.path, ".git"))
+        open(pack[: -len(".pack")] + ".keep", "w").close()
+
+        assert store.share(member) == 0
+        assert os.path.exists(pack)
+
+    def test_share_removes_refs_that_were_deleted(self, store, member):
+        store.add(member)
+        commit(member, "a.java", "a")
+        member.git.branch("topic")
+        maintain(member)
+        store.share(member)
+
+        member.git.branch("topic", d=True)
+        store.share(member)
+
+        names = [ref.name for ref in store.repo.refs(MEMBER_REFS)]
+        assert [name.rsplit("/", 1)[-1] for name in names] == ["master"]
+
+    @pytest.mark.parametrize("pack_limit", [50, 0])
+    def test_maintain_keeps_objects_reachable_from_members(
+        self, store, member, mocker, pack_limit
+    ):
+        # With a limit of 0, everything is repacked. Otherwise the moved packs
+        # stay, next to a pack of the trees of the repo's index.
+        mocker.patch("mint.shared.PACK_LIMIT", pack_limit)
+        store.add(member)
+        for i in range(3):
+            commit(member, "a.java", str(i))
+            maintain(member)
+            store.share(member)
+
+        report = store.maintain()
+
+        assert report.packs_after == (4 if pack_limit else 1)
+        member.git.fsck()
+        assert member.git.show("HEAD~2:a.java") == "0"
+
+    def test_maintain_keeps_objects_only_the_index_has(self, store, member, mocker):
+        mocker.patch("mint.shared.PACK_LIMIT", 0)
+        store.add(member)
+        commit(member, "a.java", "a")
+        with open(os.path.join(member.path, "a.java"), "w") as f:
+            f.write("staged")
+        member.git.add("a.java")
+        maintain(member)
+        backdate_packs(member)
+
+        store.share(member)
+        store.maintain()
+
+        assert member.git.cat_file("-p", ":a.java") == "staged"
+        member.git.fsck()
+
+    def test_maintain_keeps_commits_only_reflogs_reach(self, store, member, mocker):
+        mocker.patch("mint.shared.PACK_LIMIT", 0)
+        store.add(member)
+        commit(member, "a.java", "a")
+        amended = commit(member, "b.java", "b")
+        member.git.commit(amend=True, message="amended")
+        maintain(member)
+        backdate_packs(member)
+
+        store.share(member)
+        store.maintain()
+
+        assert member.git.show(f"{amended}:b.java") == "b"
+
+    def test_maintain_keeps_unreachable_objects_that_were_just_moved(
+        self, store, member, mocker
+    ):
+        mocker.patch("mint.shared.PACK_LIMIT", 0)
+        store.add(member)
+        commit(member, "a.java", "a")
+        member.git.checkout("-b", "topic")
+        topic = commit(member, "b.java", "b")
+        member.git.checkout("master")
+        maintain(member)
+
+        # Packs the repo wrote a month ago
+        month_ago = time.time() - 30 * 24 * 60 * 60
+        for path in glob.glob(
+            os.path.join(member.path, ".git", "objects", "pack", "*")
+        ):
+            os.utime(path, (month_ago, month_ago))
+
+        store.share(member)
+        member.git.branch("topic", D=True)
+        member.git.reflog("expire", "--expire=now", "--all")
+        store.share(member)
+        store.maintain()
+
+        assert store.repo.git.cat_file("-t", topic) == "commit"
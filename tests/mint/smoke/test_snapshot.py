@@ -0,0 +1,168 @@
+import os
+
+import pytest
+
+from mint.commit_builder import CommitBuilder
+from mint.error import GitError
+from mint.fast_import import FastImport
+from mint.snapshot import read_file, walk
+
+
+@pytest.fixture(params=[FastImport, CommitBuilder])
+def backend(request):
+    return request.param
+
+
+def test_read_file_reads_mode_and_content(tempdir):
+    path = os.path.join(tempdir, "a.sh")
+    with open(path, "w") as f:
+        f.write("echo a")
+    os.chmod(path, 0o755)
+
+    assert read_file(path) == ("100755", b"echo a")
+
+
+def test_walk_yields_files_relative_to_repo(repo, write):
+    write(repo, "src/b/b.java", "b")
+    write(repo, "src/a.java", "a")
+
+    assert list(walk(repo.path, "src")) == ["src/a.java", "src/b/b.java"]
+
+
+class TestBackends:
+    def test_commit_on_empty_branch_creates_root_commit(self, repo, write, backend):
+        write(repo, "src/a.java", "a")
+
+        with backend(repo) as committer:
+            committer.commit("first", "src")
+            committer.checkpoint()
+
+        assert repo.git.log("--format=%s") == "first"
+        assert repo.git.show("HEAD:src/a.java") == "a"
+
+    def test_commit_keeps_files_outside_of_directories(
+        self, committed_repo, write, backend
+    ):
+        write(committed_repo, "src/a.java", "a")
+
+        with backend(committed_repo) as committer:
+            committer.commit("first", "src")
+
+        assert committed_repo.git.log("--format=%s").split("\n") == [
+            "first",
+            "add foo",
+        ]
+        assert committed_repo.git.ls_tree("HEAD", name_only=True, r=True).split(
+            "\n"
+        ) == ["foo.txt", "src/a.java"]
+
+    def test_commit_only_counts_changed_files(self, committed_repo, write, backend):
+        write(committed_repo, "src/a.java", "a")
+        write(committed_repo, "src/b/b.java", "b")
+
+        with backend(committed_repo) as committer:
+            assert committer.commit("first", "src") == 2
+
+            write(committed_repo, "src/a.java", "changed")
+            assert committer.commit("second", "src") == 1
+
+            os.remove(os.path.join(committed_repo.path, "src/b/b.java"))
+            assert committer.commit("third", "src") == 1
+
+        assert committed_repo.git.show("HEAD~1:src/a.java") == "changed"
+        assert committed_repo.git.ls_tree("HEAD", "src", name_only=True, r=True) == (
+            "src/a.java"
+        )
+
+    def test_commit_handles_file_changed_back_before_checkpoint(
+        self, committed_repo, write, backend
+    ):
+        write(committed_repo, "src/a.java", "a")
+
+        with backend(committed_repo) as committer:
+            committer.commit("first", "src")
+            committer.checkpoint()
+
+            write(committed_repo, "src/a.java", "changed")
+            committer.commit("second", "src")
+
+            # The index still matches the first commit
+            write(committed_repo, "src/a.java", "a")
+            assert committer.commit("third", "src") == 1
+
+        assert committed_repo.git.show("HEAD:src/a.java") == "a"
+
+    def test_commit_replaces_file_with_directory(self, committed_repo, write, backend):
+        write(committed_repo, "src/a", "a")
+
+        with backend(committed_repo) as committer:
+            committer.commit("first", "src")
+
+            os.remove(os.path.join(committed_repo.path, "src/a"))
+            write(committed_repo, "src/a/b.java", "b")
+            committer.commit("second", "src")
+
+        assert committed_repo.git.ls_tree("HEAD", "src", name_only=True, r=True) == (
+            "src/a/b.java"
+        )
+
+    def test_checkpoint_makes_commits_and_tags_visible(
+        self, committed_repo, write, backend
+    ):
+        write(committed_repo, "src/a.java", "a")
+
+        with backend(committed_repo) as committer:
+            committer.commit("1.18", "src")
+            committer.tag("1.18")
+            committer.checkpoint()
+
+            assert committed_repo.git.describe(tags=True) == "1.18"
+            assert [ref.short_name for ref in committed_repo.refs("refs/tags")] == [
+                "1.18"
+            ]
+
+    def test_checkpoint_does_not_move_existing_tag(
+        self, committed_repo, write, backend
+    ):
+        committed_repo.git.tag("1.18")
+        head = committed_repo.head_commit()
+        write(committed_repo, "src/a.java", "a")
+
+        with pytest.raises(GitError):
+            with backend(committed_repo) as committer:
+                committer.commit("1.18", "src")
+                committer.tag("1.18")
+                committer.checkpoint()
+
+        assert committed_repo.git.rev_parse("1.18") == head
+
+    def test_checkpoint_updates_index(self, committed_repo, write, backend):
+        write(committed_repo, "src/a.java", "a")
+        write(committed_repo, "src/b.java", "b")
+
+        with backend(committed_repo) as committer:
+            committer.commit("first", "src")
+            committer.checkpoint()
+
+            os.remove(os.path.join(committed_repo.path, "src/b.java"))
+            committer.commit("second", "src")
+            committer.checkpoint()
+
+            assert committed_repo.git.status(porcelain=True) == ""
+
+    def test_continues_from_commits_made_before_it_started(
+        self, committed_repo, write, backend
+    ):
+        write(committed_repo, "src/a.java", "a")
+        with backend(committed_repo) as committer:
+            committer.commit("first", "src")
+
+        write(committed_repo, "src/a.java", "changed")
+        with backend(committed_repo) as committer:
+            assert committer.commit("second", "src") == 1
+
+        assert committed_repo.git.log("--format=%s").split("\n") == [
+            "second",
+            "first",
+            "add foo",
+        ]
@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from mint.worktree import LOCK_REASON, WorktreePool
+
+
+@pytest.fixture
+def tagged_repo(repo):
+    path = os.path.join(repo.path, "version")
+    for version in ("1.17", "1.18"):
+        with open(path, "w") as f:
+            f.write(version)
+
+        repo.git.add("version")
+        repo.git.commit(message=version)
+        repo.git.tag(version)
+
+    yield repo
+
+    repo.close()
+
+
+@pytest.fixture
+def pool(tagged_repo):
+    return WorktreePool(tagged_repo, os.path.join(tagged_repo.path, ".git", "pool"))
+
+
+def read_version(worktree):
+    with open(os.path.join(worktree.path, "version")) as f:
+        return f.read()
+
+
+def locked(repo):
+    return {entry.path: entry.locked for entry in repo.worktrees()}
+
+
+class TestWorktreePool:
+    def test_acquire_checks_out_commit_in_locked_worktree(self, tagged_repo, pool):
+        worktree = pool.acquire("1.17")
+
+        assert read_version(worktree) == "1.17"
+        assert read_version(tagged_repo) == "1.18"
+        assert locked(tagged_repo)[worktree.path] == f"{LOCK_REASON} {os.getpid()}"
+
+    def test_busy_worktrees_are_not_shared(self, pool):
+        first = pool.acquire("1.17")
+        second = pool.acquire("1.18")
+
+        assert first.path != second.path
+        assert (read_version(first), read_version(second)) == ("1.17", "1.18")
+        assert pool.busy == 2
+
+    def test_released_worktree_is_unlocked_and_reused(self, tagged_repo, pool):
+        with pool.checkout("1.17") as worktree:
+            path = worktree.path
+            with open(os.path.join(path, "untracked"), "w") as f:
+                f.write("left over")
+
+        assert locked(tagged_repo)[path] is None
+
+        with pool.checkout("1.18") as worktree:
+            assert worktree.path == path
+            assert read_version(worktree) == "1.18"
+            assert not os.path.exists(os.path.join(path, "untracked"))
+
+    def test_new_pool_reuses_worktrees_of_exited_processes(self, tagged_repo, pool):
+        worktree = pool.acquire("1.17")
+
+        # Pretend the process that locked it exited
+        tagged_repo.git.worktree("unlock", worktree.path)
+        tagged_repo.git.worktree(
+            "lock", "--reason", f"{LOCK_REASON} 999999999", worktree.path
+        )
+
+        other = WorktreePool(
+            tagged_repo, os.path.join(tagged_repo.path, ".git", "pool")
+        )
+        assert other.idle == 1
+        assert other.acquire("1.18").path == worktree.path
+
+    def test_new_pool_does_not_reuse_worktrees_in_use(self, tagged_repo, pool):
+        pool.acquire("1.17")
+
+        other = WorktreePool(
+            tagged_repo, os.path.join(tagged_repo.path, ".git", "pool")
+        )
+        assert other.idle == 0
+
+    def test_prune_removes_extra_idle_worktrees(self, tagged_repo):
+        pool = WorktreePool(
+            tagged_repo,
+            os.path.join(tagged_repo.path, ".git", "pool"),
+            max_idle=1,
+        )
+        worktrees = [pool.acquire("1.17"), pool.acquire("1.18")]
+        for worktree in worktrees:
+            pool.release(worktree)
+
+        pool.prune()
+
+        assert pool.idle == 1
+        assert not os.path.exists(worktrees[0].path)
+        assert len(list(tagged_repo.worktrees())) == 2
@@ -0,0 +1,163 @@
+from mint.parse import (
+    iter_lines,
+    parse_batch_check,
+    parse_diff_raw,
+    parse_ls_tree,
+    parse_refs,
+    parse_status,
+    parse_worktrees,
+)
+
+OID_A = "a" * 40
+OID_B = "b" * 40
+ZERO_OID = "0" * 40
+
+
+class TestParseDiffRaw:
+    def test_modified_file(self):
+        records = [f":100644 100644 {OID_A} {OID_B} M", "src/Foo.java", ""]
+
+        (entry,) = parse_diff_raw(records)
+
+        assert entry.status == "M"
+        assert entry.score is None
+        assert (entry.src_oid, entry.dst_oid) == (OID_A, OID_B)
+        assert entry.src_path == entry.dst_path == "src/Foo.java"
+
+    def test_renamed_file_has_two_paths(self):
+        records = [
+            f":100644 100644 {OID_A} {OID_A} R100",
+            "old name.java",
+            "new name.java",
+            f":000000 100644 {ZERO_OID} {OID_B} A",
+            "added.java",
+        ]
+
+        renamed, added = parse_diff_raw(records)
+
+        assert (renamed.status, renamed.score) == ("R", 100)
+        assert (renamed.src_path, renamed.dst_path) == (
+            "old name.java",
+            "new name.java",
+        )
+        assert (added.status, added.dst_path) == ("A", "added.java")
+
+    def test_parses_lazily(self):
+        def records():
+            yield f":100644 100644 {OID_A} {OID_B} M"
+            yield "a"
+            raise AssertionError("read too far")
+
+        assert next(parse_diff_raw(records())).src_path == "a"
+
+
+class TestParseLsTree:
+    def test_paths_with_tabs_and_spaces(self):
+        records = [f"100644 blob {OID_A}\tdir/a b\tc.txt", f"040000 tree {OID_B}\td"]
+
+        blob, tree = parse_ls_tree(records)
+
+        assert (blob.type, blob.oid, blob.path) == ("blob", OID_A, "dir/a b\tc.txt")
+        assert blob.size is None
+        assert (tree.mode, tree.type) == ("040000", "tree")
+
+    def test_long_format_has_sizes(self):
+        records = [f"100644 blob {OID_A}     123\ta", f"040000 tree {OID_B}       -\td"]
+
+        blob, tree = parse_ls_tree(records)
+
+        assert blob.size == 123
+        assert tree.size is None
+
+
+class TestParseStatus:
+    def test_all_kinds_of_entries(self):
+        records = [
+            "# branch.oid " + OID_A,
+            f"1 .M N... 100644 100644 100644 {OID_A} {OID_A} changed file.txt",
+            f"2 R. N... 100644 100644 100644 {OID_A} {OID_A} R100 new.txt",
+            "old.txt",
+            f"u UU N... 100644 100644 100644 100644 {OID_A} {OID_B} {OID_A} both.txt",
+            "? untracked.txt",
+            "! ignored.txt",
+        ]
+
+        changed, renamed, unmerged, untracked, ignored = parse_status(records)
+
+        assert (changed.kind, changed.xy, changed.path) == (
+            "1",
+            ".M",
+            "changed file.txt",
+        )
+        assert (renamed.score, renamed.path, renamed.orig_path) == (
+            "R100",
+            "new.txt",
+            "old.txt",
+        )
+        assert (unmerged.xy, unmerged.path) == ("UU", "both.txt")
+        assert (untracked.kind, untracked.xy, untracked.path) == (
+            "?",
+            None,
+            "untracked.txt",
+        )
+        assert (ignored.kind, ignored.path) == ("!", "ignored.txt")
+
+
+class TestParseRefs:
+    def test_lightweight_and_annotated_tags(self):
+        records = [
+            f"refs/tags/1.18\0{OID_A}\0commit\0",
+            f"refs/tags/1.19\0{OID_B}\0tag\0{OID_A}",
+        ]
+
+        lightweight, annotated = parse_refs(records)
+
+        assert (lightweight.short_name, lightweight.peeled_oid) == ("1.18", None)
+        assert (annotated.type, annotated.peeled_oid) == ("tag", OID_A)
+
+
+class TestParseBatchCheck:
+    def test_missing_objects_are_none(self):
+        records = [f"{OID_A} blob 12", "nope missing"]
+
+        info, missing = parse_batch_check(records)
+
+        assert (info.oid, info.type, info.size) == (OID_A, "blob", 12)
+        assert missing is None
+
+
+def test_iter_lines_skips_nothing_but_the_final_newline():
+    assert list(iter_lines("a\n\nb\n")) == ["a", "", "b"]
+    assert list(iter_lines("")) == []
+
+
+class TestParseWorktrees:
+    def test_main_and_linked_worktrees(self):
+        records = [
+            "worktree /repo",
+            f"HEAD {OID_A}",
+            "branch refs/heads/main",
+            "",
+            "worktree /repo/.git/pool/0",
+            f"HEAD {OID_B}",
+            "detached",
+            "locked in use by process 42",
+            "",
+            "worktree /gone",
+            f"HEAD {OID_B}",
+            "detached",
+            "prunable gitdir file points to non-existent location",
+            "",
+        ]
+
+        main, linked, gone = parse_worktrees(records)
+
+        assert (main.path, main.head, main.branch) == (
+            "/repo",
+            OID_A,
+            "refs/heads/main",
+        )
+        assert main.locked is None
+        assert linked.branch is None
+        assert linked.locked == "in use by process 42"
+        assert gone.prunable is not None
@@ -12,6 +12,8 @@ def fs(mocker) -> None:
 @pytest.fixture(autouse=True)
 def command(mocker) -> None:
     mocker.patch("mint.repo.Command")
+    mocker.patch("mint.repo.CachedCommand")
+    mocker.patch("mint.repo.AsyncCommand")
 
 
 class TestRepo:
@@ -2,10 +2,12 @@ import os
 from unittest.mock import MagicMock
 
 from mint.error import GitError
+from mint.parse import RefEntry
 from mint.repo import Repo
 import pytest
 from shulkr.config import Config, get_config
 from shulkr.repo import get_repo
+from shulkr.version_index import VersionEntry, VersionIndex
 
 
 def create_repo(mocker, path: str):
@@ -75,7 +77,9 @@ def decompiler(mocker):
     path
     """
 
-    def mocked_setup_decompiler(local_dir: str, _remote_url: str) -> Repo:
+    def mocked_setup_decompiler(
+        local_dir: str, _remote_url: str, **_clone_options
+    ) -> Repo:
         """Create a fake decompiler subdirectory (yarn or DecompilerMC)"""
 
         # It will be located directly under the shulkr repo directory
@@ -90,7 +94,7 @@ def decompiler(mocker):
 
 
 @pytest.fixture
-def empty_repo(mocker, decompiler):
+def empty_repo(mocker, decompiler, tmp_path):
     repo = create_repo(mocker, "foo")
 
     # Throw error when `git rev-parse` is called
@@ -109,14 +113,22 @@ def empty_repo(mocker, decompiler):
     )
     mocker.patch.object(repo.git, "describe", side_effect=describe_error)
 
+    # There are no commits, so there are no tags either
+    repo.head_commit.return_value = None
+    repo.refs.side_effect = lambda *args, **kwargs: iter([])
+
     # get_repo() will return this value
     mocker.patch("shulkr.repo.repo", repo)
 
+    # No versions were generated
+    index = VersionIndex(str(tmp_path / "versions"), None)
+    mocker.patch("shulkr.version_index.version_index", index)
+
     return repo
 
 
 @pytest.fixture
-def nonempty_repo(mocker, decompiler):
+def nonempty_repo(mocker, decompiler, tmp_path):
     repo = create_repo(mocker, "foo")
 
     # Add a fake commit
@@ -128,10 +140,36 @@ def nonempty_repo(mocker, decompiler):
 
     # Add a fake tag for that commit (it will only be called with --tags)
     mocker.patch.object(repo.git, "describe", return_value="abcdef")
+    repo.head_commit.return_value = "9e71573c6ae5a52195274871a679a23379ad1274"
+    repo.refs.side_effect = lambda *args, **kwargs: iter(
+        [
+            RefEntry(
+                "refs/tags/abcdef",
+                "9e71573c6ae5a52195274871a679a23379ad1274",
+                "commit",
+                None,
+            )
+        ]
+    )
 
     # get_repo() will return this value
     mocker.patch("shulkr.repo.repo", repo)
 
+    # The version index has the tagged commit
+    index = VersionIndex(
+        str(tmp_path / "versions"),
+        "9e71573c6ae5a52195274871a679a23379ad1274",
+        [
+            VersionEntry(
+                0,
+                "abcdef",
+                "9e71573c6ae5a52195274871a679a23379ad1274",
+                "4b825dc642cb6eb9a060e54bf8d69288fbee4904",
+            )
+        ],
+    )
+    mocker.patch("shulkr.version_index.version_index", index)
+
     return repo
 
 
@@ -19,8 +19,18 @@ def mock_all(mocker, versions):
     mocker.patch("shulkr.app.init_config")
     mocker.patch("shulkr.app.ensure_gitignore_exists")
     mocker.patch("shulkr.app.Version.patterns", return_value=versions)
+    mocker.patch("shulkr.app.init_version_index")
     mocker.patch("shulkr.app.get_latest_generated_version")
     mocker.patch("shulkr.app.create_version")
+    mocker.patch("shulkr.app.init_spawner")
+    mocker.patch("shulkr.app.close_spawner")
+    mocker.patch("shulkr.app.init_committer")
+    mocker.patch("shulkr.app.close_committer")
+    mocker.patch("shulkr.app.init_locks")
+    mocker.patch("shulkr.app.close_locks")
+    mocker.patch("shulkr.app.get_repo")
+    mocker.patch("shulkr.app.needs_maintenance", return_value=True)
+    mocker.patch("shulkr.app.maintain")
 
 
 def test_run_loads_version_manifest():
@@ -114,6 +124,20 @@ def test_run_calls_ensure_gitignore_exists():
     app.ensure_gitignore_exists.assert_called_once_with()
 
 
+def test_run_looks_up_latest_version_once_in_version_index():
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+    )
+
+    app.init_version_index.assert_called_once_with()
+    app.get_latest_generated_version.assert_called_once_with()
+
+
 def test_run_with_version_older_than_latest_version_in_repo_exits_with_error():
     app.get_latest_generated_version.return_value = Version(id="1.18", index=1)
 
@@ -155,3 +179,183 @@ def test_run_without_any_versions_exits():
             tags=True,
             undo_renamed_vars=True,
         )
+
+
+def test_run_with_trace_path_saves_trace(mocker):
+    mocker.patch("shulkr.app.init_tracer")
+    mocker.patch("shulkr.app.save_trace")
+
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+        trace_path="trace.json",
+    )
+
+    app.init_tracer.assert_called_once_with()
+    app.save_trace.assert_called_once_with("trace.json")
+
+
+def test_run_with_trace_path_saves_trace_when_exiting_early(mocker):
+    mocker.patch("shulkr.app.init_tracer")
+    mocker.patch("shulkr.app.save_trace")
+    app.Version.patterns.return_value = []
+
+    with pytest.raises(SystemExit):
+        app.run(
+            versions=[],
+            mappings="mappings",
+            repo_path="path/to/repo",
+            message_template="message",
+            tags=True,
+            undo_renamed_vars=True,
+            trace_path="trace.json",
+        )
+
+    app.save_trace.assert_called_once_with("trace.json")
+
+
+def test_run_with_record_path_saves_recording(mocker):
+    mocker.patch("shulkr.app.fetch_manifest", return_value={"versions": []})
+    mocker.patch.object(app.Recorder, "__init__", return_value=None)
+    set_data = mocker.patch.object(app.Recorder, "set_data")
+    save = mocker.patch.object(app.Recorder, "save")
+
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+        record_path="recording",
+    )
+
+    set_data.assert_called_once_with("manifest", {"versions": []})
+    save.assert_called_once_with()
+    assert app.get_interceptor() is None
+
+
+def test_run_with_record_and_replay_paths_raises_value_error():
+    with pytest.raises(ValueError):
+        app.run(
+            versions=[],
+            mappings="mappings",
+            repo_path="path/to/repo",
+            message_template="message",
+            tags=True,
+            undo_renamed_vars=True,
+            record_path="recording",
+            replay_path="recording",
+        )
+
+
+def test_run_with_commit_backend_starts_and_closes_committer():
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+        commit_backend="index",
+    )
+
+    app.init_committer.assert_called_once_with("index")
+    app.close_committer.assert_called_once_with()
+
+
+def test_run_commits_with_git_by_default():
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+    )
+
+    app.init_committer.assert_called_once_with("git")
+
+
+def test_run_maintains_repo_once_at_the_end():
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+    )
+
+    app.maintain.assert_called_once_with(app.get_repo.return_value)
+
+
+def test_run_skips_maintenance_at_the_end_if_little_was_written():
+    app.needs_maintenance.return_value = False
+
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+    )
+
+    app.needs_maintenance.assert_called_once_with(app.get_repo.return_value)
+    app.maintain.assert_not_called()
+
+
+def test_run_with_many_versions_maintains_repo_between_versions():
+    count = 2 * app.MAINTENANCE_INTERVAL + 1
+    versions = [Version(id=str(i), index=i) for i in range(count)]
+    app.Version.patterns.return_value = versions
+
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+    )
+
+    assert app.maintain.call_count == 3
+
+
+def test_run_with_lock_timeout_inits_and_closes_locks():
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+        lock_timeout=30,
+    )
+
+    app.init_locks.assert_called_once_with(30)
+    app.close_locks.assert_called_once_with()
+
+
+def test_run_with_shared_objects_shares_objects_when_maintaining(mocker):
+    mocker.patch("shulkr.app.init_shared_objects")
+    store = mocker.patch("shulkr.app.get_shared_objects").return_value
+
+    app.run(
+        versions=[],
+        mappings="mappings",
+        repo_path="path/to/repo",
+        message_template="message",
+        tags=True,
+        undo_renamed_vars=True,
+        shared_objects="objects",
+    )
+
+    app.init_shared_objects.assert_called_once_with("objects", None)
+    store.share.assert_called_once_with(app.get_repo.return_value)
+    store.maintain.assert_called_once_with()
@@ -0,0 +1,35 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from shulkr.locks import close_locks, init_locks
+
+
+@pytest.fixture
+def git_dir(mocker, tmp_path):
+    repo = MagicMock()
+    repo.git.rev_parse.return_value = str(tmp_path)
+    mocker.patch("shulkr.locks.get_repo", return_value=repo)
+
+    yield tmp_path
+
+    close_locks()
+
+
+def test_init_locks_reports_git_lock_files_without_removing_them(mocker, git_dir):
+    click = mocker.patch("shulkr.locks.click")
+    (git_dir / "index.lock").touch()
+
+    init_locks()
+
+    click.secho.assert_called_once()
+    assert str(git_dir / "index.lock") in click.secho.call_args.args[0]
+    assert (git_dir / "index.lock").exists()
+
+
+def test_init_locks_reports_nothing_without_git_lock_files(mocker, git_dir):
+    click = mocker.patch("shulkr.locks.click")
+
+    init_locks()
+
+    click.secho.assert_not_called()
@@ -1,4 +1,23 @@
-from shulkr.repo import init_repo
+import pytest
+
+import shulkr.repo
+from mint.maintenance import AUTO_GC_SETTINGS
+from mint.profile import LARGE_REPO_PROFILE
+from shulkr.repo import (
+    close_committer,
+    close_shared_objects,
+    get_shared_objects,
+    init_committer,
+    init_repo,
+    init_shared_objects,
+    reset_committer,
+)
+
+
+@pytest.fixture(autouse=True)
+def profile(mocker):
+    mocker.patch("shulkr.repo.apply_profile")
+    mocker.patch("shulkr.repo.verify_profile", return_value={})
 
 
 def test_init_repo_returns_true_if_repo_exists(mocker, empty_repo):
@@ -13,3 +32,96 @@ def test_init_repo_returns_false_if_repo_directory_does_not_exist(mocker):
     mocker.patch("shulkr.repo.Repo", side_effect=FileNotFoundError)
 
     assert not init_repo("/tmp/does-not-exist")
+
+
+def test_init_repo_applies_large_repo_profile_to_existing_repo(mocker):
+    mocker.patch("shulkr.repo.click")
+    Repo = mocker.patch("shulkr.repo.Repo")
+
+    init_repo("/path/to/repo")
+
+    shulkr.repo.apply_profile.assert_called_once_with(
+        Repo.return_value, LARGE_REPO_PROFILE
+    )
+
+
+def test_init_repo_applies_large_repo_profile_to_new_repo(mocker):
+    mocker.patch("shulkr.repo.click")
+    Repo = mocker.patch("shulkr.repo.Repo", side_effect=FileNotFoundError)
+
+    init_repo("/tmp/does-not-exist")
+
+    shulkr.repo.apply_profile.assert_called_once_with(
+        Repo.init.return_value, LARGE_REPO_PROFILE
+    )
+
+
+def test_init_repo_disables_auto_gc_for_its_commands(mocker):
+    mocker.patch("shulkr.repo.click")
+    Repo = mocker.patch("shulkr.repo.Repo")
+
+    init_repo("/path/to/repo")
+
+    Repo.assert_called_once_with("/path/to/repo", config=AUTO_GC_SETTINGS)
+
+
+def test_init_repo_warns_about_settings_that_could_not_be_applied(mocker):
+    click = mocker.patch("shulkr.repo.click")
+    mocker.patch("shulkr.repo.Repo")
+    shulkr.repo.verify_profile.return_value = {"core.splitIndex": "false"}
+
+    init_repo("/path/to/repo")
+
+    click.secho.assert_called_once()
+
+
+def test_init_committer_with_index_backend_creates_commit_builder(mocker):
+    mocker.patch("shulkr.repo.repo")
+    CommitBuilder = mocker.patch("shulkr.repo.CommitBuilder")
+
+    assert init_committer("index") is CommitBuilder.return_value
+    CommitBuilder.assert_called_once_with(shulkr.repo.repo)
+
+    close_committer()
+    CommitBuilder.return_value.close.assert_called_once_with()
+
+
+def test_init_committer_with_git_backend_returns_none(mocker):
+    mocker.patch("shulkr.repo.committer", None)
+
+    assert init_committer("git") is None
+
+
+def test_init_committer_rejects_unknown_backends(mocker):
+    mocker.patch("shulkr.repo.committer", None)
+
+    with pytest.raises(ValueError):
+        init_committer("svn")
+
+
+def test_reset_committer_closes_and_starts_committer_with_same_backend(mocker):
+    mocker.patch("shulkr.repo.repo")
+    FastImport = mocker.patch("shulkr.repo.FastImport")
+    first = init_committer("fast-import")
+    FastImport.return_value = mocker.MagicMock()
+
+    assert reset_committer() is FastImport.return_value
+    first.close.assert_called_once_with()
+
+    close_committer()
+
+
+def test_init_shared_objects_adds_store_to_repo(mocker):
+    mocker.patch("shulkr.repo.click")
+    mocker.patch("shulkr.repo.repo")
+    SharedObjectStore = mocker.patch("shulkr.repo.SharedObjectStore")
+
+    store = init_shared_objects("objects", 10)
+
+    SharedObjectStore.assert_called_once_with("objects", 10)
+    store.add.assert_called_once_with(shulkr.repo.repo)
+    assert get_shared_objects() is store
+
+    close_shared_objects()
+    store.close.assert_called_once_with()
+    assert get_shared_objects() is None
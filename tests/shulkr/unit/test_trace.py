@@ -0,0 +1,81 @@
+import json
+import time
+
+from command.trace import CommandRecord
+
+from shulkr.trace import Tracer
+
+
+def create_record() -> CommandRecord:
+    record = CommandRecord(["/usr/bin/git", "commit", "-m", "foo"], "/foo/bar")
+    record.start = 1.5
+    record.wall_time = 0.25
+    record.cpu_time = 0.125
+    record.exit_code = 0
+    record.output_size = 42
+
+    return record
+
+
+def load_events(tracer: Tracer, tmp_path) -> list:
+    path = tmp_path / "trace.json"
+    tracer.save(str(path))
+
+    with open(path) as trace_file:
+        return json.load(trace_file)["traceEvents"]
+
+
+def test_record_command_adds_complete_event_in_microseconds(tmp_path):
+    tracer = Tracer()
+
+    tracer.record_command(create_record())
+
+    [event] = load_events(tracer, tmp_path)
+    assert event["ph"] == "X"
+    assert event["name"] == "git commit"
+    assert event["ts"] == 1_500_000
+    assert event["dur"] == 250_000
+
+
+def test_record_command_names_git_commands_after_their_subcommand(tmp_path):
+    tracer = Tracer()
+    record = create_record()
+    record.command = ["/usr/bin/git", "-c", "gc.auto=0", "commit", "-m", "foo"]
+
+    tracer.record_command(record)
+
+    [event] = load_events(tracer, tmp_path)
+    assert event["name"] == "git commit"
+
+
+def test_record_command_stores_process_measurements(tmp_path):
+    tracer = Tracer()
+
+    tracer.record_command(create_record())
+
+    [event] = load_events(tracer, tmp_path)
+    assert event["args"] == {
+        "argv": ["/usr/bin/git", "commit", "-m", "foo"],
+        "cwd": "/foo/bar",
+        "queue_wait": 0.0,
+        "cpu_time": 0.125,
+        "exit_code": 0,
+        "output_size": 42,
+    }
+
+
+def test_span_contains_events_recorded_inside_it(tmp_path):
+    tracer = Tracer()
+
+    with tracer.span("commit", version="1.18"):
+        record = create_record()
+        record.start = time.perf_counter()
+        record.wall_time = 0.0
+        tracer.record_command(record)
+
+    stage, process = load_events(tracer, tmp_path)
+    assert stage["name"] == "commit"
+    assert stage["args"] == {"version": "1.18"}
+    assert stage["tid"] == process["tid"]
+    assert stage["ts"] <= process["ts"]
+    assert process["ts"] + process["dur"] <= stage["ts"] + stage["dur"]
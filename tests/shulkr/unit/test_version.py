@@ -1,8 +1,13 @@
+import threading
+
 from minecraft.version import Version
+from mint.lock import CommitQueue, FileLock
 
 import shulkr
 from shulkr.config import Config
+from shulkr.trace import Tracer, span
 from shulkr.version import create_version, get_latest_generated_version
+from shulkr.version_index import VersionEntry, VersionIndex, get_version_index
 
 
 def test_create_version_calls_generate_sources_with_mappings_from_config_and_correct_version(
@@ -143,6 +148,24 @@ def test_create_version_with_tag_calls_git_tag(mocker, config, nonempty_repo):
     nonempty_repo.git.tag.assert_called_once_with(version)
 
 
+def test_create_version_with_committer_commits_tags_and_checkpoints(
+    mocker, config, nonempty_repo
+):
+    mocker.patch("shulkr.version.click")
+    mocker.patch("shulkr.version.generate_sources")
+    committer = mocker.patch("shulkr.repo.committer")
+
+    version = Version("1.18.1", 0)
+    create_version(version)
+
+    committer.commit.assert_called_once_with(str(version), "src")
+    committer.tag.assert_called_once_with(str(version))
+    committer.checkpoint.assert_called_once_with()
+    nonempty_repo.git.add.assert_not_called()
+    nonempty_repo.git.commit.assert_not_called()
+    nonempty_repo.git.tag.assert_not_called()
+
+
 def test_get_latest_generated_version_with_repo_with_one_version_returns_version(
     mocker, nonempty_repo
 ):
@@ -152,3 +175,98 @@ def test_get_latest_generated_version_with_repo_with_one_version_returns_version
     get_latest_generated_version()
 
     shulkr.version.Version.of.assert_called_once_with("abcdef")
+
+
+def test_create_version_with_tag_records_version_in_index(
+    mocker, config, nonempty_repo
+):
+    mocker.patch("shulkr.version.click")
+    mocker.patch("shulkr.version.generate_sources")
+    nonempty_repo.objects.info.return_value.oid = "d" * 40
+
+    def commit(**kwargs):
+        nonempty_repo.head_commit.return_value = "c" * 40
+
+    mocker.patch.object(nonempty_repo.git, "commit", side_effect=commit)
+
+    version = Version("1.18.1", 7)
+    create_version(version)
+
+    entry = get_version_index().latest()
+    assert (entry.id, entry.commit, entry.tree) == ("1.18.1", "c" * 40, "d" * 40)
+
+
+def test_create_version_skips_version_generated_by_another_run(
+    mocker, config, nonempty_repo
+):
+    mocker.patch("shulkr.version.click")
+    mocker.patch("shulkr.version.generate_sources")
+    # Another run committed 1.18.1 since the index was loaded
+    nonempty_repo.head_commit.return_value = "c" * 40
+    index = VersionIndex(
+        get_version_index().path,
+        "c" * 40,
+        [VersionEntry(7, "1.18.1", "c" * 40, "d" * 40)],
+    )
+    mocker.patch("shulkr.version.init_version_index", return_value=index)
+
+    create_version(Version("1.18.1", 7))
+
+    shulkr.version.generate_sources.assert_not_called()
+    nonempty_repo.git.commit.assert_not_called()
+
+
+def test_create_version_after_another_run_committed_restarts_committer(
+    mocker, config, nonempty_repo
+):
+    mocker.patch("shulkr.version.click")
+    mocker.patch("shulkr.version.generate_sources")
+    nonempty_repo.head_commit.return_value = "c" * 40
+    index = VersionIndex(
+        get_version_index().path,
+        "c" * 40,
+        [VersionEntry(7, "1.18.1", "c" * 40, "d" * 40)],
+    )
+    mocker.patch("shulkr.version.init_version_index", return_value=index)
+    mocker.patch("shulkr.version.reset_committer")
+
+    create_version(Version("1.18.2", 8))
+
+    shulkr.version.reset_committer.assert_called_once_with()
+    shulkr.version.generate_sources.assert_called_once()
+
+
+def test_create_version_writes_through_commit_queue(mocker, config, nonempty_repo):
+    mocker.patch("shulkr.version.click")
+    mocker.patch("shulkr.version.generate_sources")
+    mocker.patch("shulkr.version.queue_write")
+
+    version = Version("1.18.1", 0)
+    create_version(version)
+
+    shulkr.version.queue_write.assert_called_once_with(
+        shulkr.version._write_version, version
+    )
+    nonempty_repo.git.commit.assert_not_called()
+
+
+def test_create_version_traces_writes_inside_the_version_span(
+    mocker, config, nonempty_repo, tmp_path
+):
+    mocker.patch("shulkr.version.click")
+    mocker.patch("shulkr.version.generate_sources")
+    queue = CommitQueue(FileLock(str(tmp_path / "write.lock")))
+    mocker.patch("shulkr.locks.commit_queue", queue)
+    tracer = Tracer()
+    mocker.patch("shulkr.trace.tracer", tracer)
+
+    with span("version"):
+        create_version(Version("1.18.1", 0))
+
+    events = {event["name"]: event for event in tracer._events}
+    outer = events["version"]
+    for name in ("generate sources", "commit", "tag"):
+        event = events[name]
+        assert event["tid"] == outer["tid"] == threading.get_ident()
+        assert outer["ts"] <= event["ts"]
+        assert event["ts"] + event["dur"] <= outer["ts"] + outer["dur"]
@@ -0,0 +1,115 @@
+import os
+from unittest.mock import MagicMock
+
+from minecraft.version import NoSuchVersionError, Version
+from mint.parse import RefEntry
+import pytest
+
+from shulkr.version_index import HEADER, VersionEntry, VersionIndex
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "shulkr" / "versions")
+
+
+def test_saved_index_loads_with_same_entries(path):
+    index = VersionIndex(path, None)
+    index.add(Version("1.17", 3), "a" * 40, "b" * 40)
+    index.add(Version("1.18", 5), "c" * 40, "d" * 40)
+
+    loaded = VersionIndex.load(path)
+
+    assert loaded.head == "c" * 40
+    assert len(loaded) == 2
+    assert Version("1.17", 3) in loaded
+    assert loaded.get(Version("1.17", 3)).commit == "a" * 40
+    assert loaded.latest().id == "1.18"
+    assert loaded.latest().tree == "d" * 40
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_latest_is_the_version_with_the_highest_manifest_index(path):
+    index = VersionIndex(
+        path,
+        None,
+        [VersionEntry(5, "1.18", "c" * 40, "d" * 40), VersionEntry(3, "1.17", "", "")],
+    )
+
+    assert index.latest().id == "1.18"
+
+
+def test_load_returns_none_if_file_is_missing(path):
+    assert VersionIndex.load(path) is None
+
+
+def test_load_returns_none_if_format_is_unknown(path):
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.write("something else\n")
+
+    assert VersionIndex.load(path) is None
+
+
+def test_save_ignores_files_left_by_writer_that_died(path):
+    os.makedirs(os.path.dirname(path))
+    open(path + ".lock", "w").close()
+    with open(path + ".tmp", "w") as f:
+        f.write("half-written")
+
+    VersionIndex(path, "a" * 40).save()
+
+    assert VersionIndex.load(path).head == "a" * 40
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_rebuild_reads_version_tags_reachable_by_head(mocker, path):
+    versions = {"1.17": Version("1.17", 3), "1.18": Version("1.18", 5)}
+
+    def of(id):
+        if id not in versions:
+            raise NoSuchVersionError(id)
+
+        return versions[id]
+
+    mocker.patch("shulkr.version_index.Version.of", side_effect=of)
+    repo = MagicMock()
+    repo.head_commit.return_value = "c" * 40
+    repo.refs.return_value = iter(
+        [
+            RefEntry("refs/tags/1.17", "a" * 40, "commit", None),
+            RefEntry("refs/tags/1.18", "e" * 40, "tag", "c" * 40),
+            RefEntry("refs/tags/not-a-version", "c" * 40, "commit", None),
+        ]
+    )
+    repo.objects.info.return_value.oid = "d" * 40
+
+    index = VersionIndex.rebuild(repo, path)
+
+    repo.refs.assert_called_once_with("refs/tags", merged="HEAD")
+    assert len(index) == 2
+    assert index.latest().commit == "c" * 40
+    assert VersionIndex.load(path).head == "c" * 40
+
+
+def test_open_rebuilds_index_if_head_moved(mocker, path):
+    VersionIndex(path, "a" * 40).save()
+    rebuild = mocker.patch("shulkr.version_index.VersionIndex.rebuild")
+    repo = MagicMock()
+    repo.git.rev_parse.return_value = os.path.dirname(os.path.dirname(path))
+    repo.head_commit.return_value = "b" * 40
+
+    assert VersionIndex.open(repo) is rebuild.return_value
+
+
+def test_open_loads_index_if_head_did_not_move(mocker, path):
+    VersionIndex(path, "a" * 40).save()
+    rebuild = mocker.patch("shulkr.version_index.VersionIndex.rebuild")
+    repo = MagicMock()
+    repo.git.rev_parse.return_value = os.path.dirname(os.path.dirname(path))
+    repo.head_commit.return_value = "a" * 40
+
+    assert VersionIndex.open(repo).head == "a" * 40
+    rebuild.assert_not_called()
+    with open(path) as f:
+        assert f.readline() == HEADER + "\n"